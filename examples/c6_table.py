@@ -0,0 +1,71 @@
+# SPDX-Identifier: CC0-1.0
+"""
+Benchmark of the interpolated C6 coefficients against the contraction of the
+reference C6 coefficients with the Gaussian weights (CPU).
+
+Usage: python c6_table.py [--nat 250 500 1000] [--repeat 10] [--tol 1e-6]
+"""
+import argparse
+import time
+
+import torch
+
+import tad_dftd3 as d3
+
+
+def random_system(nat: int, dtype: torch.dtype) -> tuple[torch.Tensor, torch.Tensor]:
+    """Random organic-like system (H, C, N, O) with a density of 0.01/Bohr³."""
+    numbers = torch.tensor([1, 6, 7, 8])[torch.randint(0, 4, (nat,))]
+    length = (nat / 0.01) ** (1 / 3)
+    positions = torch.rand((nat, 3), dtype=dtype) * length
+    return numbers, positions
+
+
+def timeit(func, repeat: int) -> float:
+    """Average wall time of C6 and its gradient in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--nat", type=int, nargs="+", default=[250, 500, 1000])
+parser.add_argument("--repeat", type=int, default=10)
+parser.add_argument("--tol", type=float, default=1e-6)
+args = parser.parse_args()
+
+dtype = torch.double
+ref = d3.reference.Reference(dtype=dtype).trim(torch.tensor([1, 6, 7, 8]))
+
+start = time.perf_counter()
+table = d3.model.C6Table(ref, torch.tensor([1, 6, 7, 8]), tol=args.tol)
+print(f"{table} set up in {time.perf_counter() - start:.2f} s\n")
+
+print(
+    f"{'nat':>6} {'exact / ms':>12} {'table / ms':>12} {'speedup':>8} "
+    f"{'max rel err':>12}"
+)
+for nat in args.nat:
+    numbers, positions = random_system(nat, dtype)
+    cn = d3.ncoord.cn_d3(numbers, positions).detach().requires_grad_(True)
+
+    def exact() -> torch.Tensor:
+        weights = d3.model.weight_references(numbers, cn, ref)
+        c6 = d3.model.atomic_c6(numbers, weights, ref)
+        torch.autograd.grad(c6.sum(), cn)
+        return c6
+
+    def interpolated() -> torch.Tensor:
+        c6 = d3.model.interpolate_c6(numbers, cn, table)
+        torch.autograd.grad(c6.sum(), cn)
+        return c6
+
+    error = torch.max(torch.abs(interpolated() / exact() - 1.0))
+
+    t_exact = timeit(exact, args.repeat)
+    t_table = timeit(interpolated, args.repeat)
+    print(
+        f"{nat:>6} {t_exact:>12.2f} {t_table:>12.2f} {t_exact/t_table:>8.2f} "
+        f"{error:>12.2e}"
+    )
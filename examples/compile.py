@@ -0,0 +1,66 @@
+# SPDX-Identifier: CC0-1.0
+"""
+Benchmark of the compiled DFT-D3 dispersion energy against eager mode (CPU).
+
+Usage: python compile.py [--nat 50 100 200] [--repeat 20] [--float]
+"""
+import argparse
+import time
+
+import torch
+
+import tad_dftd3 as d3
+
+
+def random_system(nat: int, dtype: torch.dtype) -> tuple[torch.Tensor, torch.Tensor]:
+    """Random organic-like system (H, C, N, O) with a density of 0.01/Bohr³."""
+    numbers = torch.tensor([1, 6, 7, 8])[torch.randint(0, 4, (nat,))]
+    length = (nat / 0.01) ** (1 / 3)
+    positions = torch.rand((nat, 3), dtype=dtype) * length
+    return numbers, positions
+
+
+def timeit(func, repeat: int) -> float:
+    """Average wall time of energy and gradient in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--nat", type=int, nargs="+", default=[50, 100, 200])
+parser.add_argument("--repeat", type=int, default=20)
+parser.add_argument("--float", action="store_true", help="single precision")
+args = parser.parse_args()
+
+dtype = torch.float if args.float else torch.double
+ref = d3.reference.Reference(dtype=dtype)
+param = {  # PBE0-D3(BJ)-ATM
+    "s6": torch.tensor(1.0000, dtype=dtype),
+    "s8": torch.tensor(1.2177, dtype=dtype),
+    "s9": torch.tensor(1.0000, dtype=dtype),
+    "a1": torch.tensor(0.4145, dtype=dtype),
+    "a2": torch.tensor(4.8593, dtype=dtype),
+}
+
+print(f"{'nat':>6} {'eager / ms':>12} {'compiled / ms':>14} {'speedup':>8}")
+for nat in args.nat:
+    numbers, positions = random_system(nat, dtype)
+    positions.requires_grad_(True)
+
+    def eager() -> None:
+        energy = d3.dftd3(numbers, positions, param, ref=ref)
+        torch.autograd.grad(energy.sum(), positions)
+
+    def compiled() -> None:
+        energy = d3.compiled.dftd3_compiled(numbers, positions, param, ref=ref)
+        torch.autograd.grad(energy.sum(), positions)
+
+    # warm-up (includes compilation)
+    eager()
+    compiled()
+
+    t_eager = timeit(eager, args.repeat)
+    t_compiled = timeit(compiled, args.repeat)
+    print(f"{nat:>6} {t_eager:>12.2f} {t_compiled:>14.2f} {t_eager/t_compiled:>8.2f}")
@@ -75,18 +75,41 @@ tensor(-0.0034288)
 """
 import torch
 
-from . import damping, data, defaults, disp, model, ncoord, reference, typing
+from . import (
+    blocks,
+    compiled,
+    damping,
+    data,
+    defaults,
+    disp,
+    distance,
+    model,
+    ncoord,
+    neighbor,
+    packing,
+    precision,
+    ragged,
+    reference,
+    typing,
+)
 from .__version__ import __version__
 from .disp import dftd3
 
 __alll__ = [
     "dftd3",
+    "blocks",
+    "compiled",
     "damping",
     "data",
     "defaults",
     "disp",
+    "distance",
     "model",
     "ncoord",
+    "neighbor",
+    "packing",
+    "precision",
+    "ragged",
     "reference",
     "typing",
     "__version__",
@@ -0,0 +1,140 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Row blocks
+==========
+
+Helpers for the row-blocked evaluation of pairwise and triple-wise quantities.
+Instead of the full `(..., nat, nat)` matrices, only `(..., chunk_size, nat)`
+blocks are created at a time (and `(..., chunk_size, nat, nat)` blocks instead
+of `(..., nat, nat, nat)` tensors). To also bound the memory of the backward
+pass, the blocks are recomputed during the backward pass (activation
+checkpointing).
+"""
+from __future__ import annotations
+
+from typing import Iterator, Tuple
+
+import torch
+from torch.utils.checkpoint import checkpoint as _checkpoint
+
+from .typing import Any, Callable, Tensor
+
+__all__ = ["checkpoint", "real_pairs_block", "real_triples_block", "row_blocks"]
+
+
+def row_blocks(nat: int, chunk_size: int) -> Iterator[Tuple[int, int]]:
+    """
+    Iterate over the row blocks of a pairwise matrix.
+
+    Parameters
+    ----------
+    nat : int
+        Number of atoms (rows).
+    chunk_size : int
+        Number of rows per block.
+
+    Yields
+    ------
+    tuple[int, int]
+        Start and end index of the block.
+
+    Raises
+    ------
+    ValueError
+        Chunk size is not positive.
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"Chunk size must be positive, but {chunk_size} was given.")
+
+    for start in range(0, nat, chunk_size):
+        yield start, min(start + chunk_size, nat)
+
+
+def real_pairs_block(numbers: Tensor, start: int, end: int) -> Tensor:
+    """
+    Mask for the real atom pairs of a row block (without the diagonal).
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system of shape `(..., nat)`.
+    start : int
+        First row of the block.
+    end : int
+        Last row (exclusive) of the block.
+
+    Returns
+    -------
+    Tensor
+        Mask of shape `(..., end - start, nat)`.
+    """
+    real = numbers != 0
+    mask = real[..., start:end].unsqueeze(-1) & real.unsqueeze(-2)
+
+    idx = torch.arange(numbers.shape[-1], device=numbers.device)
+    return mask & (idx[start:end].unsqueeze(-1) != idx.unsqueeze(-2))
+
+
+def real_triples_block(numbers: Tensor, start: int, end: int) -> Tensor:
+    """
+    Mask for the real atom triples of a block of the first index, for which
+    all three indices are different.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system of shape `(..., nat)`.
+    start : int
+        First index of the block.
+    end : int
+        Last index (exclusive) of the block.
+
+    Returns
+    -------
+    Tensor
+        Mask of shape `(..., end - start, nat, nat)`.
+    """
+    pairs = real_pairs_block(numbers, start, end)
+    real = numbers != 0
+
+    idx = torch.arange(numbers.shape[-1], device=numbers.device)
+    jk = real.unsqueeze(-1) & real.unsqueeze(-2) & (idx.unsqueeze(-1) != idx)
+
+    return pairs.unsqueeze(-1) & pairs.unsqueeze(-2) & jk.unsqueeze(-3)
+
+
+def checkpoint(function: Callable[..., Tensor], *args: Any) -> Tensor:
+    """
+    Evaluate a block with activation checkpointing if gradients are required.
+    Only the inputs are stored and all intermediates are recomputed in the
+    backward pass.
+
+    Parameters
+    ----------
+    function : Callable[..., Tensor]
+        Function evaluating the block.
+    args : Any
+        Arguments for the function.
+
+    Returns
+    -------
+    Tensor
+        Result of the function.
+    """
+    if not torch.is_grad_enabled():
+        return function(*args)
+
+    return _checkpoint(function, *args, use_reentrant=False)
@@ -0,0 +1,320 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compiled evaluation
+===================
+
+Entry point for the evaluation of the DFT-D3 dispersion energy with
+`torch.compile` (requires PyTorch 2.5 or newer).
+
+All checks that require a synchronization with the host (unsupported
+elements, whether the three-body term is switched on) are carried out
+eagerly before the compiled function is called. The compiled function itself
+is traced as a single graph (`fullgraph=True`) without graph breaks.
+
+To limit the number of recompilations, the number of atoms is padded with
+dummy atoms (atomic number zero) to shape buckets (see :func:`bucket_size`).
+With the default automatic dynamic shapes of `torch.compile`, the first
+bucket is compiled for static shapes and the second bucket triggers the
+compilation of a graph with dynamic shapes, which is then reused for all
+further system sizes.
+
+Example
+-------
+>>> import torch
+>>> import tad_dftd3 as d3
+>>> numbers = torch.tensor([14, 1, 1, 1, 1])  # SiH4
+>>> positions = torch.tensor([
+...     [+0.00000000000000, +0.00000000000000, +0.00000000000000],
+...     [+1.61768389755830, +1.61768389755830, -1.61768389755830],
+...     [-1.61768389755830, -1.61768389755830, -1.61768389755830],
+...     [+1.61768389755830, -1.61768389755830, +1.61768389755830],
+...     [-1.61768389755830, +1.61768389755830, +1.61768389755830],
+... ], dtype=torch.double)
+>>> param = dict(  # TPSS0-D3(BJ)
+...     s8=torch.tensor(1.2576, dtype=torch.double),
+...     a1=torch.tensor(0.3768, dtype=torch.double),
+...     a2=torch.tensor(4.5865, dtype=torch.double),
+... )
+>>> energy = d3.compiled.dftd3_compiled(numbers, positions, param)
+>>> print(energy.shape)
+torch.Size([5])
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+
+import torch
+from tad_mctc import storch
+from tad_mctc._version import __tversion__
+from tad_mctc.data import pse
+from tad_mctc.math import einsum
+
+from . import data, defaults, distance, model, ncoord
+from .damping import rational_damping
+from .disp import dispersion2, dispersion3
+from .reference import Reference
+from .typing import (
+    DD,
+    Any,
+    Callable,
+    CountingFunction,
+    DampingFunction,
+    Tensor,
+    WeightingFunction,
+)
+
+__all__ = ["bucket_size", "dftd3_compiled"]
+
+
+def bucket_size(nat: int, minimum: int = 8, steps: int = 4) -> int:
+    """
+    Shape bucket for a given number of atoms.
+
+    Between two consecutive powers of two, `steps` equally spaced buckets are
+    used, i.e., at most `100/steps` percent of the atoms are padding atoms.
+
+    Parameters
+    ----------
+    nat : int
+        Number of atoms.
+    minimum : int, optional
+        Smallest bucket. Defaults to `8`.
+    steps : int, optional
+        Number of buckets per power of two. Defaults to `4`.
+
+    Returns
+    -------
+    int
+        Number of atoms including padding.
+
+    Raises
+    ------
+    ValueError
+        Number of buckets per power of two is smaller than one.
+
+    Example
+    -------
+    >>> from tad_dftd3.compiled import bucket_size
+    >>> print([bucket_size(n) for n in (5, 9, 100, 1000, 1025)])
+    [8, 10, 112, 1024, 1280]
+    """
+    if steps < 1:
+        raise ValueError(f"Number of buckets must be positive, but is {steps}.")
+
+    if nat <= minimum:
+        return minimum
+
+    # (nat - 1).bit_length() yields the exponent of the next power of two
+    step = max((1 << (nat - 1).bit_length()) // (2 * steps), 1)
+    return -(-nat // step) * step
+
+
+def _dftd3(
+    numbers: Tensor,
+    positions: Tensor,
+    param: dict[str, Tensor],
+    ref: Reference,
+    rcov: Tensor,
+    rvdw: Tensor,
+    r4r2: Tensor,
+    cutoff: Tensor,
+    counting_function: CountingFunction,
+    weighting_function: WeightingFunction,
+    damping_function: DampingFunction,
+    atm: bool,
+) -> Tensor:
+    """
+    Dispersion energy without host synchronizations (traced function).
+    """
+    cn = ncoord.cn_d3(
+        numbers, positions, counting_function=counting_function, rcov=rcov
+    )
+    weights = model.weight_references(numbers, cn, ref, weighting_function)
+    c6 = model.atomic_c6(numbers, weights, ref)
+
+    energy = dispersion2(numbers, positions, param, c6, r4r2, damping_function, cutoff)
+    if atm is True:
+        energy = energy + dispersion3(numbers, positions, param, c6, rvdw, cutoff)
+
+    return energy
+
+
+def _einsum(*args: Any, **_: Any) -> Tensor:
+    """
+    Substitute for :func:`tad_mctc.math.einsum` within the graph. Dynamo
+    cannot trace `opt_einsum` (thread-local caches) and the contraction path
+    optimization would specialize on the number of atoms.
+    """
+    # native operator without the contraction path optimization of PyTorch
+    # (`torch.backends.opt_einsum`), which would specialize as well
+    return torch.ops.aten.einsum(args[0], list(args[1:]))
+
+
+@lru_cache(maxsize=None)
+def _substitute() -> None:
+    """
+    Register the substitutes for the helpers of `tad_mctc` (only once).
+    """
+    # only available since PyTorch 2.5 (not in the stubs of older versions)
+    substitute_in_graph = getattr(torch.compiler, "substitute_in_graph")
+
+    for original, substitute in (
+        (einsum, _einsum),
+        (storch.sqrt, distance.sqrt),
+        (storch.divide, distance.divide),
+    ):
+        substitute_in_graph(original, skip_signature_check=True)(substitute)
+
+
+@lru_cache(maxsize=None)
+def _compile(
+    dynamic: bool | None, backend: str, mode: str | None
+) -> Callable[..., Tensor]:
+    """
+    Compile the dispersion energy (cached for every set of options).
+    """
+    if __tversion__ < (2, 5, 0):  # pragma: no cover
+        raise RuntimeError("Compilation requires PyTorch 2.5 or newer.")
+
+    _substitute()
+    return torch.compile(
+        _dftd3, fullgraph=True, dynamic=dynamic, backend=backend, mode=mode
+    )
+
+
+def dftd3_compiled(
+    numbers: Tensor,
+    positions: Tensor,
+    param: dict[str, Tensor],
+    *,
+    ref: Reference | None = None,
+    cutoff: Tensor | None = None,
+    counting_function: CountingFunction = ncoord.exp_count,
+    weighting_function: WeightingFunction = model.gaussian_weight,
+    damping_function: DampingFunction = rational_damping,
+    bucket: bool = True,
+    dynamic: bool | None = None,
+    backend: str = "inductor",
+    mode: str | None = None,
+) -> Tensor:
+    """
+    Evaluate the DFT-D3 dispersion energy with `torch.compile`.
+
+    The result is the same as :func:`tad_dftd3.disp.dftd3` (with default
+    radii and expectation values). Padding atoms in the input (atomic number
+    zero) are allowed as usual for batches.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system of shape `(..., nat)`.
+    positions : Tensor
+        Cartesian coordinates of the atoms in the system of shape
+        `(..., nat, 3)`.
+    param : dict[str, Tensor]
+        DFT-D3 damping parameters.
+    ref : reference.Reference, optional
+        Reference C6 coefficients. Should be created once and passed to every
+        call, otherwise the reference is loaded every time.
+    cutoff : Tensor, optional
+        Real-space cutoff. Defaults to `None`, i.e.,
+        :data:`tad_dftd3.defaults.D3_DISP_CUTOFF`.
+    counting_function : Callable, optional
+        Calculates counting value in range 0 to 1 for each atom pair.
+    weighting_function : Callable, optional
+        Function to calculate weight of individual reference systems.
+    damping_function : Callable, optional
+        Damping function evaluate distance dependent contributions.
+    bucket : bool, optional
+        Pad the number of atoms to shape buckets (see :func:`bucket_size`).
+        Defaults to `True`.
+    dynamic : bool | None, optional
+        Dynamic shapes option of `torch.compile`. Defaults to `None`, i.e.,
+        automatic dynamic shapes upon the first recompilation.
+    backend : str, optional
+        Backend of `torch.compile`. Defaults to `"inductor"`.
+    mode : str | None, optional
+        Mode of `torch.compile`, e.g., `"max-autotune"`. Defaults to `None`.
+
+    Returns
+    -------
+    Tensor
+        Atom-resolved DFT-D3 dispersion energy of shape `(..., nat)`.
+
+    Raises
+    ------
+    ValueError
+        Unsupported elements or inconsistent shapes.
+    RuntimeError
+        PyTorch version does not support compilation.
+    """
+    dd: DD = {"device": positions.device, "dtype": positions.dtype}
+
+    if numbers.shape != positions.shape[:-1]:
+        raise ValueError(
+            "Shape of positions is not consistent with atomic numbers.",
+        )
+    if torch.max(numbers) >= defaults.MAX_ELEMENT:
+        raise ValueError(
+            f"No D3 parameters available for Z > {defaults.MAX_ELEMENT - 1} "
+            f"({pse.Z2S[defaults.MAX_ELEMENT]})."
+        )
+
+    # decide on the three-body term outside of the graph (static flag)
+    atm = "s9" in param and bool(param["s9"] != 0.0)
+
+    # fixed set of keys, i.e., no new tensors and guards within the graph
+    par: dict[str, Tensor] = {
+        "s6": torch.tensor(defaults.S6, **dd),
+        "s8": torch.tensor(defaults.S8, **dd),
+        "s9": torch.tensor(defaults.S9, **dd),
+        "a1": torch.tensor(defaults.A1, **dd),
+        "a2": torch.tensor(defaults.A2, **dd),
+        "alp": torch.tensor(defaults.ALP, **dd),
+    }
+    par.update({k: v.to(**dd) for k, v in param.items()})
+
+    if cutoff is None:
+        cutoff = torch.tensor(defaults.D3_DISP_CUTOFF, **dd)
+    if ref is None:
+        ref = Reference(**dd)
+
+    nat = numbers.shape[-1]
+    if bucket is True:
+        npad = bucket_size(nat) - nat
+        numbers = torch.nn.functional.pad(numbers, (0, npad))
+        positions = torch.nn.functional.pad(positions, (0, 0, 0, npad))
+
+    rcov = data.COV_D3.to(**dd)[numbers]
+    rvdw = data.VDW_D3.to(**dd)[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
+    r4r2 = data.R4R2.to(**dd)[numbers]
+
+    energy = _compile(dynamic, backend, mode)(
+        numbers,
+        positions,
+        par,
+        ref,
+        rcov,
+        rvdw,
+        r4r2,
+        cutoff.to(**dd),
+        counting_function,
+        weighting_function,
+        damping_function,
+        atm,
+    )
+
+    return energy[..., :nat]
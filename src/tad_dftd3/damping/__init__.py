@@ -19,4 +19,5 @@ Damping schemes
 Available damping schemes for two- and three-body dispersion terms.
 """
 from .atm import *
+from .multi import *
 from .rational import *
@@ -30,14 +30,44 @@ Axilrod-Teller-Muto dispersion term.
     f_\text{damp} &=
     \dfrac{1}{1+ 6 \left(\overline{R}_\text{ABC}\right)^{-16}}
 """
+import logging
+from typing import List, NamedTuple, Optional, Tuple
+
 import torch
-from tad_mctc import storch
+from tad_mctc._version import __tversion__
 from tad_mctc.batch import real_pairs, real_triples
 
-from .. import defaults
-from ..typing import DD, Tensor
+from .. import blocks, defaults, distance
+from ..neighbor import triple_list
+from ..packing import gather_pairs, packed_index, unpack
+from ..typing import DD, Callable, Protocol, Tensor
+
+__all__ = [
+    "dispersion_atm",
+    "dispersion_atm_triples",
+    "dispersion3_atm",
+    "screen_triples",
+    "ScreeningStats",
+]
+
+logger = logging.getLogger(__name__)
+
+
+class ScreeningStats(NamedTuple):
+    """
+    Statistics of the screening of the triples (see :func:`screen_triples`).
+    For pair lists, the triples are ordered, i.e., every triple is counted
+    once for each of its six permutations.
+    """
+
+    skipped: Tensor
+    """Number of skipped triples within the cutoff."""
+
+    triples: Tensor
+    """Number of triples within the cutoff."""
 
-__all__ = ["dispersion_atm"]
+    error: Tensor
+    """Upper bound for the error of the total energy in Hartree."""
 
 
 def dispersion_atm(
@@ -49,10 +79,27 @@ def dispersion_atm(
     s9: Tensor = torch.tensor(defaults.S9),
     rs9: Tensor = torch.tensor(defaults.RS9),
     alp: Tensor = torch.tensor(defaults.ALP),
+    reduce_dtype: Optional[torch.dtype] = None,
+    pairs: Optional[Tensor] = None,
+    chunk_size: Optional[int] = None,
+    unique: bool = False,
+    threshold: Optional[float] = None,
+    packed: bool = False,
+    stats: Optional[List[ScreeningStats]] = None,
 ) -> Tensor:
     """
     Axilrod-Teller-Muto dispersion term.
 
+    The dense evaluation creates several intermediates of shape
+    `(..., nat, nat, nat)`. For larger systems, a pair list should be given,
+    from which the list of triples within the cutoff is constructed (see
+    :func:`dispersion_atm_triples`). Memory and time then scale with the
+    number of triples within the cutoff.
+
+    The energy is symmetric w.r.t. the permutation of the atoms of a triple.
+    With `unique`, every triple is only evaluated once (`i < j < k`) instead
+    of six times and the triple energy is split equally among its atoms.
+
     Parameters
     ----------
     numbers : Tensor
@@ -60,7 +107,8 @@ def dispersion_atm(
     positions : Tensor
         Cartesian coordinates of the atoms in the system.
     c6 : Tensor
-        Atomic C6 dispersion coefficients.
+        Atomic C6 dispersion coefficients of shape `(..., nat, nat)` or, if
+        packed, of shape `(..., nat * (nat + 1) // 2)`.
     rvdw : Tensor
         Van der Waals radii of the atoms in the system.
     cutoff : Tensor
@@ -71,12 +119,109 @@ def dispersion_atm(
         Scaling for van-der-Waals radii in damping function. Defaults to `4.0/3.0`.
     alp : Tensor, optional
         Exponent of zero damping function. Defaults to `14.0`.
+    reduce_dtype : torch.dtype | None, optional
+        Floating point dtype for the accumulation of the triple-wise
+        contributions. Defaults to `None`, i.e., the dtype of `positions`.
+    pairs : Tensor | None, optional
+        Pair list of shape `(2, npairs)` containing both orderings of every
+        pair (see :func:`tad_dftd3.neighbor.neighbor_list`). Its cutoff must
+        not be smaller than `cutoff`. The C6 coefficients and van der Waals
+        radii may then also be given per pair. Defaults to `None`, i.e., the
+        dense evaluation.
+    chunk_size : int | None, optional
+        Number of atoms (first index of the triples) evaluated at once in the
+        dense evaluation. Only intermediates of size `(..., chunk_size, nat,
+        nat)` are created and the blocks are recomputed in the backward pass.
+        Ignored if a pair list is given. Defaults to `None`, i.e., no
+        chunking.
+    unique : bool, optional
+        Evaluate only the unique triples (`i < j < k`). Cannot be combined
+        with chunking. Defaults to `False`.
+    threshold : float | None, optional
+        Skip all triples with `|C9| / (r_ij r_ik r_jk)³` below the threshold
+        before the evaluation of the angular and damping terms (see
+        :func:`screen_triples`). Requires unique triples or a pair list.
+        Defaults to `None`, i.e., no screening.
+    packed : bool, optional
+        The C6 coefficients are given in packed upper-triangular form (see
+        :mod:`tad_dftd3.packing`). The pair list and the unique triples
+        gather their C6 coefficients directly from the packed form, while the
+        evaluation of all ordered triples (with intermediates of size
+        `(..., nat, nat, nat)` anyway) expands it. Defaults to `False`.
+    stats : list[ScreeningStats] | None, optional
+        List to which the statistics of the screening (see
+        :class:`ScreeningStats`) are appended. Defaults to `None`.
 
     Returns
     -------
     Tensor
         Atom-resolved ATM dispersion energy.
+
+    Raises
+    ------
+    ValueError
+        Unique triples requested in combination with chunking. Screening
+        requested for the dense evaluation of all ordered triples.
     """
+    if packed is True:
+        if pairs is not None:
+            c6 = gather_pairs(c6, pairs, numbers.shape[-1])
+        elif unique is False:
+            c6 = unpack(c6, numbers.shape[-1])
+
+    if pairs is not None:
+        return _dispersion_atm_pairs(
+            numbers,
+            positions,
+            c6,
+            rvdw,
+            cutoff,
+            pairs,
+            s9=s9,
+            rs9=rs9,
+            alp=alp,
+            reduce_dtype=reduce_dtype,
+            unique=unique,
+            threshold=threshold,
+            stats=stats,
+        )
+
+    if unique is True:
+        if chunk_size is not None:
+            raise ValueError("Unique triples cannot be combined with chunking.")
+
+        return _dispersion_atm_unique(
+            numbers,
+            positions,
+            c6,
+            rvdw,
+            cutoff,
+            s9=s9,
+            rs9=rs9,
+            alp=alp,
+            reduce_dtype=reduce_dtype,
+            threshold=threshold,
+            packed=packed,
+            stats=stats,
+        )
+
+    if threshold is not None:
+        raise ValueError("Screening requires unique triples or a pair list.")
+
+    if chunk_size is not None:
+        return _dispersion_atm_chunked(
+            numbers,
+            positions,
+            c6,
+            rvdw,
+            cutoff,
+            chunk_size,
+            s9=s9,
+            rs9=rs9,
+            alp=alp,
+            reduce_dtype=reduce_dtype,
+        )
+
     dd: DD = {"device": positions.device, "dtype": positions.dtype}
 
     s9 = s9.type(positions.dtype).to(positions.device)
@@ -94,7 +239,7 @@ def dispersion_atm(
     one = torch.tensor(1.0, **dd)
 
     # C9_ABC = s9 * sqrt(|C6_AB * C6_AC * C6_BC|)
-    c9 = s9 * storch.sqrt(
+    c9 = s9 * distance.sqrt(
         torch.abs(c6.unsqueeze(-1) * c6.unsqueeze(-2) * c6.unsqueeze(-3))
     )
 
@@ -108,7 +253,7 @@ def dispersion_atm(
     distances = torch.pow(
         torch.where(
             mask_pairs,
-            storch.cdist(positions, positions, p=2),
+            distance.cdist(positions, positions),
             eps,
         ),
         2.0,
@@ -143,10 +288,1036 @@ def dispersion_atm(
     )
 
     ang = torch.where(
-        mask_triples * (r2ij <= cutoff2) * (r2jk <= cutoff2) * (r2jk <= cutoff2),
+        mask_triples * (r2ij <= cutoff2) * (r2ik <= cutoff2) * (r2jk <= cutoff2),
         0.375 * s / r5 + 1.0 / r3,
         torch.tensor(0.0, **dd),
     )
 
     energy = ang * fdamp * c9
-    return torch.sum(energy, dim=(-2, -1)) / 6.0
+    return torch.sum(energy, dim=(-2, -1), dtype=reduce_dtype) / 6.0
+
+
+def _dispersion_atm_chunked(
+    numbers: Tensor,
+    positions: Tensor,
+    c6: Tensor,
+    rvdw: Tensor,
+    cutoff: Tensor,
+    chunk_size: int,
+    s9: Tensor = torch.tensor(defaults.S9),
+    rs9: Tensor = torch.tensor(defaults.RS9),
+    alp: Tensor = torch.tensor(defaults.ALP),
+    reduce_dtype: Optional[torch.dtype] = None,
+) -> Tensor:
+    """
+    Axilrod-Teller-Muto dispersion term evaluated in blocks of the first atom
+    of the triples. Peak memory of the forward and backward pass scales with
+    `(..., chunk_size, nat, nat)`.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system.
+    positions : Tensor
+        Cartesian coordinates of the atoms in the system.
+    c6 : Tensor
+        Atomic C6 dispersion coefficients.
+    rvdw : Tensor
+        Van der Waals radii of the atoms in the system.
+    cutoff : Tensor
+        Real-space cutoff.
+    chunk_size : int
+        Number of atoms (first index of the triples) evaluated at once.
+    s9 : Tensor, optional
+        Scaling for dispersion coefficients. Defaults to `1.0`.
+    rs9 : Tensor, optional
+        Scaling for van-der-Waals radii in damping function. Defaults to `4.0/3.0`.
+    alp : Tensor, optional
+        Exponent of zero damping function. Defaults to `14.0`.
+    reduce_dtype : torch.dtype | None, optional
+        Floating point dtype for the accumulation of the triple-wise
+        contributions. Defaults to `None`, i.e., the dtype of `positions`.
+
+    Returns
+    -------
+    Tensor
+        Atom-resolved ATM dispersion energy.
+    """
+    dd: DD = {"device": positions.device, "dtype": positions.dtype}
+
+    s9 = s9.type(positions.dtype).to(positions.device)
+    rs9 = rs9.type(positions.dtype).to(positions.device)
+    alp = alp.type(positions.dtype).to(positions.device)
+
+    cutoff2 = cutoff * cutoff
+    srvdw = rs9 * rvdw
+
+    eps = torch.tensor(torch.finfo(positions.dtype).eps, **dd)
+    zero = torch.tensor(0.0, **dd)
+    one = torch.tensor(1.0, **dd)
+
+    # pairwise quantities are only of size (..., nat, nat)
+    mask_pairs = real_pairs(numbers, mask_diagonal=True)
+    distances = torch.pow(
+        torch.where(
+            mask_pairs,
+            distance.cdist(positions, positions),
+            eps,
+        ),
+        2.0,
+    )
+
+    def _block(start: int, end: int) -> Tensor:
+        mask_triples = blocks.real_triples_block(numbers, start, end)
+
+        c6_block = c6[..., start:end, :]
+        c9 = s9 * distance.sqrt(
+            torch.abs(
+                c6_block.unsqueeze(-1) * c6_block.unsqueeze(-2) * c6.unsqueeze(-3)
+            )
+        )
+
+        srvdw_block = srvdw[..., start:end, :]
+        r0 = srvdw_block.unsqueeze(-1) * srvdw_block.unsqueeze(-2) * srvdw.unsqueeze(-3)
+
+        r2ij = distances[..., start:end, :].unsqueeze(-1)
+        r2ik = distances[..., start:end, :].unsqueeze(-2)
+        r2jk = distances.unsqueeze(-3)
+        r2 = r2ij * r2ik * r2jk
+        r1 = torch.sqrt(r2)
+        r3 = torch.where(mask_triples, r1 * r2, eps)
+        r5 = torch.where(mask_triples, r2 * r3, eps)
+
+        base = r0 / torch.where(mask_triples, r1, one)
+        fdamp = torch.where(
+            mask_triples,
+            1.0 / (1.0 + 6.0 * base ** ((alp + 2.0) / 3.0)),
+            zero,
+        )
+
+        s = torch.where(
+            mask_triples,
+            (r2ij + r2jk - r2ik) * (r2ij - r2jk + r2ik) * (-r2ij + r2jk + r2ik),
+            zero,
+        )
+
+        # same cutoff criterion as the dense evaluation
+        ang = torch.where(
+            mask_triples * (r2ij <= cutoff2) * (r2ik <= cutoff2) * (r2jk <= cutoff2),
+            0.375 * s / r5 + 1.0 / r3,
+            zero,
+        )
+
+        energy = ang * fdamp * c9
+        return torch.sum(energy, dim=(-2, -1), dtype=reduce_dtype) / 6.0
+
+    energy = [
+        blocks.checkpoint(_block, start, end)
+        for start, end in blocks.row_blocks(numbers.shape[-1], chunk_size)
+    ]
+    return torch.cat(energy, dim=-1)
+
+
+def _select(
+    x: Tuple[Tensor, Tensor, Tensor], index: Tensor
+) -> Tuple[Tensor, Tensor, Tensor]:
+    """
+    Select the same entries from the quantities of the three pairs.
+    """
+    ab, ac, bc = x
+    return ab[index], ac[index], bc[index]
+
+
+def _dispersion_atm_unique(
+    numbers: Tensor,
+    positions: Tensor,
+    c6: Tensor,
+    rvdw: Tensor,
+    cutoff: Tensor,
+    s9: Tensor = torch.tensor(defaults.S9),
+    rs9: Tensor = torch.tensor(defaults.RS9),
+    alp: Tensor = torch.tensor(defaults.ALP),
+    reduce_dtype: Optional[torch.dtype] = None,
+    threshold: Optional[float] = None,
+    packed: bool = False,
+    stats: Optional[List[ScreeningStats]] = None,
+) -> Tensor:
+    """
+    Axilrod-Teller-Muto dispersion term evaluated for the unique triples
+    (`i < j < k`) only. A third of every triple energy is assigned to each
+    atom of the triple.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system.
+    positions : Tensor
+        Cartesian coordinates of the atoms in the system.
+    c6 : Tensor
+        Atomic C6 dispersion coefficients.
+    rvdw : Tensor
+        Van der Waals radii of the atoms in the system.
+    cutoff : Tensor
+        Real-space cutoff.
+    s9 : Tensor, optional
+        Scaling for dispersion coefficients. Defaults to `1.0`.
+    rs9 : Tensor, optional
+        Scaling for van-der-Waals radii in damping function. Defaults to `4.0/3.0`.
+    alp : Tensor, optional
+        Exponent of zero damping function. Defaults to `14.0`.
+    reduce_dtype : torch.dtype | None, optional
+        Floating point dtype for the accumulation of the triple-wise
+        contributions. Defaults to `None`, i.e., the dtype of `positions`.
+    threshold : float | None, optional
+        Screening threshold for `|C9| / (r_ij r_ik r_jk)³` (see
+        :func:`screen_triples`). Defaults to `None`, i.e., no screening.
+    packed : bool, optional
+        The C6 coefficients are given in packed form. Defaults to `False`.
+    stats : list[ScreeningStats] | None, optional
+        List to which the statistics of the screening (see
+        :class:`ScreeningStats`) are appended. Defaults to `None`.
+
+    Returns
+    -------
+    Tensor
+        Atom-resolved ATM dispersion energy.
+    """
+    dd: DD = {"device": positions.device, "dtype": positions.dtype}
+
+    s9 = s9.type(positions.dtype).to(positions.device)
+    rs9 = rs9.type(positions.dtype).to(positions.device)
+    alp = alp.type(positions.dtype).to(positions.device)
+
+    nat = numbers.shape[-1]
+    i, j, k = torch.combinations(
+        torch.arange(nat, device=positions.device), r=3
+    ).unbind(-1)
+
+    real = numbers != 0
+    mask = real[..., i] & real[..., j] & real[..., k]
+
+    # (..., nat, nat), padding triples get harmless values and are masked
+    one = torch.tensor(1.0, **dd)
+    distances = torch.pow(
+        torch.where(
+            real_pairs(numbers, mask_diagonal=True),
+            distance.cdist(positions, positions),
+            one,
+        ),
+        2.0,
+    )
+
+    def _gather(x: Tensor, packed: bool = False) -> Tuple[Tensor, Tensor, Tensor]:
+        return tuple(
+            torch.where(
+                mask, x[..., packed_index(a, b, nat)] if packed else x[..., a, b], one
+            ).reshape(-1)
+            for a, b in ((i, j), (i, k), (j, k))
+        )  # type: ignore[return-value]
+
+    # flat indices of the atoms of all triples (over the batch)
+    batch = torch.arange(0, numbers.numel(), nat, device=positions.device)
+    atoms = [(batch.unsqueeze(-1) + a).reshape(-1) for a in (i, j, k)]
+
+    r2, rvdw_triples = _gather(distances), _gather(rvdw)
+    c6_triples = _gather(c6, packed=packed)
+    mask = mask.reshape(-1)
+
+    # only evaluate the triples that survive the cutoff and the screening
+    if threshold is not None:
+        # padding triples are moved beyond the cutoff (not counted)
+        inf = torch.tensor(float("inf"), **dd)
+        r2ij, r2ik, r2jk = (torch.where(mask, x, inf) for x in r2)
+        keep, screening = screen_triples(
+            (r2ij, r2ik, r2jk), c6_triples, s9, cutoff, threshold
+        )
+        if stats is not None:
+            stats.append(screening)
+        (sel,) = torch.nonzero(mask & keep, as_tuple=True)
+
+        r2 = _select(r2, sel)
+        c6_triples = _select(c6_triples, sel)
+        rvdw_triples = _select(rvdw_triples, sel)
+        atoms = [a[sel] for a in atoms]
+        mask = mask[sel]
+
+    energy = torch.where(
+        mask,
+        _triple_energy(r2, c6_triples, rvdw_triples, cutoff, s9, rs9, alp),
+        torch.tensor(0.0, **dd),
+    )
+
+    if reduce_dtype is not None:
+        energy = energy.type(reduce_dtype)
+
+    # every triple once, i.e., a third of the triple energy for every atom
+    energy = energy / 3.0
+    e = torch.zeros(numbers.numel(), device=energy.device, dtype=energy.dtype)
+    for a in atoms:
+        e = e.index_add(0, a, energy)
+    return e.reshape(numbers.shape)
+
+
+def _dispersion_atm_pairs(
+    numbers: Tensor,
+    positions: Tensor,
+    c6: Tensor,
+    rvdw: Tensor,
+    cutoff: Tensor,
+    pairs: Tensor,
+    s9: Tensor = torch.tensor(defaults.S9),
+    rs9: Tensor = torch.tensor(defaults.RS9),
+    alp: Tensor = torch.tensor(defaults.ALP),
+    reduce_dtype: Optional[torch.dtype] = None,
+    unique: bool = False,
+    threshold: Optional[float] = None,
+    stats: Optional[List[ScreeningStats]] = None,
+) -> Tensor:
+    """
+    Axilrod-Teller-Muto dispersion term for all triples of a pair list, for
+    which all three pairs are within the cutoff.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system.
+    positions : Tensor
+        Cartesian coordinates of the atoms in the system.
+    c6 : Tensor
+        Atomic C6 dispersion coefficients of shape `(..., nat, nat)` or
+        `(npairs,)`.
+    rvdw : Tensor
+        Van der Waals radii of shape `(..., nat, nat)` or `(npairs,)`.
+    cutoff : Tensor
+        Real-space cutoff.
+    pairs : Tensor
+        Pair list of shape `(2, npairs)` with indices into the flattened atoms.
+    s9 : Tensor, optional
+        Scaling for dispersion coefficients. Defaults to `1.0`.
+    rs9 : Tensor, optional
+        Scaling for van-der-Waals radii in damping function. Defaults to `4.0/3.0`.
+    alp : Tensor, optional
+        Exponent of zero damping function. Defaults to `14.0`.
+    reduce_dtype : torch.dtype | None, optional
+        Floating point dtype for the accumulation of the triple-wise
+        contributions. Defaults to `None`, i.e., the dtype of `positions`.
+    unique : bool, optional
+        Evaluate every triple only once. Defaults to `False`.
+    threshold : float | None, optional
+        Screening threshold for `|C9| / (r_ij r_ik r_jk)³` (see
+        :func:`screen_triples`). Defaults to `None`, i.e., no screening.
+    stats : list[ScreeningStats] | None, optional
+        List to which the statistics of the screening (see
+        :class:`ScreeningStats`) are appended. Defaults to `None`.
+
+    Returns
+    -------
+    Tensor
+        Atom-resolved ATM dispersion energy.
+    """
+    nat = numbers.shape[-1]
+    i, j = pairs[0], pairs[1]
+
+    # gather the pairwise quantities (flat index of the pair in its system)
+    if c6.ndim != 1:
+        c6 = c6.reshape(-1)[i * nat + j % nat]
+    if rvdw.ndim != 1:
+        rvdw = rvdw.reshape(-1)[i * nat + j % nat]
+
+    # only pairs within the cutoff form triples (order of the list is kept)
+    pos = positions.reshape(-1, 3)
+    with torch.no_grad():
+        within = torch.sum((pos[i] - pos[j]) ** 2, dim=-1) <= cutoff * cutoff
+
+    pairs = pairs[:, within]
+    triples = triple_list(pairs, unique=unique)
+
+    return dispersion_atm_triples(
+        numbers,
+        positions,
+        c6[within],
+        rvdw[within],
+        cutoff,
+        pairs,
+        triples,
+        s9=s9,
+        rs9=rs9,
+        alp=alp,
+        reduce_dtype=reduce_dtype,
+        unique=unique,
+        threshold=threshold,
+        stats=stats,
+    )
+
+
+def dispersion_atm_triples(
+    numbers: Tensor,
+    positions: Tensor,
+    c6: Tensor,
+    rvdw: Tensor,
+    cutoff: Tensor,
+    pairs: Tensor,
+    triples: Tensor,
+    s9: Tensor = torch.tensor(defaults.S9),
+    rs9: Tensor = torch.tensor(defaults.RS9),
+    alp: Tensor = torch.tensor(defaults.ALP),
+    reduce_dtype: Optional[torch.dtype] = None,
+    unique: bool = False,
+    threshold: Optional[float] = None,
+    stats: Optional[List[ScreeningStats]] = None,
+) -> Tensor:
+    """
+    Axilrod-Teller-Muto dispersion term evaluated on a triple list. All
+    pairwise quantities are given per pair and the triple energies are
+    scattered back to the first atom of each (ordered) triple or, for unique
+    triples, equally to all three atoms.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system.
+    positions : Tensor
+        Cartesian coordinates of the atoms in the system.
+    c6 : Tensor
+        Atomic C6 dispersion coefficients of shape `(npairs,)`.
+    rvdw : Tensor
+        Van der Waals radii of the atom pairs of shape `(npairs,)`.
+    cutoff : Tensor
+        Real-space cutoff.
+    pairs : Tensor
+        Pair list of shape `(2, npairs)` with indices into the flattened atoms
+        (see :func:`tad_dftd3.neighbor.neighbor_list`).
+    triples : Tensor
+        Triple list of shape `(3, ntriples)` with indices into the pair list
+        (see :func:`tad_dftd3.neighbor.triple_list`).
+    s9 : Tensor, optional
+        Scaling for dispersion coefficients. Defaults to `1.0`.
+    rs9 : Tensor, optional
+        Scaling for van-der-Waals radii in damping function. Defaults to `4.0/3.0`.
+    alp : Tensor, optional
+        Exponent of zero damping function. Defaults to `14.0`.
+    reduce_dtype : torch.dtype | None, optional
+        Floating point dtype for the accumulation of the triple-wise
+        contributions. Defaults to `None`, i.e., the dtype of `positions`.
+    unique : bool, optional
+        The triple list contains every triple only once (see
+        :func:`tad_dftd3.neighbor.triple_list`). Defaults to `False`.
+    threshold : float | None, optional
+        Screening threshold for `|C9| / (r_ij r_ik r_jk)³` (see
+        :func:`screen_triples`). Defaults to `None`, i.e., no screening.
+    stats : list[ScreeningStats] | None, optional
+        List to which the statistics of the screening (see
+        :class:`ScreeningStats`) are appended. Defaults to `None`.
+
+    Returns
+    -------
+    Tensor
+        Atom-resolved ATM dispersion energy.
+    """
+    s9 = s9.type(positions.dtype).to(positions.device)
+    rs9 = rs9.type(positions.dtype).to(positions.device)
+    alp = alp.type(positions.dtype).to(positions.device)
+
+    ab, ac, bc = triples[0], triples[1], triples[2]
+
+    pos = positions.reshape(-1, 3)
+    r2 = torch.sum((pos[pairs[0]] - pos[pairs[1]]) ** 2, dim=-1)
+
+    # only evaluate the triples that survive the screening
+    if threshold is not None:
+        keep, screening = screen_triples(
+            (r2[ab], r2[ac], r2[bc]),
+            (c6[ab], c6[ac], c6[bc]),
+            s9,
+            cutoff,
+            threshold,
+            weight=1.0 if unique is True else 1.0 / 6.0,
+        )
+        if stats is not None:
+            stats.append(screening)
+        ab, ac, bc = ab[keep], ac[keep], bc[keep]
+
+    energy = _triple_energy(
+        (r2[ab], r2[ac], r2[bc]),
+        (c6[ab], c6[ac], c6[bc]),
+        (rvdw[ab], rvdw[ac], rvdw[bc]),
+        cutoff,
+        s9,
+        rs9,
+        alp,
+    )
+
+    if reduce_dtype is not None:
+        energy = energy.type(reduce_dtype)
+
+    e = torch.zeros(numbers.numel(), device=energy.device, dtype=energy.dtype)
+    if unique is False:
+        return e.index_add(0, pairs[0, ab], energy / 6.0).reshape(numbers.shape)
+
+    # every triple once, i.e., a third of the triple energy for every atom
+    energy = energy / 3.0
+    for atoms in (pairs[0, ab], pairs[1, ab], pairs[1, ac]):
+        e = e.index_add(0, atoms, energy)
+    return e.reshape(numbers.shape)
+
+
+def screen_triples(
+    r2: Tuple[Tensor, Tensor, Tensor],
+    c6: Tuple[Tensor, Tensor, Tensor],
+    s9: Tensor,
+    cutoff: Tensor,
+    threshold: float,
+    weight: float = 1.0,
+) -> Tuple[Tensor, ScreeningStats]:
+    """
+    Screening of triples `ABC` by the magnitude of the ATM term.
+
+    The angular term `3 cos(a) cos(b) cos(c) + 1` lies between `-2` and `11/8`
+    and the zero damping is at most one. Hence, the energy of a triple is
+    bounded by `2 |C9| / (r_AB r_AC r_BC)³`, which only requires the C6
+    coefficients and distances. Triples within the cutoff with
+    `|C9| / (r_AB r_AC r_BC)³` below the threshold are skipped. The number of
+    skipped triples and the resulting upper bound for the error of the total
+    energy are returned (and logged at debug level).
+
+    Parameters
+    ----------
+    r2 : tuple[Tensor, Tensor, Tensor]
+        Squared distances of the pairs `AB`, `AC` and `BC`.
+    c6 : tuple[Tensor, Tensor, Tensor]
+        C6 dispersion coefficients of the pairs `AB`, `AC` and `BC`.
+    s9 : Tensor
+        Scaling for dispersion coefficients.
+    cutoff : Tensor
+        Real-space cutoff.
+    threshold : float
+        Screening threshold for `|C9| / (r_AB r_AC r_BC)³` in Hartree.
+    weight : float, optional
+        Weight of every triple in the total energy for the error bound, e.g.,
+        `1/6` for all orderings of the triples. Defaults to `1.0`.
+
+    Returns
+    -------
+    tuple[Tensor, ScreeningStats]
+        Mask of the triples to evaluate, i.e., within the cutoff and not
+        screened, and the statistics of the screening.
+    """
+    with torch.no_grad():
+        cutoff2 = cutoff * cutoff
+        within = (r2[0] <= cutoff2) & (r2[1] <= cutoff2) & (r2[2] <= cutoff2)
+
+        bound = torch.abs(s9) * torch.sqrt(
+            torch.abs(c6[0] * c6[1] * c6[2]) / (r2[0] * r2[1] * r2[2]) ** 3
+        )
+        skip = within & (bound < threshold)
+
+        stats = ScreeningStats(
+            skipped=skip.sum(),
+            triples=within.sum(),
+            error=2.0 * weight * torch.sum(torch.where(skip, bound, 0.0)),
+        )
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "ATM screening (threshold %.1e): skipped %d of %d triples, "
+                "energy error <= %.3e Eh",
+                threshold,
+                int(stats.skipped),
+                int(stats.triples),
+                float(stats.error),
+            )
+
+        return within & ~skip, stats
+
+
+def _triple_energy(
+    r2: Tuple[Tensor, Tensor, Tensor],
+    c6: Tuple[Tensor, Tensor, Tensor],
+    rvdw: Tuple[Tensor, Tensor, Tensor],
+    cutoff: Tensor,
+    s9: Tensor,
+    rs9: Tensor,
+    alp: Tensor,
+) -> Tensor:
+    """
+    ATM energy of triples `ABC` from the pairwise quantities of the pairs
+    `AB`, `AC` and `BC`. Triples with any pair beyond the cutoff vanish.
+
+    Parameters
+    ----------
+    r2 : tuple[Tensor, Tensor, Tensor]
+        Squared distances of the pairs.
+    c6 : tuple[Tensor, Tensor, Tensor]
+        C6 dispersion coefficients of the pairs.
+    rvdw : tuple[Tensor, Tensor, Tensor]
+        Van der Waals radii of the pairs.
+    cutoff : Tensor
+        Real-space cutoff.
+    s9, rs9, alp : Tensor
+        Parameters of the ATM term.
+
+    Returns
+    -------
+    Tensor
+        Energy of every triple.
+    """
+    r2ij, r2ik, r2jk = r2
+
+    # C9_ABC = s9 * sqrt(|C6_AB * C6_AC * C6_BC|)
+    c9 = s9 * torch.sqrt(torch.abs(c6[0] * c6[1] * c6[2]))
+
+    r0 = (rs9 * rvdw[0]) * (rs9 * rvdw[1]) * (rs9 * rvdw[2])
+
+    r2abc = r2ij * r2ik * r2jk
+    r1 = torch.sqrt(r2abc)
+    r3 = r1 * r2abc
+    r5 = r2abc * r3
+
+    fdamp = 1.0 / (1.0 + 6.0 * (r0 / r1) ** ((alp + 2.0) / 3.0))
+
+    s = (r2ij + r2jk - r2ik) * (r2ij - r2jk + r2ik) * (-r2ij + r2jk + r2ik)
+    ang = 0.375 * s / r5 + 1.0 / r3
+
+    cutoff2 = cutoff * cutoff
+    return torch.where(
+        (r2ij <= cutoff2) * (r2ik <= cutoff2) * (r2jk <= cutoff2),
+        ang * fdamp * c9,
+        torch.tensor(0.0, device=r1.device, dtype=r1.dtype),
+    )
+
+
+# three-body energy with analytical gradient
+
+
+def dispersion3_atm(
+    numbers: Tensor,
+    positions: Tensor,
+    c6: Tensor,
+    rvdw: Tensor,
+    cutoff: Tensor,
+    s9: Tensor = torch.tensor(defaults.S9),
+    rs9: Tensor = torch.tensor(defaults.RS9),
+    alp: Tensor = torch.tensor(defaults.ALP),
+    chunk_size: Optional[int] = None,
+) -> Tensor:
+    """
+    Axilrod-Teller-Muto dispersion term with an analytical gradient.
+
+    Contrary to plain autograd, none of the `(..., nat, nat, nat)`
+    intermediates are kept alive for the backward pass. Only the inputs are
+    saved and the triple-wise quantities are recomputed (in blocks of the
+    first atom) in the backward pass. The backward pass is itself
+    differentiable, i.e., higher derivatives are available.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system of shape `(..., nat)`.
+    positions : Tensor
+        Cartesian coordinates of the atoms in the system of shape
+        `(..., nat, 3)`.
+    c6 : Tensor
+        Atomic C6 dispersion coefficients of shape `(..., nat, nat)`.
+    rvdw : Tensor
+        Van der Waals radii of the atom pairs of shape `(..., nat, nat)`.
+    cutoff : Tensor
+        Real-space cutoff.
+    s9 : Tensor, optional
+        Scaling for dispersion coefficients. Defaults to `1.0`.
+    rs9 : Tensor, optional
+        Scaling for van-der-Waals radii in damping function. Defaults to `4.0/3.0`.
+    alp : Tensor, optional
+        Exponent of zero damping function. Defaults to `14.0`.
+    chunk_size : int | None, optional
+        Number of atoms (first index of the triples) evaluated at once in the
+        forward and backward pass. Defaults to `None`, i.e., all atoms.
+
+    Returns
+    -------
+    Tensor
+        Atom-resolved ATM dispersion energy of shape `(..., nat)`.
+    """
+    s9 = s9.type(positions.dtype).to(positions.device)
+    rs9 = rs9.type(positions.dtype).to(positions.device)
+    alp = alp.type(positions.dtype).to(positions.device)
+
+    DispersionATM = DispersionATM_V1 if __tversion__ < (2, 0, 0) else DispersionATM_V2
+    res = DispersionATM.apply(
+        numbers, positions, c6, rvdw, cutoff, s9, rs9, alp, chunk_size
+    )
+    assert res is not None
+    return res
+
+
+def _distances(numbers: Tensor, positions: Tensor) -> Tensor:
+    """
+    Squared distances of all atom pairs (`eps` for the diagonal and padding).
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system.
+    positions : Tensor
+        Cartesian coordinates of the atoms in the system.
+
+    Returns
+    -------
+    Tensor
+        Squared distances.
+    """
+    eps = torch.tensor(
+        torch.finfo(positions.dtype).eps,
+        device=positions.device,
+        dtype=positions.dtype,
+    )
+
+    mask = real_pairs(numbers, mask_diagonal=True)
+    return torch.pow(
+        torch.where(mask, distance.cdist(positions, positions), eps), 2.0
+    )
+
+
+def _triples(
+    numbers: Tensor,
+    distances: Tensor,
+    c6: Tensor,
+    srvdw: Tensor,
+    cutoff2: Tensor,
+    alp: Tensor,
+    start: int,
+    end: int,
+) -> Tuple[Tensor, ...]:
+    """
+    Triple-wise quantities of the ATM term for a block of the first atom.
+    Outside of the mask, all quantities are finite and the damping and
+    angular terms vanish.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system.
+    distances : Tensor
+        Squared distances of all atom pairs.
+    c6 : Tensor
+        Atomic C6 dispersion coefficients.
+    srvdw : Tensor
+        Scaled van der Waals radii of all atom pairs.
+    cutoff2 : Tensor
+        Squared real-space cutoff.
+    alp : Tensor
+        Exponent of zero damping function.
+    start : int
+        First atom of the block.
+    end : int
+        End of the block (exclusive).
+
+    Returns
+    -------
+    tuple[Tensor, ...]
+        Mask of interacting triples, squared distances (ij, ik, jk), product
+        of the C6 coefficients, product of the radii, powers of the distances
+        (r³, r⁵), damping and angular term.
+    """
+    zero = torch.tensor(0.0, device=distances.device, dtype=distances.dtype)
+    one = torch.tensor(1.0, device=distances.device, dtype=distances.dtype)
+
+    r2ij = distances[..., start:end, :].unsqueeze(-1)
+    r2ik = distances[..., start:end, :].unsqueeze(-2)
+    r2jk = distances.unsqueeze(-3)
+
+    # same cutoff criterion as the dense evaluation
+    mask = blocks.real_triples_block(numbers, start, end)
+    mask = mask * (r2ij <= cutoff2) * (r2ik <= cutoff2) * (r2jk <= cutoff2)
+
+    c6_block = c6[..., start:end, :]
+    q = c6_block.unsqueeze(-1) * c6_block.unsqueeze(-2) * c6.unsqueeze(-3)
+
+    srvdw_block = srvdw[..., start:end, :]
+    r0 = srvdw_block.unsqueeze(-1) * srvdw_block.unsqueeze(-2) * srvdw.unsqueeze(-3)
+    r0 = torch.where(mask, r0, one)
+
+    r2 = torch.where(mask, r2ij * r2ik * r2jk, one)
+    r1 = torch.sqrt(r2)
+    r3 = r1 * r2
+    r5 = r2 * r3
+
+    fdamp = torch.where(
+        mask, 1.0 / (1.0 + 6.0 * (r0 / r1) ** ((alp + 2.0) / 3.0)), zero
+    )
+
+    s = (r2ij + r2jk - r2ik) * (r2ij - r2jk + r2ik) * (-r2ij + r2jk + r2ik)
+    ang = torch.where(mask, 0.375 * s / r5 + 1.0 / r3, zero)
+
+    return mask, r2ij, r2ik, r2jk, q, r0, r1, r3, r5, fdamp, ang
+
+
+def _energy(
+    numbers: Tensor,
+    positions: Tensor,
+    c6: Tensor,
+    rvdw: Tensor,
+    cutoff: Tensor,
+    s9: Tensor,
+    rs9: Tensor,
+    alp: Tensor,
+    chunk_size: Optional[int],
+) -> Tensor:
+    """
+    Axilrod-Teller-Muto dispersion energy (blocks of the first atom).
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system.
+    positions : Tensor
+        Cartesian coordinates of the atoms in the system.
+    c6 : Tensor
+        Atomic C6 dispersion coefficients.
+    rvdw : Tensor
+        Van der Waals radii of the atom pairs.
+    cutoff : Tensor
+        Real-space cutoff.
+    s9, rs9, alp : Tensor
+        Parameters of the ATM term.
+    chunk_size : int | None
+        Number of atoms (first index of the triples) evaluated at once.
+
+    Returns
+    -------
+    Tensor
+        Atom-resolved ATM dispersion energy.
+    """
+    nat = numbers.shape[-1]
+    distances = _distances(numbers, positions)
+
+    energy = []
+    for start, end in blocks.row_blocks(nat, nat if chunk_size is None else chunk_size):
+        _, _, _, _, q, _, _, _, _, fdamp, ang = _triples(
+            numbers, distances, c6, rs9 * rvdw, cutoff * cutoff, alp, start, end
+        )
+        e = ang * fdamp * s9 * distance.sqrt(torch.abs(q))
+        energy.append(torch.sum(e, dim=(-2, -1)) / 6.0)
+
+    return torch.cat(energy, dim=-1)
+
+
+def _product_grad(g: Tensor, x: Tensor, start: int, end: int) -> Tuple[Tensor, Tensor]:
+    """
+    Vector-Jacobian product of the triple-wise product `x_ij * x_ik * x_jk`
+    w.r.t. the pairwise quantity `x`.
+
+    Parameters
+    ----------
+    g : Tensor
+        Gradient w.r.t. the product for a block of the first atom.
+    x : Tensor
+        Pairwise quantity of shape `(..., nat, nat)`.
+    start : int
+        First atom of the block.
+    end : int
+        End of the block (exclusive).
+
+    Returns
+    -------
+    tuple[Tensor, Tensor]
+        Contributions to the rows `start:end` (from ij and ik) and to all
+        entries (from jk).
+    """
+    x_block = x[..., start:end, :]
+    gij = torch.sum(g * x_block.unsqueeze(-2) * x.unsqueeze(-3), dim=-1)
+    gik = torch.sum(g * x_block.unsqueeze(-1) * x.unsqueeze(-3), dim=-2)
+    gjk = torch.sum(g * x_block.unsqueeze(-1) * x_block.unsqueeze(-2), dim=-3)
+    return gij + gik, gjk
+
+
+class CTX(Protocol):
+    save_for_backward: Callable[..., None]
+    saved_tensors: Tuple[Tensor, ...]
+    needs_input_grad: Tuple[bool, ...]
+    chunk_size: Optional[int]
+
+
+class DispersionATMBase(torch.autograd.Function):
+    """
+    Base class for the version-specific autograd function for the ATM
+    dispersion energy.
+    Different PyTorch versions only require different `forward()` signatures.
+    """
+
+    @staticmethod
+    def backward(ctx: CTX, grad_out: Tensor) -> Tuple[Optional[Tensor], ...]:
+        numbers, positions, c6, rvdw, cutoff, s9, rs9, alp = ctx.saved_tensors
+        needs = ctx.needs_input_grad
+        nat = numbers.shape[-1]
+        chunk_size = nat if ctx.chunk_size is None else ctx.chunk_size
+
+        eps = torch.finfo(positions.dtype).eps
+        zero = torch.tensor(0.0, device=positions.device, dtype=positions.dtype)
+
+        # We need the derivatives of the following expression:
+        # E_i = 1/6 ∑_jk c9_ijk ang_ijk fdamp_ijk
+        # with c9 = s9 sqrt(|c6_ij c6_ik c6_jk|), fdamp = 1 / (1 + 6 base^p),
+        # base = r0_ijk / sqrt(P), p = (alp + 2) / 3, P = r²_ij r²_ik r²_jk,
+        # ang = 3/8 s P^(-5/2) + P^(-3/2) and s the product of the three
+        # (r²_ij ± r²_ik ± r²_jk) terms
+
+        distances = _distances(numbers, positions)
+        srvdw = rs9 * rvdw
+        p = (alp + 2.0) / 3.0
+
+        # gradients w.r.t. the pairwise quantities (rows and jk contributions)
+        g_r2: list[Tensor] = []
+        g_c6: list[Tensor] = []
+        g_srvdw: list[Tensor] = []
+        g_r2_jk = g_c6_jk = g_srvdw_jk = zero
+        g_s9 = g_alp = zero
+
+        for start, end in blocks.row_blocks(nat, chunk_size):
+            mask, r2ij, r2ik, r2jk, q, r0, r1, r3, r5, fdamp, ang = _triples(
+                numbers, distances, c6, srvdw, cutoff * cutoff, alp, start, end
+            )
+
+            # vjp prefactor of every triple (i, j, k) from the energy of atom i
+            g = torch.where(mask, grad_out[..., start:end, None, None] / 6.0, zero)
+
+            sq = distance.sqrt(torch.abs(q))
+            gc9 = g * s9 * sq
+
+            # ∂fdamp/∂ln(base) = -6 p base^p fdamp²
+            dfdamp = -6.0 * p * (r0 / r1) ** p * fdamp * fdamp
+
+            if needs[1]:
+                u = r2ij + r2jk - r2ik
+                v = r2ij - r2jk + r2ik
+                w = -r2ij + r2jk + r2ik
+
+                # ∂(ang fdamp)/∂ln(P) with base ∝ P^(-1/2) and ∂(ang fdamp)/∂s
+                dlnp = gc9 * (
+                    fdamp * (-0.9375 * u * v * w / r5 - 1.5 / r3) - 0.5 * ang * dfdamp
+                )
+                ds = gc9 * fdamp * 0.375 / r5
+
+                g_ij = ds * (v * w + u * w - u * v) + dlnp / r2ij
+                g_ik = ds * (u * w - v * w + u * v) + dlnp / r2ik
+                g_jk = ds * (v * w - u * w + u * v) + dlnp / r2jk
+                g_r2.append(g_ij.sum(-1) + g_ik.sum(-2))
+                g_r2_jk = g_r2_jk + g_jk.sum(-3)
+
+            if needs[2]:
+                # ∂sqrt(|q|)/∂q = sign(q) / (2 sqrt(|q|)) (clamped as forward)
+                g_q = torch.where(
+                    torch.abs(q) > eps,
+                    g * s9 * ang * fdamp * torch.sign(q) * 0.5 / sq,
+                    zero,
+                )
+                rows, jk = _product_grad(g_q, c6, start, end)
+                g_c6.append(rows)
+                g_c6_jk = g_c6_jk + jk
+
+            if needs[3] or needs[6]:
+                # ∂fdamp/∂r0 = ∂fdamp/∂ln(base) / r0
+                rows, jk = _product_grad(gc9 * ang * dfdamp / r0, srvdw, start, end)
+                g_srvdw.append(rows)
+                g_srvdw_jk = g_srvdw_jk + jk
+
+            if needs[5]:
+                g_s9 = g_s9 + torch.sum(g * sq * ang * fdamp)
+
+            if needs[7]:
+                # ∂fdamp/∂alp = ∂fdamp/∂ln(base) ln(base) / (3 p)
+                g_alp = g_alp + torch.sum(gc9 * ang * dfdamp * torch.log(r0 / r1) / p)
+
+        grads: list[Optional[Tensor]] = [None] * 9
+
+        if needs[1]:
+            # ∂r²_ij/∂R_i = 2 (R_i - R_j)
+            w = torch.cat(g_r2, dim=-2) + g_r2_jk
+            w = 2.0 * (w + w.mT)
+            grads[1] = w.sum(-1, keepdim=True) * positions - w @ positions
+
+        if needs[2]:
+            grads[2] = torch.cat(g_c6, dim=-2) + g_c6_jk
+
+        if needs[3] or needs[6]:
+            g_srvdw_all = torch.cat(g_srvdw, dim=-2) + g_srvdw_jk
+            if needs[3]:
+                grads[3] = rs9 * g_srvdw_all
+            if needs[6]:
+                grads[6] = torch.sum(g_srvdw_all * rvdw).sum_to_size(rs9.shape)
+
+        if needs[5]:
+            grads[5] = g_s9.sum_to_size(s9.shape)
+        if needs[7]:
+            grads[7] = (g_alp / 3.0).sum_to_size(alp.shape)
+
+        return tuple(grads)
+
+
+class DispersionATM_V1(DispersionATMBase):
+    """
+    Custom autograd function for the ATM dispersion energy. This is supposed
+    to reduce memory usage.
+    """
+
+    @staticmethod
+    def forward(
+        ctx: CTX,
+        numbers: Tensor,
+        positions: Tensor,
+        c6: Tensor,
+        rvdw: Tensor,
+        cutoff: Tensor,
+        s9: Tensor,
+        rs9: Tensor,
+        alp: Tensor,
+        chunk_size: Optional[int],
+    ) -> Tensor:
+        ctx.save_for_backward(numbers, positions, c6, rvdw, cutoff, s9, rs9, alp)
+        ctx.chunk_size = chunk_size
+        return _energy(numbers, positions, c6, rvdw, cutoff, s9, rs9, alp, chunk_size)
+
+
+class DispersionATM_V2(DispersionATMBase):
+    """
+    Custom autograd function for the ATM dispersion energy. This is supposed
+    to reduce memory usage.
+    """
+
+    generate_vmap_rule = True
+    # https://pytorch.org/docs/master/notes/extending.func.html#automatically-generate-a-vmap-rule
+    # should work since we only use PyTorch operations
+
+    @staticmethod
+    def forward(
+        numbers: Tensor,
+        positions: Tensor,
+        c6: Tensor,
+        rvdw: Tensor,
+        cutoff: Tensor,
+        s9: Tensor,
+        rs9: Tensor,
+        alp: Tensor,
+        chunk_size: Optional[int],
+    ) -> Tensor:
+        return _energy(numbers, positions, c6, rvdw, cutoff, s9, rs9, alp, chunk_size)
+
+    @staticmethod
+    def setup_context(
+        ctx: CTX,
+        inputs: Tuple[
+            Tensor,
+            Tensor,
+            Tensor,
+            Tensor,
+            Tensor,
+            Tensor,
+            Tensor,
+            Tensor,
+            Optional[int],
+        ],
+        output: Tensor,
+    ) -> None:
+        numbers, positions, c6, rvdw, cutoff, s9, rs9, alp, chunk_size = inputs
+
+        ctx.save_for_backward(numbers, positions, c6, rvdw, cutoff, s9, rs9, alp)
+        ctx.chunk_size = chunk_size
@@ -0,0 +1,89 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Multi-order damping
+===================
+
+Evaluation of the damping function for several orders (e.g. C6 and C8 terms)
+in one pass.
+
+Damping functions with a fused multi-order implementation are registered in
+:data:`MULTI_ORDER_DAMPING`. All other (user-supplied) damping functions are
+evaluated once per order.
+
+Example
+-------
+>>> import torch
+>>> from tad_dftd3.damping import multi_order_damping, rational_damping
+>>> distances = torch.tensor([2.0, 3.0])
+>>> qq = torch.tensor([20.0, 30.0])
+>>> param = {"a1": torch.tensor(0.4), "a2": torch.tensor(5.0)}
+>>> t6, t8 = multi_order_damping(rational_damping, (6, 8), distances, qq, param)
+"""
+from __future__ import annotations
+
+from typing import Dict, Tuple
+
+from ..typing import Any, DampingFunction, MultiOrderDampingFunction, Tensor
+from .rational import rational_damping, rational_damping_multi
+
+__all__ = ["MULTI_ORDER_DAMPING", "multi_order_damping"]
+
+
+MULTI_ORDER_DAMPING: Dict[DampingFunction, MultiOrderDampingFunction] = {
+    rational_damping: rational_damping_multi,
+}
+"""Fused multi-order implementations of the damping functions."""
+
+
+def multi_order_damping(
+    damping_function: DampingFunction,
+    orders: Tuple[int, ...],
+    distances: Tensor,
+    qq: Tensor,
+    param: Dict[str, Tensor],
+    **kwargs: Any,
+) -> Tuple[Tensor, ...]:
+    """
+    Evaluate a damping function for several orders. If a fused implementation
+    is registered for the damping function, intermediates are shared between
+    the orders. Otherwise, the damping function is called for every order.
+
+    Parameters
+    ----------
+    damping_function : Callable
+        Damping function evaluate distance dependent contributions.
+        Additional arguments are passed through to the function.
+    orders : tuple[int, ...]
+        Orders of the dispersion interaction, e.g. `(6, 8)`.
+    distances : Tensor
+        Pairwise distances between atoms in the system.
+    qq : Tensor
+        Quotient of C8 and C6 dispersion coefficients.
+    param : dict[str, Tensor]
+        DFT-D3 damping parameters.
+
+    Returns
+    -------
+    tuple[Tensor, ...]
+        Values of the damping function for each order.
+    """
+    multi = MULTI_ORDER_DAMPING.get(damping_function, None)
+    if multi is not None:
+        return multi(orders, distances, qq, param, **kwargs)
+
+    return tuple(
+        damping_function(order, distances, qq, param, **kwargs) for order in orders
+    )
@@ -25,14 +25,18 @@ damping.
     \dfrac{R^n_{\text{AB}}}{R^n_{\text{AB}} +
     \left( a_1 R_0^{\text{AB}} + a_2 \right)^n}
 """
-from typing import Dict
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
 
 import torch
+from tad_mctc._version import __tversion__
+from tad_mctc.batch import real_pairs
 
-from .. import defaults
-from ..typing import DD, Tensor
+from .. import defaults, distance
+from ..typing import DD, Callable, Protocol, Tensor
 
-__all__ = ["rational_damping"]
+__all__ = ["dispersion2_rational", "rational_damping", "rational_damping_multi"]
 
 
 def rational_damping(
@@ -66,3 +70,301 @@ def rational_damping(
     a1 = param.get("a1", torch.tensor(defaults.A1, **dd))
     a2 = param.get("a2", torch.tensor(defaults.A2, **dd))
     return 1.0 / (distances.pow(order) + (a1 * torch.sqrt(qq) + a2).pow(order))
+
+
+def rational_damping_multi(
+    orders: Tuple[int, ...],
+    distances: Tensor,
+    qq: Tensor,
+    param: Dict[str, Tensor],
+) -> Tuple[Tensor, ...]:
+    """
+    Rational damped dispersion interaction between pairs for several orders at
+    once. The critical radius is only evaluated once and shared between all
+    orders.
+
+    Parameters
+    ----------
+    orders : tuple[int, ...]
+        Orders of the dispersion interaction, e.g. `(6, 8)`.
+    distances : Tensor
+        Pairwise distances between atoms in the system.
+    qq : Tensor
+        Quotient of C8 and C6 dispersion coefficients.
+    param : dict[str, Tensor]
+        DFT-D3 damping parameters.
+
+    Returns
+    -------
+    tuple[Tensor, ...]
+        Values of the damping function for each order.
+    """
+    dd: DD = {"device": distances.device, "dtype": distances.dtype}
+
+    a1 = param.get("a1", torch.tensor(defaults.A1, **dd))
+    a2 = param.get("a2", torch.tensor(defaults.A2, **dd))
+    r0 = a1 * torch.sqrt(qq) + a2
+
+    return tuple(1.0 / (distances.pow(order) + r0.pow(order)) for order in orders)
+
+
+# two-body energy with analytical gradient
+
+
+def dispersion2_rational(
+    numbers: Tensor,
+    positions: Tensor,
+    param: Dict[str, Tensor],
+    c6: Tensor,
+    r4r2: Tensor,
+    cutoff: Tensor,
+) -> Tensor:
+    """
+    Two-body dispersion energy with rational damping and an analytical
+    gradient.
+
+    Contrary to plain autograd, none of the `(..., nat, nat)` intermediates
+    are kept alive for the backward pass. Only the inputs are saved and the
+    pairwise quantities are recomputed in the backward pass. The backward pass
+    is itself differentiable, i.e., higher derivatives are available.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system of shape `(..., nat)`.
+    positions : Tensor
+        Cartesian coordinates of the atoms in the system of shape
+        `(..., nat, 3)`.
+    param : dict[str, Tensor]
+        DFT-D3 damping parameters.
+    c6 : Tensor
+        Atomic C6 dispersion coefficients of shape `(..., nat, nat)`.
+    r4r2 : Tensor
+        r⁴ over r² expectation values of the atoms in the system.
+    cutoff : Tensor
+        Real-space cutoff.
+
+    Returns
+    -------
+    Tensor
+        Atom-resolved two-body dispersion energy of shape `(..., nat)`.
+    """
+    dd: DD = {"device": positions.device, "dtype": positions.dtype}
+
+    s6 = param.get("s6", torch.tensor(defaults.S6, **dd))
+    s8 = param.get("s8", torch.tensor(defaults.S8, **dd))
+    a1 = param.get("a1", torch.tensor(defaults.A1, **dd))
+    a2 = param.get("a2", torch.tensor(defaults.A2, **dd))
+
+    Dispersion2 = Dispersion2_V1 if __tversion__ < (2, 0, 0) else Dispersion2_V2
+    res = Dispersion2.apply(numbers, positions, c6, r4r2, cutoff, s6, s8, a1, a2)
+    assert res is not None
+    return res
+
+
+def _pairs(
+    numbers: Tensor, positions: Tensor, r4r2: Tensor, cutoff: Tensor
+) -> Tuple[Tensor, Tensor, Tensor]:
+    """
+    Pairwise quantities of the two-body term.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system.
+    positions : Tensor
+        Cartesian coordinates of the atoms in the system.
+    r4r2 : Tensor
+        r⁴ over r² expectation values of the atoms in the system.
+    cutoff : Tensor
+        Real-space cutoff.
+
+    Returns
+    -------
+    tuple[Tensor, Tensor, Tensor]
+        Mask of interacting pairs, distances and quotient of C8 and C6.
+    """
+    eps = torch.tensor(
+        torch.finfo(positions.dtype).eps,
+        device=positions.device,
+        dtype=positions.dtype,
+    )
+
+    mask = real_pairs(numbers, mask_diagonal=True)
+    distances = torch.where(mask, distance.cdist(positions, positions), eps)
+    mask = mask * (distances <= cutoff)
+
+    qq = 3 * r4r2.unsqueeze(-1) * r4r2.unsqueeze(-2)
+    return mask, distances, qq
+
+
+def _energy(
+    numbers: Tensor,
+    positions: Tensor,
+    c6: Tensor,
+    r4r2: Tensor,
+    cutoff: Tensor,
+    s6: Tensor,
+    s8: Tensor,
+    a1: Tensor,
+    a2: Tensor,
+) -> Tensor:
+    """
+    Two-body dispersion energy with rational damping.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system.
+    positions : Tensor
+        Cartesian coordinates of the atoms in the system.
+    c6 : Tensor
+        Atomic C6 dispersion coefficients.
+    r4r2 : Tensor
+        r⁴ over r² expectation values of the atoms in the system.
+    cutoff : Tensor
+        Real-space cutoff.
+    s6, s8, a1, a2 : Tensor
+        DFT-D3 damping parameters.
+
+    Returns
+    -------
+    Tensor
+        Atom-resolved two-body dispersion energy.
+    """
+    mask, distances, qq = _pairs(numbers, positions, r4r2, cutoff)
+
+    r0 = a1 * torch.sqrt(qq) + a2
+    f6 = 1.0 / (distances.pow(6) + r0.pow(6))
+    f8 = 1.0 / (distances.pow(8) + r0.pow(8))
+
+    e = torch.where(
+        mask,
+        s6 * c6 * f6 + s8 * c6 * qq * f8,
+        torch.tensor(0.0, device=positions.device, dtype=positions.dtype),
+    )
+    return -0.5 * torch.sum(e, dim=-1)
+
+
+class CTX(Protocol):
+    save_for_backward: Callable[..., None]
+    saved_tensors: Tuple[Tensor, ...]
+    needs_input_grad: Tuple[bool, ...]
+
+
+class Dispersion2Base(torch.autograd.Function):
+    """
+    Base class for the version-specific autograd function for the two-body
+    dispersion energy with rational damping.
+    Different PyTorch versions only require different `forward()` signatures.
+    """
+
+    @staticmethod
+    def backward(ctx: CTX, grad_out: Tensor) -> Tuple[Optional[Tensor], ...]:
+        numbers, positions, c6, r4r2, cutoff, s6, s8, a1, a2 = ctx.saved_tensors
+        needs = ctx.needs_input_grad
+        zero = torch.tensor(0.0, device=positions.device, dtype=positions.dtype)
+
+        # We need the derivatives of the following expression:
+        # E_i = -1/2 ∑_j c6_ij (s6 * f6_ij + s8 * qq_ij * f8_ij)
+        # with f_n = 1 / (r_ij^n + r0_ij^n) and r0_ij = a1 * sqrt(qq_ij) + a2
+
+        mask, distances, qq = _pairs(numbers, positions, r4r2, cutoff)
+        sqrtqq = torch.sqrt(torch.where(mask, qq, zero + 1.0))
+        r0 = a1 * sqrtqq + a2
+        f6 = 1.0 / (distances.pow(6) + r0.pow(6))
+        f8 = 1.0 / (distances.pow(8) + r0.pow(8))
+
+        # vjp prefactor of every pair (i, j) from the energy of atom i
+        g = torch.where(mask, -0.5 * grad_out.unsqueeze(-1), zero)
+
+        # ∂f_n/∂x = -n * x^(n-1) * f_n² for x = r, r0
+        df6 = -6.0 * s6 * f6 * f6
+        df8 = -8.0 * s8 * qq * f8 * f8
+
+        # derivative w.r.t. the critical radius (shared by a1, a2 and r4r2)
+        g_r0 = g * c6 * (df6 * r0.pow(5) + df8 * r0.pow(7))
+
+        grads: list[Optional[Tensor]] = [None] * 9
+
+        if needs[1]:
+            # ∂E/∂R_i = ∑_j (w_ij + w_ji) (R_i - R_j) / r_ij
+            w = g * c6 * (df6 * distances.pow(5) + df8 * distances.pow(7))
+            w = (w + w.mT) / distances
+            grads[1] = w.sum(-1, keepdim=True) * positions - w @ positions
+
+        if needs[2]:
+            grads[2] = g * (s6 * f6 + s8 * qq * f8)
+
+        if needs[3]:
+            # ∂qq_ij/∂r4r2_i = 3 * r4r2_j and ∂r0_ij/∂qq_ij = a1 / (2 sqrt(qq))
+            g_qq = g * c6 * s8 * f8 + g_r0 * a1 * 0.5 / sqrtqq
+            g_qq = g_qq + g_qq.mT
+            grads[3] = 3.0 * (g_qq @ r4r2.unsqueeze(-1)).squeeze(-1)
+
+        if needs[5]:
+            grads[5] = torch.sum(g * c6 * f6).sum_to_size(s6.shape)
+        if needs[6]:
+            grads[6] = torch.sum(g * c6 * qq * f8).sum_to_size(s8.shape)
+        if needs[7]:
+            grads[7] = torch.sum(g_r0 * sqrtqq).sum_to_size(a1.shape)
+        if needs[8]:
+            grads[8] = torch.sum(g_r0).sum_to_size(a2.shape)
+
+        return tuple(grads)
+
+
+class Dispersion2_V1(Dispersion2Base):
+    """
+    Custom autograd function for the two-body dispersion energy with rational
+    damping. This is supposed to reduce memory usage.
+    """
+
+    @staticmethod
+    def forward(
+        ctx: CTX,
+        numbers: Tensor,
+        positions: Tensor,
+        c6: Tensor,
+        r4r2: Tensor,
+        cutoff: Tensor,
+        s6: Tensor,
+        s8: Tensor,
+        a1: Tensor,
+        a2: Tensor,
+    ) -> Tensor:
+        ctx.save_for_backward(numbers, positions, c6, r4r2, cutoff, s6, s8, a1, a2)
+        return _energy(numbers, positions, c6, r4r2, cutoff, s6, s8, a1, a2)
+
+
+class Dispersion2_V2(Dispersion2Base):
+    """
+    Custom autograd function for the two-body dispersion energy with rational
+    damping. This is supposed to reduce memory usage.
+    """
+
+    generate_vmap_rule = True
+    # https://pytorch.org/docs/master/notes/extending.func.html#automatically-generate-a-vmap-rule
+    # should work since we only use PyTorch operations
+
+    @staticmethod
+    def forward(
+        numbers: Tensor,
+        positions: Tensor,
+        c6: Tensor,
+        r4r2: Tensor,
+        cutoff: Tensor,
+        s6: Tensor,
+        s8: Tensor,
+        a1: Tensor,
+        a2: Tensor,
+    ) -> Tensor:
+        return _energy(numbers, positions, c6, r4r2, cutoff, s6, s8, a1, a2)
+
+    @staticmethod
+    def setup_context(
+        ctx: CTX,
+        inputs: Tuple[Tensor, ...],
+        output: Tensor,
+    ) -> None:
+        ctx.save_for_backward(*inputs)
@@ -55,18 +55,27 @@ tensor(-0.0003964, dtype=torch.float64)
 from __future__ import annotations
 
 import torch
-from tad_mctc import storch
 from tad_mctc.batch import real_pairs
 from tad_mctc.data import pse
 
-from . import data, defaults, model, ncoord
-from .damping import dispersion_atm, rational_damping
+from . import blocks, data, defaults, distance, model, ncoord, packing
+from .damping import (
+    dispersion2_rational,
+    dispersion3_atm,
+    dispersion_atm,
+    ScreeningStats,
+    multi_order_damping,
+    rational_damping,
+)
+from .neighbor import VerletList, full_pairs
+from .precision import Precision, get_precision
 from .reference import Reference
 from .typing import (
     DD,
     Any,
     CountingFunction,
     DampingFunction,
+    Literal,
     Tensor,
     WeightingFunction,
 )
@@ -84,10 +93,22 @@ def dftd3(
     rvdw: Tensor | None = None,
     r4r2: Tensor | None = None,
     cutoff: Tensor | None = None,
+    cutoff3: Tensor | None = None,
+    threshold3: float | None = None,
+    stats3: list[ScreeningStats] | None = None,
     counting_function: CountingFunction = ncoord.exp_count,
     weighting_function: WeightingFunction = model.gaussian_weight,
     damping_function: DampingFunction = rational_damping,
-    chunk_size: int | None = None,
+    chunk_size: int | Literal["auto"] | None = None,
+    memory_budget: float | None = None,
+    analytical: bool = False,
+    precision: str | Precision | None = None,
+    neighbors: VerletList | None = None,
+    unique: bool = False,
+    table: model.C6Table | None = None,
+    fused: bool = False,
+    packed: bool = False,
+    validate: bool = True,
 ) -> Tensor:
     """
     Evaluate DFT-D3 dispersion energy for a batch of geometries.
@@ -108,6 +129,18 @@ def dftd3(
         Van der Waals radii of the atoms in the system.
     r4r2 : torch.Tensor, optional
         r⁴ over r² expectation values of the atoms in the system.
+    cutoff : Tensor | None, optional
+        Real-space cutoff. Defaults to `None`, i.e.,
+        :data:`tad_dftd3.defaults.D3_DISP_CUTOFF`.
+    cutoff3 : Tensor | None, optional
+        Real-space cutoff of the three-body term (see :func:`dispersion`).
+        Defaults to `None`, i.e., `cutoff`.
+    threshold3 : float | None, optional
+        Screening threshold of the three-body term (see :func:`dispersion`).
+        Defaults to `None`, i.e., no screening.
+    stats3 : list[ScreeningStats] | None, optional
+        List to which the statistics of the screening of the three-body term
+        are appended (see :func:`dispersion`). Defaults to `None`.
     damping_function : Callable, optional
         Damping function evaluate distance dependent contributions.
     weighting_function : Callable, optional
@@ -116,16 +149,119 @@ def dftd3(
         Calculates counting value in range 0 to 1 for each atom pair.
     chunk_size : int, optional
         Chunk size for chunked computation of huge tensors that otherwise
-        create memory bottlenecks.
+        create memory bottlenecks. Applies to the coordination number, the C6
+        coefficients and the two- and three-body dispersion energy. With
+        `"auto"`, the chunk size is selected from the memory estimate of the
+        C6 coefficients (see :func:`tad_dftd3.model.auto_chunk_size`).
+    memory_budget : float | None, optional
+        Memory budget in MB for `chunk_size="auto"`. Defaults to `None`, i.e.,
+        the currently available memory of the device.
+    analytical : bool, optional
+        Use the custom autograd functions with an analytical gradient for the
+        two-body term (only for rational damping) and the three-body term.
+        Defaults to `False`.
+    precision : str | Precision | None, optional
+        Precision policy (see :mod:`tad_dftd3.precision`), e.g., `"mixed"` for
+        single precision intermediates with double precision accumulation.
+        All floating point inputs are converted to the compute dtype and the
+        energy is returned in the reduce dtype. Defaults to `None`, i.e.,
+        everything is evaluated in the dtype of `positions`.
+    neighbors : VerletList | None, optional
+        Reusable pair list (see :class:`tad_dftd3.neighbor.VerletList`) for
+        the sparse evaluation of the coordination number, the two-body and
+        the three-body term. The list is only rebuilt if atoms moved too much
+        since the last call. Its cutoff must not be smaller than `cutoff`,
+        `cutoff3` and :data:`tad_dftd3.defaults.D3_CN_CUTOFF`. Defaults to
+        `None`, i.e., all pairs.
+    unique : bool, optional
+        Evaluate the C6 coefficients and the two-body term only for the unique
+        pairs (`i < j`) and the three-body term only for the unique triples
+        (`i < j < k`). Cannot be combined with chunking. Defaults to `False`.
+    table : C6Table | None, optional
+        Tabulated C6 coefficients (see :class:`tad_dftd3.model.C6Table`),
+        from which the C6 coefficients are interpolated instead of weighting
+        the reference systems. The table must contain all elements and is
+        built from the reference and the weighting function, which are not
+        used otherwise. Defaults to `None`.
+    fused : bool, optional
+        Evaluate the coordination number, the weights and the C6 coefficients
+        in a single stage with an analytical gradient w.r.t. the positions
+        (see :func:`tad_dftd3.model.atomic_c6_fused`). Only available for the
+        default counting and weighting functions and without pair list,
+        chunking or table. Defaults to `False`.
+    packed : bool, optional
+        Evaluate and store the C6 coefficients in packed upper-triangular
+        form (see :mod:`tad_dftd3.packing`), which halves their memory. Cannot
+        be combined with a pair list, a C6 table or the fused C6 coefficients.
+        Defaults to `False`.
+    validate : bool, optional
+        Validate the inputs, which requires synchronizations with the host
+        (see :func:`dispersion`). Inputs that do not change between calls
+        (e.g., the atomic numbers of a trajectory) only need to be validated
+        once. With validation, the reference axis is also trimmed to the
+        reference systems of the elements present (see
+        :meth:`tad_dftd3.reference.Reference.trim`). Defaults to `True`.
 
     Returns
     -------
     Tensor
         Atom-resolved DFT-D3 dispersion energy for each geometry.
+
+    Raises
+    ------
+    ValueError
+        Unsupported elements, the cutoff of the pair list is too small,
+        unique pairs are requested in combination with (automatic) chunking,
+        or the fused or packed C6 coefficients are requested with unsupported
+        options.
     """
+    if packed is True and (neighbors is not None or table is not None or fused):
+        raise ValueError(
+            "Packed C6 coefficients cannot be combined with a pair list, a C6 "
+            "table or the fused C6 coefficients."
+        )
+    if chunk_size == "auto" and unique is True:
+        raise ValueError(
+            "Automatic chunk size selection cannot be combined with unique pairs."
+        )
+    if fused is True:
+        if (
+            counting_function is not ncoord.exp_count
+            or weighting_function is not model.gaussian_weight
+        ):
+            raise ValueError(
+                "The fused C6 coefficients only support the default counting "
+                "and weighting functions."
+            )
+        if neighbors is not None or chunk_size is not None or table is not None:
+            raise ValueError(
+                "The fused C6 coefficients cannot be combined with a pair "
+                "list, chunking or a C6 table."
+            )
+
+    reduce_dtype = None
+    if precision is not None:
+        policy = get_precision(precision)
+        reduce_dtype = policy.reduce
+
+        positions = positions.type(policy.compute)
+        param = {k: v.type(policy.compute) for k, v in param.items()}
+        if ref is not None:
+            ref = ref.type(policy.compute)
+        if rcov is not None:
+            rcov = rcov.type(policy.compute)
+        if rvdw is not None:
+            rvdw = rvdw.type(policy.compute)
+        if r4r2 is not None:
+            r4r2 = r4r2.type(policy.compute)
+        if cutoff is not None:
+            cutoff = cutoff.type(policy.compute)
+        if cutoff3 is not None:
+            cutoff3 = cutoff3.type(policy.compute)
+
     dd: DD = {"device": positions.device, "dtype": positions.dtype}
 
-    if torch.max(numbers) >= defaults.MAX_ELEMENT:
+    if validate is True and torch.max(numbers) >= defaults.MAX_ELEMENT:
         raise ValueError(
             f"No D3 parameters available for Z > {defaults.MAX_ELEMENT-1} "
             f"({pse.Z2S[defaults.MAX_ELEMENT]})."
@@ -135,18 +271,72 @@ def dftd3(
         cutoff = torch.tensor(defaults.D3_DISP_CUTOFF, **dd)
     if ref is None:
         ref = Reference(**dd)
+
+    # padded reference systems only add zeros to the C6 contraction
+    if validate is True:
+        ref = ref.trim(numbers)
+
+    if chunk_size == "auto":
+        chunk_size = model.auto_chunk_size(numbers, ref, memory_budget)
     if rcov is None:
         rcov = data.COV_D3.to(**dd)[numbers]
-    if rvdw is None:
-        rvdw = data.VDW_D3.to(**dd)[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
     if r4r2 is None:
         r4r2 = data.R4R2.to(**dd)[numbers]
 
-    cn = ncoord.cn_d3(
-        numbers, positions, counting_function=counting_function, rcov=rcov
-    )
-    weights = model.weight_references(numbers, cn, ref, weighting_function)
-    c6 = model.atomic_c6(numbers, weights, ref, chunk_size=chunk_size)
+    pairs = None
+    if neighbors is not None:
+        cn_cutoff = torch.tensor(defaults.D3_CN_CUTOFF, **dd)
+        max_cutoff = torch.maximum(cutoff, cn_cutoff)
+        if cutoff3 is not None:
+            max_cutoff = torch.maximum(max_cutoff, cutoff3)
+        if neighbors.cutoff < max_cutoff:
+            raise ValueError(
+                f"Cutoff of the pair list ({neighbors.cutoff}) is smaller than "
+                f"the real-space cutoffs ({cutoff}, {cutoff3}) or the "
+                f"coordination number cutoff ({cn_cutoff})."
+            )
+        pairs = neighbors.update(numbers, positions)
+
+    # coordination number, weights and C6 in one stage (analytical backward)
+    if fused is True:
+        c6, _ = model.atomic_c6_fused(numbers, positions, ref, rcov=rcov)
+    else:
+        cn = ncoord.cn_d3(
+            numbers,
+            positions,
+            counting_function=counting_function,
+            rcov=rcov,
+            chunk_size=chunk_size,
+            pairs=pairs,
+            validate=validate,
+        )
+
+        # the pair list of the coordination number contains both orderings
+        if pairs is not None and unique is True:
+            pairs = pairs[:, pairs[0] < pairs[1]]
+
+        if table is not None:
+            c6 = model.interpolate_c6(
+                numbers, cn, table, pairs=pairs, validate=validate
+            )
+        else:
+            weights = model.weight_references(
+                numbers, cn, ref, weighting_function, validate=validate
+            )
+
+            # no dense (..., nat, nat) tensors with a pair list
+            if pairs is not None:
+                c6 = model.atomic_c6_pairs(numbers, weights, ref, pairs, chunk_size)
+            else:
+                c6 = model.atomic_c6(
+                    numbers,
+                    weights,
+                    ref,
+                    chunk_size=chunk_size,
+                    unique=unique,
+                    packed=packed,
+                    validate=validate,
+                )
 
     return dispersion(
         numbers,
@@ -157,6 +347,16 @@ def dftd3(
         r4r2,
         damping_function,
         cutoff=cutoff,
+        pairs=pairs,
+        chunk_size=chunk_size,
+        analytical=analytical,
+        reduce_dtype=reduce_dtype,
+        unique=unique,
+        packed=packed,
+        validate=validate,
+        cutoff3=cutoff3,
+        threshold3=threshold3,
+        stats3=stats3,
     )
 
 
@@ -169,6 +369,16 @@ def dispersion(
     r4r2: Tensor | None = None,
     damping_function: DampingFunction = rational_damping,
     cutoff: Tensor | None = None,
+    pairs: Tensor | None = None,
+    chunk_size: int | None = None,
+    analytical: bool = False,
+    reduce_dtype: torch.dtype | None = None,
+    unique: bool = False,
+    packed: bool = False,
+    validate: bool = True,
+    cutoff3: Tensor | None = None,
+    threshold3: float | None = None,
+    stats3: list[ScreeningStats] | None = None,
     **kwargs: Any,
 ) -> Tensor:
     """
@@ -183,14 +393,63 @@ def dispersion(
     param : dict[str, Tensor]
         DFT-D3 damping parameters.
     c6 : Tensor
-        Atomic C6 dispersion coefficients.
+        Atomic C6 dispersion coefficients of shape `(..., nat, nat)`, packed
+        of shape `(..., nat * (nat + 1) // 2)` or, with a pair list, of shape
+        `(npairs,)` aligned with the pairs (see
+        :func:`tad_dftd3.model.atomic_c6_pairs`).
     rvdw : Tensor
-        Van der Waals radii of the atoms in the system.
+        Van der Waals radii of the atoms in the system (dense or aligned with
+        the pairs like `c6`).
     r4r2 : Tensor
         r⁴ over r² expectation values of the atoms in the system.
     damping_function : Callable
         Damping function evaluate distance dependent contributions.
         Additional arguments are passed through to the function.
+    cutoff : Tensor | None, optional
+        Real-space cutoff. Defaults to `None`, i.e.,
+        :data:`tad_dftd3.defaults.D3_DISP_CUTOFF`.
+    pairs : Tensor | None, optional
+        Pair list of shape `(2, npairs)` (see
+        :func:`tad_dftd3.neighbor.neighbor_list`) for the sparse evaluation
+        of the two-body and three-body terms. Defaults to `None`, i.e., all
+        pairs.
+    chunk_size : int | None, optional
+        Number of atoms (rows) evaluated at once in the two-body term and
+        number of first atoms of the triples in the three-body term. Defaults
+        to `None`, i.e., no chunking.
+    analytical : bool, optional
+        Use the custom autograd functions with an analytical gradient for the
+        two-body term (only for rational damping) and the three-body term.
+        Defaults to `False`.
+    reduce_dtype : torch.dtype | None, optional
+        Floating point dtype for the accumulation of the pairwise and
+        triple-wise contributions (see :mod:`tad_dftd3.precision`). Defaults
+        to `None`, i.e., the dtype of `positions`.
+    unique : bool, optional
+        Evaluate the two-body term only for the unique pairs (`i < j`) and the
+        three-body term only for the unique triples (`i < j < k`). Defaults
+        to `False`.
+    packed : bool, optional
+        The C6 coefficients are given in packed upper-triangular form (see
+        :mod:`tad_dftd3.packing`). Defaults to `False`.
+    validate : bool, optional
+        Check for unsupported elements and skip the three-body term if `s9`
+        is zero. Both require a synchronization with the host. Without
+        validation, the three-body term is evaluated whenever `s9` is given
+        in `param`. Defaults to `True`.
+    cutoff3 : Tensor | None, optional
+        Real-space cutoff of the three-body term. All three pairs of a triple
+        must be within this cutoff. The three-body term decays much faster
+        than the two-body term, and the reference implementation uses 40
+        Bohr. Defaults to `None`, i.e., `cutoff`.
+    threshold3 : float | None, optional
+        Skip triples with `|C9| / (r_ij r_ik r_jk)³` below this threshold
+        (see :func:`tad_dftd3.damping.atm.screen_triples`). Requires unique
+        triples or a pair list. Defaults to `None`, i.e., no screening.
+    stats3 : list[ScreeningStats] | None, optional
+        List to which the number of skipped triples and the upper bound for
+        the error of the energy are appended for every screening (see
+        :class:`tad_dftd3.damping.atm.ScreeningStats`). Defaults to `None`.
 
     Returns
     -------
@@ -203,6 +462,8 @@ def dispersion(
         cutoff = torch.tensor(defaults.D3_DISP_CUTOFF, **dd)
     if r4r2 is None:
         r4r2 = data.R4R2.to(**dd)[numbers]
+    if cutoff3 is None:
+        cutoff3 = cutoff
 
     if numbers.shape != positions.shape[:-1]:
         raise ValueError(
@@ -212,7 +473,7 @@ def dispersion(
         raise ValueError(
             "Shape of expectation values is not consistent with atomic numbers.",
         )
-    if torch.max(numbers) >= defaults.MAX_ELEMENT:
+    if validate is True and torch.max(numbers) >= defaults.MAX_ELEMENT:
         raise ValueError(
             f"No D3 parameters available for Z > {defaults.MAX_ELEMENT - 1} "
             f"({pse.Z2S[defaults.MAX_ELEMENT]})."
@@ -220,15 +481,56 @@ def dispersion(
 
     # two-body dispersion
     energy = dispersion2(
-        numbers, positions, param, c6, r4r2, damping_function, cutoff, **kwargs
+        numbers,
+        positions,
+        param,
+        c6,
+        r4r2,
+        damping_function,
+        cutoff,
+        pairs=pairs,
+        chunk_size=chunk_size,
+        analytical=analytical,
+        reduce_dtype=reduce_dtype,
+        unique=unique,
+        packed=packed,
+        **kwargs,
     )
 
-    # three-body dispersion
-    if "s9" in param and param["s9"] != 0.0:
+    # three-body dispersion (checking the value of `s9` requires a sync)
+    if "s9" in param and (validate is False or param["s9"] != 0.0):
+        # the triple list requires both orderings of every pair
+        if pairs is not None and unique is True:
+            pairs, index = full_pairs(pairs, return_index=True)
+
+            # pairwise quantities given for the unique pairs
+            if c6.ndim == 1 and packed is False:
+                c6 = c6[index]
+            if rvdw is not None and rvdw.ndim == 1:
+                rvdw = rvdw[index]
+
+        if rvdw is None and pairs is not None:
+            num = numbers.reshape(-1)
+            rvdw = data.VDW_D3.to(**dd)[num[pairs[0]], num[pairs[1]]]
         if rvdw is None:
             rvdw = data.VDW_D3.to(**dd)[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
 
-        energy += dispersion3(numbers, positions, param, c6, rvdw, cutoff)
+        energy += dispersion3(
+            numbers,
+            positions,
+            param,
+            c6,
+            rvdw,
+            cutoff3,
+            reduce_dtype=reduce_dtype,
+            pairs=pairs,
+            chunk_size=chunk_size,
+            analytical=analytical,
+            unique=unique,
+            threshold=threshold3,
+            packed=packed,
+            stats=stats3,
+        )
 
     return energy
 
@@ -241,6 +543,12 @@ def dispersion2(
     r4r2: Tensor,
     damping_function: DampingFunction,
     cutoff: Tensor,
+    pairs: Tensor | None = None,
+    chunk_size: int | None = None,
+    analytical: bool = False,
+    reduce_dtype: torch.dtype | None = None,
+    unique: bool = False,
+    packed: bool = False,
     **kwargs: Any,
 ) -> Tensor:
     """
@@ -255,42 +563,431 @@ def dispersion2(
     param : dict[str, Tensor]
         DFT-D3 damping parameters.
     c6 : Tensor
-        Atomic C6 dispersion coefficients.
+        Atomic C6 dispersion coefficients of shape `(..., nat, nat)` or, if
+        packed, of shape `(..., nat * (nat + 1) // 2)`.
     r4r2 : Tensor
         r⁴ over r² expectation values of the atoms in the system.
     damping_function : Callable
         Damping function evaluate distance dependent contributions.
         Additional arguments are passed through to the function.
+    cutoff : Tensor
+        Real-space cutoff.
+    pairs : Tensor | None, optional
+        Pair list of shape `(2, npairs)` with indices into the flattened atoms
+        (see :func:`tad_dftd3.neighbor.neighbor_list`). If given, only these
+        pairs are evaluated and the dense `(..., nat, nat)` intermediates are
+        avoided. The C6 coefficients may then also be given per pair (see
+        :func:`tad_dftd3.model.atomic_c6_pairs`). Defaults to `None`.
+    chunk_size : int | None, optional
+        Number of atoms (rows) evaluated at once. Only intermediates of size
+        `(..., chunk_size, nat)` are created and the blocks are recomputed in
+        the backward pass. Defaults to `None`, i.e., no chunking.
+    analytical : bool, optional
+        Use the custom autograd function with an analytical gradient (see
+        :func:`tad_dftd3.damping.rational.dispersion2_rational`). Only
+        available for rational damping and the dense evaluation. Defaults to
+        `False`.
+    reduce_dtype : torch.dtype | None, optional
+        Floating point dtype for the accumulation of the pairwise
+        contributions. Defaults to `None`, i.e., the dtype of `positions`.
+    unique : bool, optional
+        Evaluate every pair only once (`i < j`) and assign half of the pair
+        energy to both atoms. In combination with a pair list, the list must
+        contain every pair only once (e.g., `pairs[:, pairs[0] < pairs[1]]`).
+        Cannot be combined with chunking or the analytical gradient. Defaults
+        to `False`.
+    packed : bool, optional
+        The C6 coefficients are given in packed upper-triangular form (see
+        :mod:`tad_dftd3.packing`). The unique pairs, the pair list and the
+        row blocks gather their C6 coefficients directly from the packed
+        form, while the dense evaluation expands it. Defaults to `False`.
+
+    Returns
+    -------
+    Tensor
+        Atom-resolved two-body dispersion energy.
+
+    Raises
+    ------
+    ValueError
+        Analytical gradient requested for an unsupported damping function, in
+        combination with a pair list, chunking or unique pairs, or with a
+        reduce dtype differing from the dtype of `positions`. Unique pairs
+        requested in combination with chunking.
     """
+    if unique is True and chunk_size is not None and pairs is None:
+        raise ValueError("Unique pairs cannot be combined with chunking.")
+
+    if analytical is True:
+        if damping_function is not rational_damping or len(kwargs) > 0:
+            raise ValueError(
+                "The analytical gradient is only available for the rational "
+                "damping function without additional arguments."
+            )
+        if pairs is not None or chunk_size is not None or unique is True:
+            raise ValueError(
+                "The analytical gradient is only available for the dense "
+                "evaluation without pair list, chunking or unique pairs."
+            )
+        if reduce_dtype is not None and reduce_dtype != positions.dtype:
+            raise ValueError(
+                "The analytical gradient is not available for mixed precision."
+            )
+
+        if packed is True:
+            c6 = packing.unpack(c6, numbers.shape[-1])
+
+        return dispersion2_rational(numbers, positions, param, c6, r4r2, cutoff)
+
+    if pairs is not None:
+        return _dispersion2_pairs(
+            numbers,
+            positions,
+            param,
+            c6,
+            r4r2,
+            damping_function,
+            cutoff,
+            pairs,
+            reduce_dtype=reduce_dtype,
+            unique=unique,
+            packed=packed,
+            **kwargs,
+        )
+
+    if unique is True:
+        return _dispersion2_unique(
+            numbers,
+            positions,
+            param,
+            c6,
+            r4r2,
+            damping_function,
+            cutoff,
+            reduce_dtype=reduce_dtype,
+            packed=packed,
+            **kwargs,
+        )
+
+    if chunk_size is not None:
+        return _dispersion2_chunked(
+            numbers,
+            positions,
+            param,
+            c6,
+            r4r2,
+            damping_function,
+            cutoff,
+            chunk_size,
+            reduce_dtype=reduce_dtype,
+            packed=packed,
+            **kwargs,
+        )
+
+    if packed is True:
+        c6 = packing.unpack(c6, numbers.shape[-1])
+
     dd: DD = {"device": positions.device, "dtype": positions.dtype}
 
     mask = real_pairs(numbers, mask_diagonal=True)
     distances = torch.where(
         mask,
-        storch.cdist(positions, positions, p=2),
+        distance.cdist(positions, positions),
         torch.tensor(torch.finfo(positions.dtype).eps, **dd),
     )
 
     qq = 3 * r4r2.unsqueeze(-1) * r4r2.unsqueeze(-2)
     c8 = c6 * qq
 
-    t6 = torch.where(
+    # C6 and C8 damping from shared intermediates
+    t6, t8 = multi_order_damping(
+        damping_function, (6, 8), distances, qq, param, **kwargs
+    )
+
+    s6 = param.get("s6", torch.tensor(defaults.S6, **dd))
+    s8 = param.get("s8", torch.tensor(defaults.S8, **dd))
+    e = torch.where(
         mask * (distances <= cutoff),
-        damping_function(6, distances, qq, param, **kwargs),
+        s6 * c6 * t6 + s8 * c8 * t8,
         torch.tensor(0.0, **dd),
     )
-    t8 = torch.where(
-        mask * (distances <= cutoff),
-        damping_function(8, distances, qq, param, **kwargs),
+
+    return -0.5 * torch.sum(e, dim=-1, dtype=reduce_dtype)
+
+
+def _dispersion2_chunked(
+    numbers: Tensor,
+    positions: Tensor,
+    param: dict[str, Tensor],
+    c6: Tensor,
+    r4r2: Tensor,
+    damping_function: DampingFunction,
+    cutoff: Tensor,
+    chunk_size: int,
+    reduce_dtype: torch.dtype | None = None,
+    packed: bool = False,
+    **kwargs: Any,
+) -> Tensor:
+    """
+    Two-body dispersion energy evaluated in row blocks. Peak memory of the
+    forward and backward pass scales with `(..., chunk_size, nat)`.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system.
+    positions : Tensor
+        Cartesian coordinates of the atoms in the system.
+    param : dict[str, Tensor]
+        DFT-D3 damping parameters.
+    c6 : Tensor
+        Atomic C6 dispersion coefficients.
+    r4r2 : Tensor
+        r⁴ over r² expectation values of the atoms in the system.
+    damping_function : Callable
+        Damping function evaluate distance dependent contributions.
+        Additional arguments are passed through to the function.
+    cutoff : Tensor
+        Real-space cutoff.
+    chunk_size : int
+        Number of atoms (rows) evaluated at once.
+    reduce_dtype : torch.dtype | None, optional
+        Floating point dtype for the accumulation of the pairwise
+        contributions. Defaults to `None`, i.e., the dtype of `positions`.
+    packed : bool, optional
+        The C6 coefficients are given in packed form. The rows of a block are
+        gathered from the packed form. Defaults to `False`.
+
+    Returns
+    -------
+    Tensor
+        Atom-resolved two-body dispersion energy.
+    """
+    dd: DD = {"device": positions.device, "dtype": positions.dtype}
+
+    eps = torch.tensor(torch.finfo(positions.dtype).eps, **dd)
+    zero = torch.tensor(0.0, **dd)
+    s6 = param.get("s6", torch.tensor(defaults.S6, **dd))
+    s8 = param.get("s8", torch.tensor(defaults.S8, **dd))
+
+    def _block(start: int, end: int, c6: Tensor) -> Tensor:
+        mask = blocks.real_pairs_block(numbers, start, end)
+        distances = torch.where(
+            mask,
+            distance.cdist(positions[..., start:end, :], positions),
+            eps,
+        )
+
+        # rows of the packed C6 are gathered within the (recomputed) block
+        if packed is True:
+            idx = torch.arange(numbers.shape[-1], device=positions.device)
+            c6_block = c6[
+                ...,
+                packing.packed_index(
+                    idx[start:end].unsqueeze(-1), idx.unsqueeze(-2), idx.shape[-1]
+                ),
+            ]
+        else:
+            c6_block = c6[..., start:end, :]
+
+        qq = 3 * r4r2[..., start:end].unsqueeze(-1) * r4r2.unsqueeze(-2)
+        t6, t8 = multi_order_damping(
+            damping_function, (6, 8), distances, qq, param, **kwargs
+        )
+
+        e = torch.where(
+            mask * (distances <= cutoff),
+            s6 * c6_block * t6 + s8 * c6_block * qq * t8,
+            zero,
+        )
+        return -0.5 * torch.sum(e, dim=-1, dtype=reduce_dtype)
+
+    energy = [
+        blocks.checkpoint(_block, start, end, c6)
+        for start, end in blocks.row_blocks(numbers.shape[-1], chunk_size)
+    ]
+    return torch.cat(energy, dim=-1)
+
+
+def _dispersion2_pairs(
+    numbers: Tensor,
+    positions: Tensor,
+    param: dict[str, Tensor],
+    c6: Tensor,
+    r4r2: Tensor,
+    damping_function: DampingFunction,
+    cutoff: Tensor,
+    pairs: Tensor,
+    reduce_dtype: torch.dtype | None = None,
+    unique: bool = False,
+    packed: bool = False,
+    **kwargs: Any,
+) -> Tensor:
+    """
+    Two-body dispersion energy evaluated on a flat pair list. The pair
+    energies are scattered back to the atoms via `index_add`.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system.
+    positions : Tensor
+        Cartesian coordinates of the atoms in the system.
+    param : dict[str, Tensor]
+        DFT-D3 damping parameters.
+    c6 : Tensor
+        Atomic C6 dispersion coefficients of shape `(..., nat, nat)`, packed
+        of shape `(..., nat * (nat + 1) // 2)` or of shape `(npairs,)` aligned
+        with the pair list.
+    r4r2 : Tensor
+        r⁴ over r² expectation values of the atoms in the system.
+    damping_function : Callable
+        Damping function evaluate distance dependent contributions.
+        Additional arguments are passed through to the function.
+    cutoff : Tensor
+        Real-space cutoff.
+    pairs : Tensor
+        Pair list of shape `(2, npairs)` with indices into the flattened atoms.
+    reduce_dtype : torch.dtype | None, optional
+        Floating point dtype for the accumulation of the pairwise
+        contributions. Defaults to `None`, i.e., the dtype of `positions`.
+    unique : bool, optional
+        The pair list contains every pair only once and the pair energy is
+        assigned to both atoms. Defaults to `False`.
+    packed : bool, optional
+        The C6 coefficients are given in packed form. Defaults to `False`.
+
+    Returns
+    -------
+    Tensor
+        Atom-resolved two-body dispersion energy.
+    """
+    dd: DD = {"device": positions.device, "dtype": positions.dtype}
+
+    nat = numbers.shape[-1]
+    i, j = pairs[0], pairs[1]
+
+    pos = positions.reshape(-1, 3)
+    distances = torch.linalg.norm(pos[i] - pos[j], dim=-1)
+
+    rr = r4r2.reshape(-1)
+    qq = 3 * rr[i] * rr[j]
+
+    # C6 of the pair from the (batched) matrix via the local index of "j"
+    if packed is True:
+        c6ij = packing.gather_pairs(c6, pairs, nat)
+    elif c6.ndim == 1:
+        c6ij = c6
+    else:
+        c6ij = c6.reshape(-1, nat)[i, j % nat]
+    c8ij = c6ij * qq
+
+    t6, t8 = multi_order_damping(
+        damping_function, (6, 8), distances, qq, param, **kwargs
+    )
+
+    s6 = param.get("s6", torch.tensor(defaults.S6, **dd))
+    s8 = param.get("s8", torch.tensor(defaults.S8, **dd))
+    e = torch.where(
+        distances <= cutoff,
+        -0.5 * (s6 * c6ij * t6 + s8 * c8ij * t8),
         torch.tensor(0.0, **dd),
     )
 
-    e6 = -0.5 * torch.sum(c6 * t6, dim=-1)
-    e8 = -0.5 * torch.sum(c8 * t8, dim=-1)
+    if reduce_dtype is not None:
+        e = e.type(reduce_dtype)
+
+    energy = torch.zeros(numbers.numel(), device=e.device, dtype=e.dtype)
+    energy = energy.index_add(0, i, e)
+    if unique is True:
+        energy = energy.index_add(0, j, e)
+
+    return energy.reshape(numbers.shape)
+
+
+def _dispersion2_unique(
+    numbers: Tensor,
+    positions: Tensor,
+    param: dict[str, Tensor],
+    c6: Tensor,
+    r4r2: Tensor,
+    damping_function: DampingFunction,
+    cutoff: Tensor,
+    reduce_dtype: torch.dtype | None = None,
+    packed: bool = False,
+    **kwargs: Any,
+) -> Tensor:
+    """
+    Two-body dispersion energy evaluated for the unique pairs (upper triangle)
+    only. Half of every pair energy is assigned to both atoms of the pair.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system.
+    positions : Tensor
+        Cartesian coordinates of the atoms in the system.
+    param : dict[str, Tensor]
+        DFT-D3 damping parameters.
+    c6 : Tensor
+        Atomic C6 dispersion coefficients.
+    r4r2 : Tensor
+        r⁴ over r² expectation values of the atoms in the system.
+    damping_function : Callable
+        Damping function evaluate distance dependent contributions.
+        Additional arguments are passed through to the function.
+    cutoff : Tensor
+        Real-space cutoff.
+    reduce_dtype : torch.dtype | None, optional
+        Floating point dtype for the accumulation of the pairwise
+        contributions. Defaults to `None`, i.e., the dtype of `positions`.
+    packed : bool, optional
+        The C6 coefficients are given in packed form. Defaults to `False`.
+
+    Returns
+    -------
+    Tensor
+        Atom-resolved two-body dispersion energy.
+    """
+    dd: DD = {"device": positions.device, "dtype": positions.dtype}
+
+    nat = numbers.shape[-1]
+    i, j = torch.triu_indices(nat, nat, offset=1, device=positions.device)
+
+    real = numbers != 0
+    mask = real[..., i] & real[..., j]
+
+    # (..., npairs), padding pairs are masked before the square root
+    r2 = torch.sum((positions[..., i, :] - positions[..., j, :]) ** 2, dim=-1)
+    distances = torch.where(
+        mask,
+        torch.sqrt(torch.where(mask, r2, torch.tensor(1.0, **dd))),
+        torch.tensor(torch.finfo(positions.dtype).eps, **dd),
+    )
+
+    qq = 3 * r4r2[..., i] * r4r2[..., j]
+    if packed is True:
+        c6ij = c6[..., packing.packed_index(i, j, nat)]
+    else:
+        c6ij = c6[..., i, j]
+
+    t6, t8 = multi_order_damping(
+        damping_function, (6, 8), distances, qq, param, **kwargs
+    )
 
     s6 = param.get("s6", torch.tensor(defaults.S6, **dd))
     s8 = param.get("s8", torch.tensor(defaults.S8, **dd))
-    return s6 * e6 + s8 * e8
+    e = torch.where(
+        mask * (distances <= cutoff),
+        -0.5 * (s6 * c6ij * t6 + s8 * c6ij * qq * t8),
+        torch.tensor(0.0, **dd),
+    )
+
+    if reduce_dtype is not None:
+        e = e.type(reduce_dtype)
+
+    energy = torch.zeros(numbers.shape, device=e.device, dtype=e.dtype)
+    return energy.index_add(-1, i, e).index_add(-1, j, e)
 
 
 def dispersion3(
@@ -301,6 +998,14 @@ def dispersion3(
     rvdw: Tensor,
     cutoff: Tensor,
     rs9: Tensor = torch.tensor(4.0 / 3.0),
+    reduce_dtype: torch.dtype | None = None,
+    pairs: Tensor | None = None,
+    chunk_size: int | None = None,
+    analytical: bool = False,
+    unique: bool = False,
+    threshold: float | None = None,
+    packed: bool = False,
+    stats: list[ScreeningStats] | None = None,
 ) -> Tensor:
     """
     Three-body dispersion term. Currently this is only a wrapper for the
@@ -323,11 +1028,47 @@ def dispersion3(
         Real-space cutoff.
     rs9 : Tensor, optional
         Scaling for van-der-Waals radii in damping function. Defaults to `4.0/3.0`.
+    reduce_dtype : torch.dtype | None, optional
+        Floating point dtype for the accumulation of the triple-wise
+        contributions. Defaults to `None`, i.e., the dtype of `positions`.
+    pairs : Tensor | None, optional
+        Pair list of shape `(2, npairs)` containing both orderings of every
+        pair (see :func:`tad_dftd3.neighbor.neighbor_list`). If given, only
+        the triples within the cutoff are evaluated. Defaults to `None`, i.e.,
+        all triples.
+    chunk_size : int | None, optional
+        Number of first atoms of the triples evaluated at once, i.e., only
+        intermediates of size `(..., chunk_size, nat, nat)` are created.
+        Defaults to `None`, i.e., no chunking.
+    analytical : bool, optional
+        Use the custom autograd function with an analytical gradient (see
+        :func:`tad_dftd3.damping.atm.dispersion3_atm`). Defaults to `False`.
+    unique : bool, optional
+        Evaluate only the unique triples (`i < j < k`). Cannot be combined
+        with chunking or the analytical gradient. Defaults to `False`.
+    threshold : float | None, optional
+        Screening threshold for `|C9| / (r_ij r_ik r_jk)³` (see
+        :func:`tad_dftd3.damping.atm.screen_triples`). Requires unique
+        triples or a pair list. Defaults to `None`, i.e., no screening.
+    packed : bool, optional
+        The C6 coefficients are given in packed upper-triangular form (see
+        :mod:`tad_dftd3.packing`). Defaults to `False`.
+    stats : list[ScreeningStats] | None, optional
+        List to which the statistics of the screening are appended (see
+        :class:`tad_dftd3.damping.atm.ScreeningStats`). Defaults to `None`.
 
     Returns
     -------
     Tensor
         Atom-resolved three-body dispersion energy.
+
+    Raises
+    ------
+    ValueError
+        Analytical gradient requested in combination with a pair list, unique
+        triples, screening or with a reduce dtype differing from the dtype of
+        `positions`. Unique triples requested in combination with chunking.
+        Screening requested for all ordered triples without a pair list.
     """
     dd: DD = {"device": positions.device, "dtype": positions.dtype}
 
@@ -335,4 +1076,38 @@ def dispersion3(
     s9 = param.get("s9", torch.tensor(1.0, **dd))
     rs9 = rs9.type(positions.dtype).to(positions.device)
 
-    return dispersion_atm(numbers, positions, c6, rvdw, cutoff, s9, rs9, alp)
+    if analytical is True:
+        if pairs is not None or unique is True or threshold is not None:
+            raise ValueError(
+                "The analytical gradient is only available for the dense "
+                "evaluation without pair list, unique triples or screening."
+            )
+        if reduce_dtype is not None and reduce_dtype != positions.dtype:
+            raise ValueError(
+                "The analytical gradient is not available for mixed precision."
+            )
+
+        if packed is True:
+            c6 = packing.unpack(c6, numbers.shape[-1])
+
+        return dispersion3_atm(
+            numbers, positions, c6, rvdw, cutoff, s9, rs9, alp, chunk_size=chunk_size
+        )
+
+    return dispersion_atm(
+        numbers,
+        positions,
+        c6,
+        rvdw,
+        cutoff,
+        s9,
+        rs9,
+        alp,
+        reduce_dtype=reduce_dtype,
+        pairs=pairs,
+        chunk_size=chunk_size,
+        unique=unique,
+        threshold=threshold,
+        packed=packed,
+        stats=stats,
+    )
@@ -0,0 +1,114 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Distances
+=========
+
+Safe square root, safe division and euclidean distance matrix without host
+synchronizations.
+
+Numerically, these are identical to :func:`tad_mctc.storch.sqrt`,
+:func:`tad_mctc.storch.divide` and :func:`tad_mctc.storch.cdist` (`p=2`).
+However, the latter validate the clamping value on the host (`eps < 0.0`) or
+fill the denominator with a tensor-valued `eps`, both of which synchronize
+with the device on every call.
+"""
+from __future__ import annotations
+
+import torch
+from tad_mctc.math import einsum
+
+from .typing import Any, Tensor
+
+__all__ = ["cdist", "divide", "sqrt"]
+
+
+def sqrt(x: Tensor, *, eps: Tensor | float | int | None = None) -> Tensor:
+    """
+    Safe square root operation (without validation of the clamping value).
+
+    Parameters
+    ----------
+    x : Tensor
+        Input tensor.
+    eps : Tensor | float | int | None, optional
+        Value for clamping. Defaults to `None`, which resolves to
+        `torch.finfo(x.dtype).eps`.
+
+    Returns
+    -------
+    Tensor
+        Square root of the input tensor.
+    """
+    if eps is None:
+        eps = torch.finfo(x.dtype).eps
+    return torch.sqrt(torch.clamp(x, min=eps))
+
+
+def divide(
+    x: Tensor, y: Tensor, *, eps: Tensor | float | int | None = None, **kwargs: Any
+) -> Tensor:
+    """
+    Safe division operation, i.e., zeros in the denominator are replaced by
+    `eps`.
+
+    Parameters
+    ----------
+    x : Tensor
+        Numerator.
+    y : Tensor
+        Denominator.
+    eps : Tensor | float | int | None, optional
+        Value replacing zeros in the denominator. Defaults to `None`, which
+        resolves to `torch.finfo(x.dtype).eps`.
+    kwargs : Any
+        Additional arguments for :func:`torch.divide`.
+
+    Returns
+    -------
+    Tensor
+        Quotient of the input tensors.
+    """
+    if eps is None:
+        eps = torch.finfo(x.dtype).eps
+    return torch.divide(x, torch.where(y != 0, y, eps), **kwargs)
+
+
+def cdist(x: Tensor, y: Tensor | None = None) -> Tensor:
+    """
+    Euclidean distance matrix via quadratic expansion.
+
+    Parameters
+    ----------
+    x : Tensor
+        First tensor of shape `(..., n, 3)`.
+    y : Tensor | None, optional
+        Second tensor of shape `(..., m, 3)`. If no second tensor is given
+        (default), the first tensor is used as the second tensor, too.
+
+    Returns
+    -------
+    Tensor
+        Pair-wise distance matrix of shape `(..., n, m)`.
+    """
+    if y is None:
+        y = x
+
+    xnorm = einsum("...ij,...ij->...i", x, x)
+    ynorm = einsum("...ij,...ij->...i", y, y)
+    n = xnorm.unsqueeze(-1) + ynorm.unsqueeze(-2)
+
+    # remove negative values that give NaN in backward
+    return sqrt(n - 2.0 * (x @ y.mT))
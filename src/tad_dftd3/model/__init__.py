@@ -42,4 +42,6 @@ tensor([[10.4130471,  5.4368822,  5.4368822],
         [ 5.4368822,  3.0930154,  3.0930154]], dtype=torch.float64)
 """
 from .c6 import *
+from .fused import *
+from .table import *
 from .weights import *
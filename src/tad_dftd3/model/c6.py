@@ -23,15 +23,20 @@ function (i.e., analytical gradient) and options for chunking.
 """
 from __future__ import annotations
 
+import logging
+
 import torch
 from tad_mctc._version import __tversion__
 from tad_mctc.math import einsum
 from tad_mctc.tools import memory
 
+from ..packing import packed_pairs
 from ..reference import Reference
-from ..typing import Callable, Protocol, Tensor
+from ..typing import Callable, Literal, Protocol, Tensor, is_compiling
+
+__all__ = ["atomic_c6", "atomic_c6_pairs", "auto_chunk_size"]
 
-__all__ = ["atomic_c6"]
+logger = logging.getLogger(__name__)
 
 
 # main entry point
@@ -41,7 +46,13 @@ def atomic_c6(
     numbers: Tensor,
     weights: Tensor,
     reference: Reference,
-    chunk_size: None | int = None,
+    chunk_size: None | int | Literal["auto"] = None,
+    unique: bool = False,
+    grouped: bool = False,
+    memory_budget: float | None = None,
+    packed: bool = False,
+    forward_ad: bool = False,
+    validate: bool = True,
 ) -> Tensor:
     """
     Calculate atomic dispersion coefficients.
@@ -61,13 +72,86 @@ def atomic_c6(
     reference : Reference
         Reference systems for D3 model. Contains the reference C6 coefficients
         of shape `(..., nelements, nelements, 7, 7)`.
+    chunk_size : int | "auto" | None, optional
+        Chunk size for the calculation of the C6 tensor. With `"auto"`, the
+        largest chunk size for which the intermediate tensor fits into the
+        memory budget is selected (see :func:`auto_chunk_size`). Defaults to
+        `None`.
+    unique : bool, optional
+        Only evaluate the upper triangle (unique pairs) and mirror it to the
+        lower triangle. This halves the work and the size of the gathered
+        reference tensor. Cannot be combined with chunking. Defaults to
+        `False`.
+    grouped : bool, optional
+        Group the atoms by element and evaluate every block of an element
+        pair as matrix product `W_A @ rc6_AB @ W_B^T`. The reference tensor
+        of shape `(..., nat, nat, 7, 7)` is never built, i.e., the memory
+        scales with `nat²` and the work is carried out by BLAS. Plain
+        autograd is used, which has the same memory scaling. Cannot be
+        combined with chunking or unique pairs. Defaults to `False`.
+    memory_budget : float | None, optional
+        Memory budget in MB for `chunk_size="auto"`. Defaults to `None`,
+        i.e., the currently available memory of the device.
+    packed : bool, optional
+        Only evaluate and return the upper triangle (including the diagonal)
+        in packed form (see :mod:`tad_dftd3.packing`). This halves the memory
+        of the C6 coefficients and of the gathered reference tensor. Implies
+        unique pairs and can be combined with chunking (`chunk_size` rows of
+        pairs at once), but not with grouping. Defaults to `False`.
+    forward_ad : bool, optional
+        Support forward-mode AD (e.g., `torch.func.jvp` and
+        `torch.func.jacfwd`) with the custom autograd function. Not supported
+        within `torch.compile`. Requires PyTorch 2.0 or newer. Defaults to
+        `False`.
+    validate : bool, optional
+        Check that the C6 tensor fits into the memory of the device, which
+        requires a query of the device (host round-trip). Defaults to `True`.
 
     Returns
     -------
     Tensor
-        Atomic dispersion coefficients of shape `(..., nat, nat)`.
+        Atomic dispersion coefficients of shape `(..., nat, nat)` or, if
+        packed, of shape `(..., nat * (nat + 1) // 2)`.
+
+    Raises
+    ------
+    ValueError
+        Unique pairs, grouping or packing requested in combination with
+        chunking or each other.
     """
-    _check_memory(numbers, weights, chunk_size)
+    if packed is True and grouped is True:
+        raise ValueError("Packed storage cannot be combined with grouping.")
+
+    if unique is True and chunk_size is not None and packed is False:
+        raise ValueError("Unique pairs cannot be combined with chunking.")
+
+    if grouped is True:
+        if chunk_size is not None or unique is True:
+            raise ValueError(
+                "Grouping by element cannot be combined with chunking or "
+                "unique pairs."
+            )
+        return _atomic_c6_grouped(numbers, weights, reference)
+
+    if chunk_size == "auto":
+        chunk_size = auto_chunk_size(numbers, reference, memory_budget)
+
+    # querying the device memory is not possible within `torch.compile`
+    if validate is True and not is_compiling():
+        _check_memory(
+            numbers,
+            weights,
+            reference,
+            chunk_size,
+            unique or (packed and chunk_size is None),
+        )
+
+    # upper triangle as pair list (batch-major), i.e., in packed order
+    pairs = None
+    if packed is True:
+        pairs = packed_pairs(numbers)
+        if chunk_size is not None:
+            chunk_size = chunk_size * numbers.shape[-1]
 
     # PyTorch 2.0.x has a bug with functorch and custom autograd functions as
     # documented in: https://github.com/pytorch/pytorch/issues/99973
@@ -82,23 +166,146 @@ def atomic_c6(
         track_numbers = torch._C._functorch.is_gradtrackingtensor(numbers)
         if track_weights or track_numbers:
 
+            if pairs is not None:
+                c6 = _atomic_c6_pairs(numbers, weights, reference, pairs, chunk_size)
+                return c6.reshape(*numbers.shape[:-1], -1)
+
+            if unique is True:
+                return _atomic_c6_unique(numbers, weights, reference)
+
             if chunk_size is None:
                 return _atomic_c6_full(numbers, weights, reference)
 
             return _atomic_c6_chunked(numbers, weights, reference, chunk_size)
 
     # Use custom autograd function for reduced memory consumption
+    # (all arguments are passed, dynamo does not bind the defaults of `apply`)
+    if __tversion__ < (2, 0, 0):
+        AtomicC6: type[AtomicC6Base] = AtomicC6_V1
+    elif forward_ad is True:
+        AtomicC6 = AtomicC6Fwd_V2
+    else:
+        AtomicC6 = AtomicC6_V2
+
+    if pairs is not None:
+        res = AtomicC6.apply(numbers, weights, reference, chunk_size, False, pairs)
+        assert res is not None
+        return res.reshape(*numbers.shape[:-1], -1)
+
+    res = AtomicC6.apply(numbers, weights, reference, chunk_size, unique, None)
+    assert res is not None
+    return res
+
+
+def atomic_c6_pairs(
+    numbers: Tensor,
+    weights: Tensor,
+    reference: Reference,
+    pairs: Tensor,
+    chunk_size: None | int = None,
+) -> Tensor:
+    """
+    Calculate atomic dispersion coefficients only for the pairs of a pair list.
+    The memory scales with the number of pairs instead of `nat²`.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        The atomic numbers of the atoms in the system of shape `(..., nat)`.
+    weights : Tensor
+        Weights of all reference systems of shape `(..., nat, 7)`.
+    reference : Reference
+        Reference systems for D3 model. Contains the reference C6 coefficients
+        of shape `(..., nelements, nelements, 7, 7)`.
+    pairs : Tensor
+        Pair list of shape `(2, npairs)` with indices into the flattened atoms
+        (see :func:`tad_dftd3.neighbor.neighbor_list`).
+    chunk_size : int | None, optional
+        Number of pairs evaluated at once in the forward and backward pass.
+        Defaults to `None`, i.e., all pairs at once.
+
+    Returns
+    -------
+    Tensor
+        Atomic dispersion coefficients of shape `(npairs,)`.
+    """
+    # Use custom autograd function, which does not store the (npairs, 7, 7)
+    # reference C6 coefficients for the backward pass
     AtomicC6 = AtomicC6_V1 if __tversion__ < (2, 0, 0) else AtomicC6_V2
-    res = AtomicC6.apply(numbers, weights, reference, chunk_size)
+    res = AtomicC6.apply(numbers, weights, reference, chunk_size, False, pairs)
     assert res is not None
     return res
 
 
+def auto_chunk_size(
+    numbers: Tensor,
+    reference: Reference,
+    memory_budget: float | None = None,
+) -> int | None:
+    """
+    Select the largest chunk size for which the intermediate tensor of the C6
+    coefficients (see :func:`_check_memory`) fits into the memory budget.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        The atomic numbers of the atoms in the system of shape `(..., nat)`.
+    reference : Reference
+        Reference systems for D3 model.
+    memory_budget : float | None, optional
+        Memory budget in MB. Defaults to `None`, i.e., the currently available
+        memory of the device.
+
+    Returns
+    -------
+    int | None
+        Chunk size or `None` if no chunking is required.
+
+    Example
+    -------
+    >>> import torch
+    >>> from tad_dftd3.model import auto_chunk_size
+    >>> from tad_dftd3.reference import Reference
+    >>> ref = Reference()
+    >>> numbers = torch.ones(2000, dtype=torch.long)
+    >>> print(auto_chunk_size(numbers, ref, memory_budget=200.0))
+    534
+    """
+    nat = numbers.shape[-1]
+    nref = reference.c6.shape[-1]
+
+    # one row of the (..., nat, nat, 7, 7) tensor for all systems of a batch
+    row = memory.memory_tensor(
+        (*numbers.shape[:-1], nat, nref, nref), reference.c6.dtype
+    )
+
+    if memory_budget is None:
+        memory_budget, _ = memory.memory_device(numbers.device)
+
+    chunk_size = None
+    if row * nat > memory_budget:
+        chunk_size = max(int(memory_budget // row), 1)
+
+    logger.debug(
+        "Chunk size for the C6 coefficients: %s (%d atoms, %.1f MB per row, "
+        "memory budget %.1f MB).",
+        chunk_size,
+        nat,
+        row,
+        memory_budget,
+    )
+    return chunk_size
+
+
 # helpers
 
 
 def _check_memory(
-    numbers: Tensor, weights: Tensor, chunk_size: None | int = None
+    numbers: Tensor,
+    weights: Tensor,
+    reference: Reference,
+    chunk_size: None | int = None,
+    unique: bool = False,
 ) -> None:
     """
     Check memory usage for the construction of the C6 tensor.
@@ -110,19 +317,28 @@ def _check_memory(
         Atomic numbers of the atoms in the system.
     weights : Tensor
         Weights of all reference systems.
+    reference : Reference
+        Reference systems for D3 model.
     chunk_size : None | int, optional
         Chunk size for the calculation of the C6 tensor. Defaults to `None`.
+    unique : bool, optional
+        Only the unique pairs are evaluated. Defaults to `False`.
 
     Raises
     ------
     MemoryError
         If the estimated memory usage exceeds the total available memory.
     """
+    nat = numbers.shape[-1]
+    nref = reference.c6.shape[-1]
+
     # Required memory for the C6 tensor
-    if chunk_size is None:
-        size = (numbers.shape[-1], numbers.shape[-1], 7, 7)
+    if unique is True:
+        size: tuple[int, ...] = (nat * (nat + 1) // 2, nref, nref)
+    elif chunk_size is None:
+        size = (nat, nat, nref, nref)
     else:
-        size = (numbers.shape[-1], chunk_size, 7, 7)
+        size = (nat, chunk_size, nref, nref)
     mem = memory.memory_tensor(size, weights.dtype)
 
     # actual memory usage
@@ -215,6 +431,115 @@ def _atomic_c6_full(
     return _einsum(rc6, weights, weights)
 
 
+def _atomic_c6_unique(
+    numbers: Tensor,
+    weights: Tensor,
+    reference: Reference,
+) -> Tensor:
+    """
+    Calculation of atomic dispersion coefficients for the unique pairs (upper
+    triangle including the diagonal) only. The result is mirrored to the
+    lower triangle.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        The atomic numbers of the atoms in the system of shape `(..., nat)`.
+    weights : Tensor
+        Weights of all reference systems of shape `(..., nat, 7)`.
+    reference : Reference
+        Reference systems for D3 model. Contains the reference C6 coefficients
+        of shape `(..., nelements, nelements, 7, 7)`.
+
+    Returns
+    -------
+    Tensor
+        Atomic dispersion coefficients of shape `(..., nat, nat)`.
+    """
+    nat = numbers.shape[-1]
+    i, j = torch.triu_indices(nat, nat, device=numbers.device)
+
+    # (..., npairs, r1, r2) * (..., npairs, r1) * (..., npairs, r2) -> (..., npairs)
+    rc6 = reference.c6[numbers[..., i], numbers[..., j]]
+    c6 = einsum("...pab,...pa,...pb->...p", rc6, weights[..., i, :], weights[..., j, :])
+
+    # mirror (the diagonal is written twice with the same value)
+    c6_output = c6.new_zeros((*numbers.shape[:-1], nat * nat))
+    c6_output = c6_output.index_copy(-1, i * nat + j, c6)
+    c6_output = c6_output.index_copy(-1, j * nat + i, c6)
+    return c6_output.reshape(*numbers.shape, nat)
+
+
+def _atomic_c6_grouped(
+    numbers: Tensor,
+    weights: Tensor,
+    reference: Reference,
+) -> Tensor:
+    """
+    Calculation of atomic dispersion coefficients with the atoms grouped by
+    element. Every block of an element pair (and its transpose) is obtained
+    from two matrix products.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        The atomic numbers of the atoms in the system of shape `(..., nat)`.
+    weights : Tensor
+        Weights of all reference systems of shape `(..., nat, 7)`.
+    reference : Reference
+        Reference systems for D3 model. Contains the reference C6 coefficients
+        of shape `(..., nelements, nelements, 7, 7)`.
+
+    Returns
+    -------
+    Tensor
+        Atomic dispersion coefficients of shape `(..., nat, nat)`.
+    """
+    # the elements differ between the systems of a batch
+    if numbers.ndim > 1:
+        nat = numbers.shape[-1]
+        return torch.stack(
+            [
+                _atomic_c6_grouped(num, w, reference)
+                for num, w in zip(
+                    numbers.reshape(-1, nat),
+                    weights.reshape(-1, *weights.shape[-2:]),
+                )
+            ]
+        ).reshape(*numbers.shape, nat)
+
+    # sort atoms by element: (nat, 7) -> [(n_A, 7), (n_B, 7), ...]
+    order = torch.argsort(numbers)
+    elements, counts = torch.unique_consecutive(numbers[order], return_counts=True)
+    w = weights[order].split(counts.tolist())
+    z = elements.tolist()
+
+    # upper triangle of the element blocks, the lower one is the transpose
+    blocks: dict[tuple[int, int], Tensor] = {}
+    for a, za in enumerate(z):
+        for b in range(a, len(z)):
+            # (n_A, 7) @ (7, 7) @ (7, n_B) -> (n_A, n_B)
+            blocks[(a, b)] = w[a] @ reference.c6[za, z[b]] @ w[b].mT
+
+    c6 = torch.cat(
+        [
+            torch.cat(
+                [
+                    blocks[(a, b)] if a <= b else blocks[(b, a)].mT
+                    for b in range(len(z))
+                ],
+                dim=-1,
+            )
+            for a in range(len(z))
+        ],
+        dim=-2,
+    )
+
+    # restore the original order of the atoms
+    inv = torch.argsort(order)
+    return c6[inv][:, inv]
+
+
 def _atomic_c6_chunked(
     numbers: Tensor,
     weights: Tensor,
@@ -266,91 +591,375 @@ def _atomic_c6_chunked(
     return c6_output
 
 
-# custom autograd functions
+def _atomic_c6_pairs(
+    numbers: Tensor,
+    weights: Tensor,
+    reference: Reference,
+    pairs: Tensor,
+    chunk_size: None | int = None,
+) -> Tensor:
+    """
+    Calculation of atomic dispersion coefficients for the pairs of a pair list.
 
+    Parameters
+    ----------
+    numbers : Tensor
+        The atomic numbers of the atoms in the system of shape `(..., nat)`.
+    weights : Tensor
+        Weights of all reference systems of shape `(..., nat, 7)`.
+    reference : Reference
+        Reference systems for D3 model. Contains the reference C6 coefficients
+        of shape `(..., nelements, nelements, 7, 7)`.
+    pairs : Tensor
+        Pair list of shape `(2, npairs)` with indices into the flattened atoms.
+    chunk_size : int | None, optional
+        Number of pairs evaluated at once. Defaults to `None`.
 
-class CTX(Protocol):
-    save_for_backward: Callable[[Tensor, Tensor], None]
-    saved_tensors: tuple[Tensor, Tensor]
-    chunk_size: None | int
-    reference: Reference
+    Returns
+    -------
+    Tensor
+        Atomic dispersion coefficients of shape `(npairs,)`.
+    """
+    num = numbers.reshape(-1)
+    w = weights.reshape(-1, weights.shape[-1])
 
+    npairs = pairs.shape[-1]
+    if chunk_size is None:
+        chunk_size = max(npairs, 1)
 
-class AtomicC6Base(torch.autograd.Function):
+    c6 = []
+    for start in range(0, npairs, chunk_size):
+        i, j = pairs[:, start : start + chunk_size]
+
+        # (npairs, r1, r2) * (npairs, r1) * (npairs, r2) -> (npairs,)
+        rc6 = reference.c6[num[i], num[j]]
+        c6.append(einsum("pab,pa,pb->p", rc6, w[i], w[j]))
+
+    if len(c6) == 0:
+        return w.new_zeros((0,))
+    return torch.cat(c6)
+
+
+# derivatives (shared by the custom autograd functions)
+
+
+def _atomic_c6_jvp(
+    numbers: Tensor,
+    weights: Tensor,
+    tangent: Tensor,
+    reference: Reference,
+    chunk_size: None | int = None,
+    unique: bool = False,
+    pairs: Tensor | None = None,
+) -> Tensor:
     """
-    Base class for the version-specific autograd function for atomic C6.
-    Different PyTorch versions only require different `forward()` signatures.
+    Jacobian-vector product of the atomic C6 coefficients w.r.t. the weights,
+    i.e., the symmetrized bilinear form `t_i c_ij w_j + w_i c_ij t_j`.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        The atomic numbers of the atoms in the system of shape `(..., nat)`.
+    weights : Tensor
+        Weights of all reference systems of shape `(..., nat, 7)`.
+    tangent : Tensor
+        Tangent of the weights of shape `(..., nat, 7)`.
+    reference : Reference
+        Reference systems for D3 model.
+    chunk_size : int | None, optional
+        Chunk size (rows or pairs). Defaults to `None`.
+    unique : bool, optional
+        Only evaluate the unique pairs. Defaults to `False`.
+    pairs : Tensor | None, optional
+        Pair list of shape `(2, npairs)`. Defaults to `None`.
+
+    Returns
+    -------
+    Tensor
+        Tangent of the atomic C6 coefficients (same shape as C6).
     """
+    if pairs is not None:
+        num = numbers.reshape(-1)
+        w = weights.reshape(-1, weights.shape[-1])
+        t = tangent.reshape(-1, tangent.shape[-1])
+
+        npairs = pairs.shape[-1]
+        size = chunk_size if chunk_size is not None else max(npairs, 1)
+
+        chunks = []
+        for start in range(0, npairs, size):
+            i, j = pairs[:, start : start + size]
+            rc6 = reference.c6[num[i], num[j]]
+            chunks.append(
+                einsum("pab,pa,pb->p", rc6, t[i], w[j])
+                + einsum("pab,pa,pb->p", rc6, w[i], t[j])
+            )
+
+        if len(chunks) == 0:
+            return w.new_zeros((0,))
+        return torch.cat(chunks)
+
+    if unique is True:
+        nat = numbers.shape[-1]
+        i, j = torch.triu_indices(nat, nat, device=numbers.device)
+
+        rc6 = reference.c6[numbers[..., i], numbers[..., j]]
+        c6_dot = einsum(
+            "...pab,...pa,...pb->...p", rc6, tangent[..., i, :], weights[..., j, :]
+        ) + einsum(
+            "...pab,...pa,...pb->...p", rc6, weights[..., i, :], tangent[..., j, :]
+        )
 
-    @staticmethod
-    def backward(ctx: CTX, grad_out: Tensor) -> tuple[None, Tensor, None, None]:
-        numbers, weights = ctx.saved_tensors
-        chunk_size = ctx.chunk_size
-        ref = ctx.reference
+        # mirror (the diagonal is written twice with the same value)
+        output = c6_dot.new_zeros((*numbers.shape[:-1], nat * nat))
+        output = output.index_copy(-1, i * nat + j, c6_dot)
+        output = output.index_copy(-1, j * nat + i, c6_dot)
+        return output.reshape(*numbers.shape, nat)
 
-        # We need the derivatives of the following expression:
-        # c_ij ​= ∑a,b w_ia *× w_jb ​* c_ijab​
+    if chunk_size is None:
+        rc6 = reference.c6[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
+        c6_dot = _einsum(rc6, tangent, weights)
+        return c6_dot + c6_dot.mT
 
-        ###########################
-        ### Non-chunked version ###
-        ###########################
+    nat = numbers.shape[-1]
+    blocks = []
+    for start in range(0, nat, chunk_size):
+        end = min(start + chunk_size, nat)
 
-        if chunk_size is None:
-            # (..., nel, nel, 7, 7) -> (..., nat, nat, 7, 7)
-            rc6 = ref.c6[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
+        # (..., chunk_size, nat, 7, 7)
+        rc6_chunk = reference.c6[numbers[..., start:end, None], numbers.unsqueeze(-2)]
+        blocks.append(
+            _einsum(rc6_chunk, tangent[..., start:end, :], weights)
+            + _einsum(rc6_chunk, weights[..., start:end, :], tangent)
+        )
 
-            # ∂c_ij/∂w_jb = ∑a w_ia * c_ijab
-            # (..., n1, n2, r1, r2) * (..., n2, r2) -> (..., n1, n2, r2)
-            g_jb = einsum("...ijab,...ia->...ijb", rc6, weights)
+    return torch.cat(blocks, dim=-2)
+
+
+def _atomic_c6_vjp(
+    numbers: Tensor,
+    weights: Tensor,
+    grad_out: Tensor,
+    reference: Reference,
+    chunk_size: None | int = None,
+    unique: bool = False,
+    pairs: Tensor | None = None,
+) -> Tensor:
+    """
+    Vector-Jacobian product of the atomic C6 coefficients w.r.t. the weights.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        The atomic numbers of the atoms in the system of shape `(..., nat)`.
+    weights : Tensor
+        Weights of all reference systems of shape `(..., nat, 7)`.
+    grad_out : Tensor
+        Gradient w.r.t. the atomic C6 coefficients (same shape as C6).
+    reference : Reference
+        Reference systems for D3 model.
+    chunk_size : int | None, optional
+        Chunk size (rows or pairs). Defaults to `None`.
+    unique : bool, optional
+        Only evaluate the unique pairs. Defaults to `False`.
+    pairs : Tensor | None, optional
+        Pair list of shape `(2, npairs)`. Defaults to `None`.
+
+    Returns
+    -------
+    Tensor
+        Gradient w.r.t. the weights of shape `(..., nat, 7)`.
+    """
+    # We need the derivatives of the following expression:
+    # c_ij ​= ∑a,b w_ia *× w_jb ​* c_ijab​
 
-            # vjp: (..., n1, n2) * (..., n1, n2, r2) -> (..., n2, r2)
-            _gj = einsum("...ij,...ijb->...jb", grad_out, g_jb)
+    #########################
+    ### Pair-list version ###
+    #########################
+
+    if pairs is not None:
+        num = numbers.reshape(-1)
+        w = weights.reshape(-1, weights.shape[-1])
+        weights_bar = torch.zeros_like(w)
+
+        npairs = pairs.shape[-1]
+        size = chunk_size if chunk_size is not None else max(npairs, 1)
+
+        for start in range(0, npairs, size):
+            i, j = pairs[:, start : start + size]
+            g = grad_out[start : start + size].unsqueeze(-1)
+
+            rc6 = reference.c6[num[i], num[j]]
 
             # ∂c_ij/∂w_ia = ∑b w_jb * c_ijab
-            # (..., n1, n2, r1, r2) * (..., n2, r2) -> (..., n1, n2, r1)
-            g_ia = einsum("...ijab,...jb->...ija", rc6, weights)
+            g_ia = einsum("pab,pb->pa", rc6, w[j])
+
+            # ∂c_ij/∂w_jb = ∑a w_ia * c_ijab
+            g_jb = einsum("pab,pa->pb", rc6, w[i])
+
+            weights_bar = weights_bar.index_add(0, i, g * g_ia)
+            weights_bar = weights_bar.index_add(0, j, g * g_jb)
+
+        return weights_bar.reshape(weights.shape)
 
-            # vjp: (..., n1, n2) * (..., n1, n2, r1) -> (..., n1, r1)
-            _gi = einsum("...ij,...ija->...ia", grad_out, g_ia)
+    ###########################
+    ### Unique-pair version ###
+    ###########################
+
+    if unique is True:
+        nat = numbers.shape[-1]
+        i, j = torch.triu_indices(nat, nat, device=numbers.device)
+
+        # c_ij and c_ji share the same pair: sum both gradients (once on
+        # the diagonal)
+        g = torch.where(
+            i == j,
+            grad_out[..., i, j],
+            grad_out[..., i, j] + grad_out[..., j, i],
+        )
 
-            weights_bar = _gi + _gj
+        rc6 = reference.c6[numbers[..., i], numbers[..., j]]
 
-            return None, weights_bar, None, None
+        # ∂c_ij/∂w_ia = ∑b w_jb * c_ijab
+        g_ia = einsum("...pab,...pb->...pa", rc6, weights[..., j, :])
 
-        #######################
-        ### Chunked version ###
-        #######################
+        # ∂c_ij/∂w_jb = ∑a w_ia * c_ijab
+        g_jb = einsum("...pab,...pa->...pb", rc6, weights[..., i, :])
 
-        nat = weights.shape[-2]
+        g = g.unsqueeze(-1)
         weights_bar = torch.zeros_like(weights)
+        weights_bar = weights_bar.index_add(-2, i, g * g_ia)
+        weights_bar = weights_bar.index_add(-2, j, g * g_jb)
 
-        for start in range(0, nat, chunk_size):
-            end = min(start + chunk_size, nat)
+        return weights_bar
 
-            # Numbers and derivatives for this chunk
-            grad_chunk = grad_out[..., start:end, :]  # (..., chunk_size, nat)
-            num_chunk = numbers[..., start:end]  # (..., chunk_size)
+    ###########################
+    ### Non-chunked version ###
+    ###########################
 
-            # Chunked indexing into reference.c6: (..., chunk_size, nat, 7, 7)
-            # -> Only the "i" index is chunked!
-            rc6_chunk = ref.c6[num_chunk.unsqueeze(-1), numbers.unsqueeze(-2)]
+    if chunk_size is None:
+        # (..., nel, nel, 7, 7) -> (..., nat, nat, 7, 7)
+        rc6 = reference.c6[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
+
+        # ∂c_ij/∂w_jb = ∑a w_ia * c_ijab
+        # (..., n1, n2, r1, r2) * (..., n2, r2) -> (..., n1, n2, r2)
+        g_jb = einsum("...ijab,...ia->...ijb", rc6, weights)
+
+        # vjp: (..., n1, n2) * (..., n1, n2, r2) -> (..., n2, r2)
+        _gj = einsum("...ij,...ijb->...jb", grad_out, g_jb)
 
-            # Also chunk the weights: (..., chunk_size, 7)
-            weights_chunk = weights[..., start:end, :]
+        # ∂c_ij/∂w_ia = ∑b w_jb * c_ijab
+        # (..., n1, n2, r1, r2) * (..., n2, r2) -> (..., n1, n2, r1)
+        g_ia = einsum("...ijab,...jb->...ija", rc6, weights)
 
-            # _gi derivative is chunked (sum over non-chunked "j" index)
-            g_ia = einsum("...ijab,...jb->...ija", rc6_chunk, weights)
-            _gi = einsum("...ij,...ija->...ia", grad_chunk, g_ia)
+        # vjp: (..., n1, n2) * (..., n1, n2, r1) -> (..., n1, r1)
+        _gi = einsum("...ij,...ija->...ia", grad_out, g_ia)
 
-            # _gj derivative is NOT chunked (sum over chunked "i" index)
-            g_jb = einsum("...ijab,...ia->...ijb", rc6_chunk, weights_chunk)
-            _gj = einsum("...ij,...ijb->...jb", grad_chunk, g_jb)
+        return _gi + _gj
 
-            # Accumulate gradients for the current chunk
-            weights_bar[..., start:end, :] += _gi
-            weights_bar += _gj
+    #######################
+    ### Chunked version ###
+    #######################
 
-        return None, weights_bar, None, None
+    nat = weights.shape[-2]
+    _gi_chunks = []
+    _gj = torch.zeros_like(weights)
+
+    for start in range(0, nat, chunk_size):
+        end = min(start + chunk_size, nat)
+
+        # Numbers and derivatives for this chunk
+        grad_chunk = grad_out[..., start:end, :]  # (..., chunk_size, nat)
+        num_chunk = numbers[..., start:end]  # (..., chunk_size)
+
+        # Chunked indexing into reference.c6: (..., chunk_size, nat, 7, 7)
+        # -> Only the "i" index is chunked!
+        rc6_chunk = reference.c6[num_chunk.unsqueeze(-1), numbers.unsqueeze(-2)]
+
+        # Also chunk the weights: (..., chunk_size, 7)
+        weights_chunk = weights[..., start:end, :]
+
+        # _gi derivative is chunked (sum over non-chunked "j" index)
+        g_ia = einsum("...ijab,...jb->...ija", rc6_chunk, weights)
+        _gi_chunks.append(einsum("...ij,...ija->...ia", grad_chunk, g_ia))
+
+        # _gj derivative is NOT chunked (sum over chunked "i" index)
+        g_jb = einsum("...ijab,...ia->...ijb", rc6_chunk, weights_chunk)
+        _gj = _gj + einsum("...ij,...ijb->...jb", grad_chunk, g_jb)
+
+    # no in-place accumulation (the vjp is also evaluated within `vmap`)
+    return torch.cat(_gi_chunks, dim=-2) + _gj
+
+
+# custom autograd functions
+
+
+class CTX(Protocol):
+    save_for_backward: Callable[..., None]
+    save_for_forward: Callable[..., None]
+    saved_tensors: tuple[Tensor, ...]
+    needs_input_grad: tuple[bool, ...]
+    chunk_size: None | int
+    unique: bool
+    reference: Reference
+    forward_ad: bool
+
+
+def _vjp(
+    numbers: Tensor,
+    weights: Tensor,
+    grad_out: Tensor,
+    reference: Reference,
+    chunk_size: None | int,
+    unique: bool,
+    pairs: Tensor | None,
+    forward_ad: bool = False,
+) -> Tensor:
+    """
+    Differentiable vector-Jacobian product of the atomic C6 coefficients (see
+    :class:`AtomicC6VjpBase`).
+    """
+    if __tversion__ < (2, 0, 0):
+        AtomicC6Vjp: type[AtomicC6VjpBase] = AtomicC6Vjp_V1
+    elif forward_ad is True:
+        AtomicC6Vjp = AtomicC6VjpFwd_V2
+    else:
+        AtomicC6Vjp = AtomicC6Vjp_V2
+
+    res = AtomicC6Vjp.apply(
+        numbers, weights, grad_out, reference, chunk_size, unique, pairs
+    )
+    assert res is not None
+    return res
+
+
+class AtomicC6Base(torch.autograd.Function):
+    """
+    Base class for the version-specific autograd function for atomic C6.
+    Different PyTorch versions only require different `forward()` signatures.
+    """
+
+    @staticmethod
+    def backward(
+        ctx: CTX, grad_out: Tensor
+    ) -> tuple[None, Tensor, None, None, None, None]:
+        numbers, weights, pairs = ctx.saved_tensors
+
+        # The vjp is a custom autograd function itself. Hence, higher
+        # derivatives do not store the gathered reference C6 coefficients but
+        # recompute them (chunk-wise) in the backward pass.
+        weights_bar = _vjp(
+            numbers,
+            weights,
+            grad_out,
+            ctx.reference,
+            ctx.chunk_size,
+            ctx.unique,
+            pairs,
+            ctx.forward_ad,
+        )
+
+        return None, weights_bar, None, None, None, None
 
 
 class AtomicC6_V1(AtomicC6Base):
@@ -366,10 +975,20 @@ class AtomicC6_V1(AtomicC6Base):
         weights: Tensor,
         reference: Reference,
         chunk_size: None | int = None,
+        unique: bool = False,
+        pairs: Tensor | None = None,
     ) -> Tensor:
-        ctx.save_for_backward(numbers, weights)
+        ctx.save_for_backward(numbers, weights, pairs)
         ctx.chunk_size = chunk_size
+        ctx.unique = unique
         ctx.reference = reference
+        ctx.forward_ad = False
+
+        if pairs is not None:
+            return _atomic_c6_pairs(numbers, weights, reference, pairs, chunk_size)
+
+        if unique is True:
+            return _atomic_c6_unique(numbers, weights, reference)
 
         if chunk_size is None:
             return _atomic_c6_full(numbers, weights, reference)
@@ -393,7 +1012,15 @@ class AtomicC6_V2(AtomicC6Base):
         weights: Tensor,
         reference: Reference,
         chunk_size: None | int = None,
+        unique: bool = False,
+        pairs: Tensor | None = None,
     ) -> Tensor:
+        if pairs is not None:
+            return _atomic_c6_pairs(numbers, weights, reference, pairs, chunk_size)
+
+        if unique is True:
+            return _atomic_c6_unique(numbers, weights, reference)
+
         if chunk_size is None:
             return _atomic_c6_full(numbers, weights, reference)
 
@@ -402,11 +1029,188 @@ class AtomicC6_V2(AtomicC6Base):
     @staticmethod
     def setup_context(
         ctx: CTX,
-        inputs: tuple[Tensor, Tensor, Reference, int | None],
+        inputs: tuple[Tensor, Tensor, Reference, int | None, bool, Tensor | None],
+        output: Tensor,
+    ) -> None:
+        numbers, weights, reference, chunk_size, unique, pairs = inputs
+
+        ctx.save_for_backward(numbers, weights, pairs)
+        ctx.chunk_size = chunk_size
+        ctx.unique = unique
+        ctx.reference = reference
+        ctx.forward_ad = False
+
+
+class AtomicC6Fwd_V2(AtomicC6_V2):
+    """
+    Custom autograd function for atomic C6 coefficients with support for
+    forward-mode AD (e.g., `torch.func.jvp` and `torch.func.jacfwd`).
+
+    Separate from :class:`AtomicC6_V2`, since `torch.compile` does not
+    support custom autograd functions with a `jvp`.
+    """
+
+    @staticmethod
+    def setup_context(
+        ctx: CTX,
+        inputs: tuple[Tensor, Tensor, Reference, int | None, bool, Tensor | None],
+        output: Tensor,
+    ) -> None:
+        AtomicC6_V2.setup_context(ctx, inputs, output)
+
+        numbers, weights, _, _, _, pairs = inputs
+        ctx.save_for_forward(numbers, weights, pairs)
+        ctx.forward_ad = True
+
+    @staticmethod
+    def jvp(ctx: CTX, _: None, weights_dot: Tensor, *__: None) -> Tensor:
+        numbers, weights, pairs = ctx.saved_tensors
+
+        # ∂c_ij = ∑a,b (∂w_ia * w_jb + w_ia * ∂w_jb) * c_ijab
+        return _atomic_c6_jvp(
+            numbers,
+            weights,
+            weights_dot,
+            ctx.reference,
+            ctx.chunk_size,
+            ctx.unique,
+            pairs,
+        )
+
+
+class AtomicC6VjpBase(torch.autograd.Function):
+    """
+    Base class for the version-specific autograd function for the
+    vector-Jacobian product of the atomic C6 coefficients, i.e., the backward
+    pass of :class:`AtomicC6Base`.
+
+    The vjp is bilinear in the weights `w` and the incoming gradient `g`.
+    Its derivatives are given by the jvp of the C6 coefficients (w.r.t. `g`)
+    and the vjp itself (w.r.t. `w`). Only `w` and `g` are saved.
+    """
+
+    @staticmethod
+    def backward(
+        ctx: CTX, grad_out: Tensor
+    ) -> tuple[None, Tensor | None, Tensor | None, None, None, None, None]:
+        numbers, weights, grad_c6, pairs = ctx.saved_tensors
+        needs = ctx.needs_input_grad
+        args = (ctx.reference, ctx.chunk_size, ctx.unique, pairs)
+
+        weights_bar = None
+        if needs[1]:
+            weights_bar = _vjp(numbers, grad_out, grad_c6, *args, ctx.forward_ad)
+
+        grad_c6_bar = None
+        if needs[2]:
+            grad_c6_bar = _atomic_c6_jvp(numbers, weights, grad_out, *args)
+
+        return None, weights_bar, grad_c6_bar, None, None, None, None
+
+
+class AtomicC6Vjp_V1(AtomicC6VjpBase):
+    """
+    Custom autograd function for the vector-Jacobian product of the atomic C6
+    coefficients.
+    """
+
+    @staticmethod
+    def forward(
+        ctx: CTX,
+        numbers: Tensor,
+        weights: Tensor,
+        grad_c6: Tensor,
+        reference: Reference,
+        chunk_size: None | int,
+        unique: bool,
+        pairs: Tensor | None,
+    ) -> Tensor:
+        ctx.save_for_backward(numbers, weights, grad_c6, pairs)
+        ctx.chunk_size = chunk_size
+        ctx.unique = unique
+        ctx.reference = reference
+        ctx.forward_ad = False
+
+        return _atomic_c6_vjp(
+            numbers, weights, grad_c6, reference, chunk_size, unique, pairs
+        )
+
+
+class AtomicC6Vjp_V2(AtomicC6VjpBase):
+    """
+    Custom autograd function for the vector-Jacobian product of the atomic C6
+    coefficients.
+    """
+
+    generate_vmap_rule = True
+
+    @staticmethod
+    def forward(
+        numbers: Tensor,
+        weights: Tensor,
+        grad_c6: Tensor,
+        reference: Reference,
+        chunk_size: None | int,
+        unique: bool,
+        pairs: Tensor | None,
+    ) -> Tensor:
+        return _atomic_c6_vjp(
+            numbers, weights, grad_c6, reference, chunk_size, unique, pairs
+        )
+
+    @staticmethod
+    def setup_context(
+        ctx: CTX,
+        inputs: tuple[
+            Tensor, Tensor, Tensor, Reference, int | None, bool, Tensor | None
+        ],
         output: Tensor,
     ) -> None:
-        numbers, weights, reference, chunk_size = inputs
+        numbers, weights, grad_c6, reference, chunk_size, unique, pairs = inputs
 
-        ctx.save_for_backward(numbers, weights)
+        ctx.save_for_backward(numbers, weights, grad_c6, pairs)
         ctx.chunk_size = chunk_size
+        ctx.unique = unique
         ctx.reference = reference
+        ctx.forward_ad = False
+
+
+class AtomicC6VjpFwd_V2(AtomicC6Vjp_V2):
+    """
+    Custom autograd function for the vector-Jacobian product of the atomic C6
+    coefficients with support for forward-mode AD (forward-over-reverse).
+    """
+
+    @staticmethod
+    def setup_context(
+        ctx: CTX,
+        inputs: tuple[
+            Tensor, Tensor, Tensor, Reference, int | None, bool, Tensor | None
+        ],
+        output: Tensor,
+    ) -> None:
+        AtomicC6Vjp_V2.setup_context(ctx, inputs, output)
+
+        numbers, weights, grad_c6, _, _, _, pairs = inputs
+        ctx.save_for_forward(numbers, weights, grad_c6, pairs)
+        ctx.forward_ad = True
+
+    @staticmethod
+    def jvp(
+        ctx: CTX,
+        _: None,
+        weights_dot: Tensor | None,
+        grad_c6_dot: Tensor | None,
+        *__: None,
+    ) -> Tensor:
+        numbers, weights, grad_c6, pairs = ctx.saved_tensors
+        args = (ctx.reference, ctx.chunk_size, ctx.unique, pairs)
+
+        # bilinear: ∂v(w, g) = v(∂w, g) + v(w, ∂g)
+        out = torch.zeros_like(weights)
+        if weights_dot is not None:
+            out = out + _atomic_c6_vjp(numbers, weights_dot, grad_c6, *args)
+        if grad_c6_dot is not None:
+            out = out + _atomic_c6_vjp(numbers, weights, grad_c6_dot, *args)
+
+        return out
@@ -0,0 +1,334 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Model: Fused C6
+===============
+
+Fused evaluation of the coordination number, the Gaussian weights of the
+reference systems and the atomic C6 coefficients.
+
+Instead of three separate stages that are all recorded by autograd, the C6
+coefficients are returned together with their derivative w.r.t. the
+coordination number (as the Fortran implementation does). The backward pass
+is carried out analytically from the C6 coefficients to the positions, so
+that only the inputs and the `(..., nat, nat)` derivative are saved.
+
+Only the default exponential counting function and the Gaussian weighting
+function are supported.
+
+Examples
+--------
+>>> import torch
+>>> import tad_dftd3 as d3
+>>> import tad_mctc as mctc
+>>> numbers = mctc.convert.symbol_to_number(["O", "H", "H"])
+>>> positions = torch.tensor([
+...     [+0.00000000000000, +0.00000000000000, -0.73578586109551],
+...     [+1.44183152868459, +0.00000000000000, +0.36789293054775],
+...     [-1.44183152868459, +0.00000000000000, +0.36789293054775],
+... ], dtype=torch.double)
+>>> ref = d3.reference.Reference(dtype=torch.double)
+>>> c6, dc6dcn = d3.model.atomic_c6_fused(numbers, positions, ref)
+>>> torch.set_printoptions(precision=7)
+>>> print(c6)
+tensor([[10.4130470,  5.4368823,  5.4368823],
+        [ 5.4368823,  3.0930153,  3.0930153],
+        [ 5.4368823,  3.0930153,  3.0930153]], dtype=torch.float64)
+"""
+from __future__ import annotations
+
+import torch
+from tad_mctc._version import __tversion__
+from tad_mctc.batch import real_pairs
+from tad_mctc.math import einsum
+
+from .. import data, defaults, distance
+from ..ncoord.count import dexp_count, exp_count
+from ..reference import Reference
+from ..typing import DD, Callable, Protocol, Tensor
+from .weights import (
+    LOG_WEIGHTING,
+    _gather_references,
+    _weights_softmax,
+    gaussian_weight,
+)
+
+__all__ = ["atomic_c6_fused"]
+
+
+def atomic_c6_fused(
+    numbers: Tensor,
+    positions: Tensor,
+    reference: Reference,
+    rcov: Tensor | None = None,
+    cutoff: Tensor | None = None,
+) -> tuple[Tensor, Tensor]:
+    """
+    Atomic C6 coefficients and their derivative w.r.t. the coordination
+    number directly from the positions.
+
+    The C6 coefficients are differentiable w.r.t. the positions (also to
+    higher orders). The derivative w.r.t. the coordination number is not
+    differentiable.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system of shape `(..., nat)`.
+    positions : Tensor
+        Cartesian coordinates of the atoms in the system of shape
+        `(..., nat, 3)`.
+    reference : Reference
+        Reference systems for D3 model.
+    rcov : Tensor | None, optional
+        Covalent radii of the atoms in the system. Defaults to `None`, i.e.,
+        :data:`tad_dftd3.data.COV_D3`.
+    cutoff : Tensor | None, optional
+        Real-space cutoff of the coordination number. Defaults to `None`,
+        i.e., :data:`tad_dftd3.defaults.D3_CN_CUTOFF`.
+
+    Returns
+    -------
+    tuple[Tensor, Tensor]
+        Atomic C6 coefficients `C6_ij` and their derivative `∂C6_ij/∂CN_i`,
+        both of shape `(..., nat, nat)`.
+
+    Raises
+    ------
+    ValueError
+        Shape of positions or covalent radii is not consistent with atomic
+        numbers, or the covalent radii require a gradient.
+    """
+    dd: DD = {"device": positions.device, "dtype": positions.dtype}
+
+    if cutoff is None:
+        cutoff = torch.tensor(defaults.D3_CN_CUTOFF, **dd)
+    if rcov is None:
+        rcov = data.COV_D3.to(**dd)[numbers]
+
+    if numbers.shape != rcov.shape:
+        raise ValueError(
+            "Shape of covalent radii is not consistent with atomic numbers.",
+        )
+    if numbers.shape != positions.shape[:-1]:
+        raise ValueError(
+            "Shape of positions is not consistent with atomic numbers.",
+        )
+    if rcov.requires_grad is True:
+        raise ValueError(
+            "Fused C6 coefficients are only differentiable w.r.t. positions."
+        )
+
+    FusedC6 = FusedC6_V1 if __tversion__ < (2, 0, 0) else FusedC6_V2
+    res = FusedC6.apply(numbers, positions, reference, rcov, cutoff)
+    assert res is not None
+    return res
+
+
+def _distances(
+    numbers: Tensor, positions: Tensor, rcov: Tensor, cutoff: Tensor
+) -> tuple[Tensor, Tensor, Tensor]:
+    """
+    Pairwise quantities of the coordination number.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system.
+    positions : Tensor
+        Cartesian coordinates of the atoms in the system.
+    rcov : Tensor
+        Covalent radii of the atoms in the system.
+    cutoff : Tensor
+        Real-space cutoff.
+
+    Returns
+    -------
+    tuple[Tensor, Tensor, Tensor]
+        Mask of counted pairs, distances and sum of the covalent radii.
+    """
+    eps = torch.tensor(
+        torch.finfo(positions.dtype).eps,
+        device=positions.device,
+        dtype=positions.dtype,
+    )
+
+    mask = real_pairs(numbers, mask_diagonal=True)
+    distances = torch.where(mask, distance.cdist(positions, positions), eps)
+    mask = mask * (distances <= cutoff)
+
+    rc = rcov.unsqueeze(-1) + rcov.unsqueeze(-2)
+    return mask, distances, rc
+
+
+def _fused(
+    numbers: Tensor,
+    positions: Tensor,
+    reference: Reference,
+    rcov: Tensor,
+    cutoff: Tensor,
+) -> tuple[Tensor, Tensor]:
+    """
+    Atomic C6 coefficients and their derivative w.r.t. the coordination number
+    with plain PyTorch operations.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system.
+    positions : Tensor
+        Cartesian coordinates of the atoms in the system.
+    reference : Reference
+        Reference systems for D3 model.
+    rcov : Tensor
+        Covalent radii of the atoms in the system.
+    cutoff : Tensor
+        Real-space cutoff.
+
+    Returns
+    -------
+    tuple[Tensor, Tensor]
+        Atomic C6 coefficients and their derivative w.r.t. the coordination
+        number of the first atom.
+    """
+    zero = torch.tensor(0.0, device=positions.device, dtype=positions.dtype)
+
+    mask, distances, rc = _distances(numbers, positions, rcov, cutoff)
+    cf = torch.where(mask, exp_count(distances, rc, defaults.D3_KCN), zero)
+    cn = torch.sum(cf, dim=-1)
+
+    # Gaussian weights as softmax of the exponents (identical to the weights,
+    # including the underflow fallback, of `weight_references`)
+    log_weighting = LOG_WEIGHTING[gaussian_weight]
+    weights = _weights_softmax(numbers, cn, reference, log_weighting)
+
+    # ∂w_a/∂CN = w_a (∂e_a/∂CN - ∑_b w_b ∂e_b/∂CN) with ∂e_a/∂CN = -8 ΔCN_a,
+    # which vanishes for the fallback (single weight of one)
+    refcn, valid, _ = _gather_references(numbers, reference)
+    dexpo = torch.where(valid, -8.0 * (cn.unsqueeze(-1) - refcn), zero)
+    dweights = weights * (dexpo - torch.sum(weights * dexpo, dim=-1, keepdim=True))
+
+    # single gather of the reference C6: (..., nat, nat, 7, 7)
+    rc6 = reference.c6[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
+    rc6w = einsum("...ijab,...jb->...ija", rc6, weights)
+
+    c6 = einsum("...ija,...ia->...ij", rc6w, weights)
+    dc6dcn = einsum("...ija,...ia->...ij", rc6w, dweights)
+    return c6, dc6dcn
+
+
+class CTX(Protocol):
+    save_for_backward: Callable[..., None]
+    saved_tensors: tuple[Tensor, ...]
+    needs_input_grad: tuple[bool, ...]
+    mark_non_differentiable: Callable[..., None]
+    reference: Reference
+
+
+class FusedC6Base(torch.autograd.Function):
+    """
+    Base class for the version-specific autograd function for the fused C6
+    coefficients.
+    Different PyTorch versions only require different `forward()` signatures.
+    """
+
+    @staticmethod
+    def backward(
+        ctx: CTX, grad_out: Tensor, _: Tensor
+    ) -> tuple[None, Tensor | None, None, None, None]:
+        numbers, positions, rcov, cutoff, dc6dcn = ctx.saved_tensors
+
+        if not ctx.needs_input_grad[1]:
+            return None, None, None, None, None
+
+        # For higher derivatives, the derivative w.r.t. the coordination
+        # number must be part of the graph, which requires a recomputation.
+        if torch.is_grad_enabled():
+            _, dc6dcn = _fused(numbers, positions, ctx.reference, rcov, cutoff)
+
+        # We need the derivatives of the following expression:
+        # C6_ij = ∑a,b w_ia(CN_i) * w_jb(CN_j) * c_ijab
+        # with CN_k = ∑_l f(r_kl) and ∂C6_ij/∂CN_j = ∂C6_ji/∂CN_j (symmetry)
+
+        # vjp w.r.t. the coordination number
+        cn_bar = torch.sum((grad_out + grad_out.mT) * dc6dcn, dim=-1)
+
+        # ∂E/∂R_k = ∑_l (cn_bar_k + cn_bar_l) f'(r_kl) (R_k - R_l) / r_kl
+        zero = torch.tensor(0.0, device=positions.device, dtype=positions.dtype)
+        mask, distances, rc = _distances(numbers, positions, rcov, cutoff)
+        dcf = torch.where(mask, dexp_count(distances, rc, defaults.D3_KCN), zero)
+
+        w = (cn_bar.unsqueeze(-1) + cn_bar.unsqueeze(-2)) * dcf / distances
+        positions_bar = w.sum(-1, keepdim=True) * positions - w @ positions
+
+        return None, positions_bar, None, None, None
+
+
+class FusedC6_V1(FusedC6Base):
+    """
+    Custom autograd function for the fused C6 coefficients.
+    This is supposed to reduce memory usage.
+    """
+
+    @staticmethod
+    def forward(
+        ctx: CTX,
+        numbers: Tensor,
+        positions: Tensor,
+        reference: Reference,
+        rcov: Tensor,
+        cutoff: Tensor,
+    ) -> tuple[Tensor, Tensor]:
+        c6, dc6dcn = _fused(numbers, positions, reference, rcov, cutoff)
+
+        ctx.mark_non_differentiable(dc6dcn)
+        ctx.save_for_backward(numbers, positions, rcov, cutoff, dc6dcn)
+        ctx.reference = reference
+
+        return c6, dc6dcn
+
+
+class FusedC6_V2(FusedC6Base):
+    """
+    Custom autograd function for the fused C6 coefficients.
+    This is supposed to reduce memory usage.
+    """
+
+    generate_vmap_rule = True
+    # https://pytorch.org/docs/master/notes/extending.func.html#automatically-generate-a-vmap-rule
+    # should work since we only use PyTorch operations
+
+    @staticmethod
+    def forward(
+        numbers: Tensor,
+        positions: Tensor,
+        reference: Reference,
+        rcov: Tensor,
+        cutoff: Tensor,
+    ) -> tuple[Tensor, Tensor]:
+        return _fused(numbers, positions, reference, rcov, cutoff)
+
+    @staticmethod
+    def setup_context(
+        ctx: CTX,
+        inputs: tuple[Tensor, Tensor, Reference, Tensor, Tensor],
+        output: tuple[Tensor, Tensor],
+    ) -> None:
+        numbers, positions, reference, rcov, cutoff = inputs
+        _, dc6dcn = output
+
+        ctx.mark_non_differentiable(dc6dcn)
+        ctx.save_for_backward(numbers, positions, rcov, cutoff, dc6dcn)
+        ctx.reference = reference
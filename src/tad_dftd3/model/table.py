@@ -0,0 +1,424 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Model: Interpolated C6
+======================
+
+Tabulated C6 coefficients as function of the coordination numbers of both
+atoms, `C6(CN_A, CN_B)`, for every pair of elements. The table is obtained
+once from the reference systems and the weighting function. Afterwards, the
+C6 coefficients are interpolated instead of contracting the Gaussian weights
+with the reference C6 coefficients for every pair.
+
+The interpolation is a bicubic Hermite interpolation on a uniform grid for
+every element. Besides the C6 coefficients, their derivatives with respect
+to both coordination numbers and the mixed derivative are tabulated, which
+are evaluated exactly from the derivatives of the weights. The number of grid
+points is doubled until the interpolation error at the cell centers is below
+the requested (relative) tolerance.
+
+Coordination numbers beyond the grid (by default, up to the largest reference
+coordination number of an element plus two) are clamped to the grid, where the
+C6 coefficient is constant to many digits.
+
+Example
+-------
+>>> import torch
+>>> import tad_dftd3 as d3
+>>> numbers = torch.tensor([8, 1, 1])
+>>> cn = torch.tensor([1.9887, 0.9923, 0.9923], dtype=torch.double)
+>>> ref = d3.reference.Reference(dtype=torch.double)
+>>> table = d3.model.C6Table(ref, numbers, tol=1e-6)
+>>> c6 = d3.model.interpolate_c6(numbers, cn, table)
+>>> weights = d3.model.weight_references(numbers, cn, ref)
+>>> exact = d3.model.atomic_c6(numbers, weights, ref)
+>>> print(torch.allclose(c6, exact, rtol=1e-6))
+True
+"""
+from __future__ import annotations
+
+import torch
+from tad_mctc.math import einsum
+
+from .. import defaults
+from ..reference import Reference
+from ..typing import DD, Any, Tensor, WeightingFunction, is_compiling
+from .weights import gaussian_weight, weight_references
+
+__all__ = ["C6Table", "interpolate_c6"]
+
+
+class C6Table:
+    """
+    Tabulated C6 coefficients of all element pairs on a grid of coordination
+    numbers for the bicubic Hermite interpolation.
+    """
+
+    elements: Tensor
+    """Atomic numbers of the tabulated elements (always including zero)."""
+
+    index: Tensor
+    """Index of every atomic number in the table (`-1` if not tabulated)."""
+
+    cnmax: Tensor
+    """Largest coordination number of the grid of every element."""
+
+    values: Tensor
+    """
+    C6 coefficients and their derivatives of shape
+    `(nel, nel, npoints, npoints, 2, 2)`, where the last two axes denote the
+    order of the derivative with respect to `CN_A` and `CN_B`.
+    """
+
+    error: float
+    """Largest relative interpolation error at the cell centers."""
+
+    __slots__ = ["elements", "index", "cnmax", "values", "error"]
+
+    def __init__(
+        self,
+        reference: Reference,
+        numbers: Tensor,
+        weighting_function: WeightingFunction = gaussian_weight,
+        tol: float = 1e-6,
+        margin: float = 2.0,
+        npoints: int = 9,
+        max_points: int = 513,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Tabulate the C6 coefficients.
+
+        Parameters
+        ----------
+        reference : Reference
+            Reference systems for D3 model.
+        numbers : Tensor
+            Atomic numbers of the elements to tabulate (any shape). The size
+            of the table grows quadratically with the number of elements.
+        weighting_function : Callable, optional
+            Function to calculate weight of individual reference systems.
+            Additional keyword arguments are passed through to the function.
+        tol : float, optional
+            Relative tolerance of the interpolated C6 coefficients at the
+            centers of the grid cells. Defaults to `1e-6`.
+        margin : float, optional
+            The grid of an element ranges from zero to its largest reference
+            coordination number plus `margin`. Defaults to `2.0`.
+        npoints : int, optional
+            Initial number of grid points per element. Defaults to `9`.
+        max_points : int, optional
+            Largest number of grid points per element. Defaults to `513`.
+
+        Raises
+        ------
+        ValueError
+            The tolerance is not reached with `max_points` grid points.
+        """
+        dd: DD = {"device": reference.device, "dtype": reference.dtype}
+        device = reference.device
+
+        elements = torch.unique(
+            torch.cat((numbers.reshape(-1), numbers.new_zeros(1)))
+        ).to(device)
+
+        self.elements = elements
+        self.index = torch.full(
+            (defaults.MAX_ELEMENT,), -1, device=device, dtype=torch.long
+        )
+        self.index[elements] = torch.arange(len(elements), device=device)
+
+        # (nel, nref) -> (nel,)
+        refcn = reference.cn[elements]
+        self.cnmax = torch.clamp(torch.max(refcn, dim=-1)[0], min=0.0) + margin
+
+        while True:
+            # grid for every element: (nel, npoints)
+            grid = torch.linspace(0, 1, npoints, **dd)
+            self.values = _tabulate(
+                elements,
+                self.cnmax.unsqueeze(-1) * grid,
+                reference,
+                weighting_function,
+                **kwargs,
+            )
+
+            # exact values at the cell centers: (nel, npoints - 1)
+            centers = (grid[1:] + grid[:-1]) / 2
+            exact = _tabulate(
+                elements,
+                self.cnmax.unsqueeze(-1) * centers,
+                reference,
+                weighting_function,
+                derivatives=False,
+                **kwargs,
+            )
+
+            # interpolation at the cell centers (row-wise to limit the
+            # memory of the corner values)
+            index = torch.arange(len(elements), device=device)
+            i, b = _basis(
+                self.cnmax.unsqueeze(-1) * centers,
+                self.cnmax.unsqueeze(-1),
+                npoints,
+            )
+
+            self.error = 0.0
+            for a in range(len(elements)):
+                corners = _corners(
+                    self.values,
+                    a,
+                    index.view(-1, 1, 1),
+                    i[a].view(1, -1, 1),
+                    i.view(-1, 1, npoints - 1),
+                )
+                c6 = einsum("bijpqxy,ipx,bjqy->bij", corners, b[a], b)
+
+                tiny = torch.finfo(c6.dtype).tiny
+                error = torch.abs(c6 - exact[a]) / torch.clamp(exact[a].abs(), min=tiny)
+                self.error = max(self.error, float(torch.max(error)))
+
+            if self.error <= tol:
+                break
+
+            if 2 * npoints - 1 > max_points:
+                raise ValueError(
+                    f"Tolerance of {tol} not reached with {npoints} grid points "
+                    f"(relative error: {self.error:.2e})."
+                )
+            npoints = 2 * npoints - 1
+
+    @property
+    def npoints(self) -> int:
+        """Number of grid points per element."""
+        return self.values.shape[2]
+
+    def __str__(self) -> str:
+        """Creates a string representation of the C6Table object."""
+        return (
+            f"{self.__class__.__name__}(n_element={len(self.elements)}, "
+            f"n_points={self.npoints}, error={self.error:.2e}, "
+            f"dtype={self.values.dtype}, device={self.values.device})"
+        )
+
+    def __repr__(self) -> str:
+        """Creates a string representation of the C6Table object."""
+        return str(self)
+
+
+def interpolate_c6(
+    numbers: Tensor,
+    cn: Tensor,
+    table: C6Table,
+    pairs: Tensor | None = None,
+    validate: bool = True,
+) -> Tensor:
+    """
+    Interpolate the atomic C6 coefficients from the tabulated values.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        The atomic numbers of the atoms in the system of shape `(..., nat)`.
+    cn : Tensor
+        Coordination numbers of the atoms of shape `(..., nat)`.
+    table : C6Table
+        Tabulated C6 coefficients of the elements.
+    pairs : Tensor | None, optional
+        Pair list of shape `(2, npairs)` with indices into the flattened atoms
+        (see :func:`tad_dftd3.neighbor.neighbor_list`). Defaults to `None`,
+        i.e., all pairs.
+    validate : bool, optional
+        Check that all elements are tabulated, which requires a
+        synchronization with the host. Defaults to `True`.
+
+    Returns
+    -------
+    Tensor
+        Atomic dispersion coefficients of shape `(..., nat, nat)` or of shape
+        `(npairs,)` with a pair list.
+
+    Raises
+    ------
+    ValueError
+        Elements are missing in the table.
+    """
+    index = table.index[numbers]
+    if validate is True and not is_compiling():
+        if torch.any(index < 0):
+            raise ValueError("Not all elements are contained in the C6 table.")
+
+    cnmax = table.cnmax.to(cn.dtype)[index]
+    i, a = _basis(torch.minimum(torch.clamp(cn, min=0.0), cnmax), cnmax, table.npoints)
+    values = table.values.to(cn.dtype)
+
+    if pairs is None:
+        # (..., n1, n2, p, q, x, y) * (..., n1, p, x) * (..., n2, q, y) -> (..., n1, n2)
+        corners = _corners(
+            values,
+            index.unsqueeze(-1),
+            index.unsqueeze(-2),
+            i.unsqueeze(-1),
+            i.unsqueeze(-2),
+        )
+        return einsum("...ijpqxy,...ipx,...jqy->...ij", corners, a, a)
+
+    index, i, a = index.reshape(-1), i.reshape(-1), a.reshape(-1, 2, 2)
+    p, q = pairs[0], pairs[1]
+
+    # (npairs, p, q, x, y) * (npairs, p, x) * (npairs, q, y) -> (npairs,)
+    corners = _corners(values, index[p], index[q], i[p], i[q])
+    return einsum("npqxy,npx,nqy->n", corners, a[p], a[q])
+
+
+def _tabulate(
+    elements: Tensor,
+    cn: Tensor,
+    reference: Reference,
+    weighting_function: WeightingFunction,
+    derivatives: bool = True,
+    **kwargs: Any,
+) -> Tensor:
+    """
+    Exact C6 coefficients and their derivatives on a grid.
+
+    Parameters
+    ----------
+    elements : Tensor
+        Atomic numbers of the elements of shape `(nel,)`.
+    cn : Tensor
+        Grid of coordination numbers for every element of shape
+        `(nel, npoints)`.
+    reference : Reference
+        Reference systems for D3 model.
+    weighting_function : Callable
+        Function to calculate weight of individual reference systems.
+    derivatives : bool, optional
+        Also evaluate the derivatives. Defaults to `True`.
+
+    Returns
+    -------
+    Tensor
+        C6 coefficients and their derivatives of shape
+        `(nel, nel, npoints, npoints, 2, 2)` or only the C6 coefficients of
+        shape `(nel, nel, npoints, npoints)`.
+    """
+    numbers = elements.unsqueeze(-1).expand_as(cn)
+    rc6 = reference.c6[elements.unsqueeze(-1), elements.unsqueeze(-2)]
+
+    if derivatives is False:
+        w = weight_references(numbers, cn, reference, weighting_function, **kwargs)
+
+        # (nel, n1, r1) * (nel, nel, r1, r2) * (nel, n2, r2) -> (nel, nel, n1, n2)
+        return einsum("aik,abkl,bjl->abij", w, rc6, w)
+
+    # the weights of an atom only depend on its own coordination number,
+    # i.e., the derivative of the sum yields the diagonal of the Jacobian
+    with torch.enable_grad():
+        cn = cn.detach().clone().requires_grad_(True)
+        w = weight_references(numbers, cn, reference, weighting_function, **kwargs)
+        dw = torch.stack(
+            [
+                torch.autograd.grad(w[..., k].sum(), cn, retain_graph=True)[0]
+                for k in range(w.shape[-1])
+            ],
+            dim=-1,
+        )
+
+    # (nel, n, 2, r): weights and their derivatives
+    w = torch.stack((w.detach(), dw), dim=-2)
+
+    # row-wise to avoid large intermediates of the contraction
+    nel, n = cn.shape
+    values = w.new_empty((nel, nel, n, n, 2, 2))
+    for a in range(nel):
+        # (n1, x, r1) * (nel, r1, r2) * (nel, n2, y, r2) -> (nel, n1, n2, x, y)
+        values[a] = einsum("ixk,bkl,bjyl->bijxy", w[a], rc6[a], w)
+
+    return values
+
+
+def _basis(cn: Tensor, cnmax: Tensor, npoints: int) -> tuple[Tensor, Tensor]:
+    """
+    Grid cell and cubic Hermite basis of the coordination numbers.
+
+    Parameters
+    ----------
+    cn : Tensor
+        Coordination numbers (within the grid).
+    cnmax : Tensor
+        Largest coordination number of the grid of the respective element.
+    npoints : int
+        Number of grid points.
+
+    Returns
+    -------
+    tuple[Tensor, Tensor]
+        Index of the lower grid point of the cell and the basis functions of
+        shape `(..., 2, 2)` for the lower and upper grid point (`p`) and for
+        the value and the derivative (`x`).
+    """
+    h = cnmax / (npoints - 1)
+    x = cn / h
+
+    # lower grid point of the cell and position within the cell
+    i = torch.clamp(torch.floor(x.detach()), max=npoints - 2).long()
+    t = x - i
+
+    t2, t3 = t * t, t * t * t
+    basis = torch.stack(
+        (
+            torch.stack((2 * t3 - 3 * t2 + 1, (t3 - 2 * t2 + t) * h), dim=-1),
+            torch.stack((-2 * t3 + 3 * t2, (t3 - t2) * h), dim=-1),
+        ),
+        dim=-2,
+    )
+    return i, basis
+
+
+def _corners(
+    values: Tensor, ea: Tensor | int, eb: Tensor, ia: Tensor, ib: Tensor
+) -> Tensor:
+    """
+    Tabulated values at the corners of the grid cells. All index tensors are
+    broadcasted against each other.
+
+    Parameters
+    ----------
+    values : Tensor
+        Tabulated values of shape `(nel, nel, npoints, npoints, 2, 2)`.
+    ea : Tensor
+        Table index of the element of the first atom.
+    eb : Tensor
+        Table index of the element of the second atom.
+    ia : Tensor
+        Lower grid point of the cell of the first atom.
+    ib : Tensor
+        Lower grid point of the cell of the second atom.
+
+    Returns
+    -------
+    Tensor
+        Values of shape `(..., 2, 2, 2, 2)` for the lower and upper grid point
+        of both atoms (`p`, `q`) and the order of the derivatives (`x`, `y`).
+    """
+    nel, npoints = values.shape[0], values.shape[2]
+
+    # flat index of the lower corner and offsets of the four corners
+    corner = ((ea * nel + eb) * npoints + ia) * npoints + ib
+    offset = torch.tensor([0, 1, npoints, npoints + 1], device=values.device)
+
+    corners = values.reshape(-1, 2, 2)[corner.unsqueeze(-1) + offset]
+    return corners.reshape(*corners.shape[:-3], 2, 2, 2, 2)
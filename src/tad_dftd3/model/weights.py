@@ -42,13 +42,23 @@ tensor([[10.4130471,  5.4368822,  5.4368822],
 """
 from __future__ import annotations
 
+from typing import Dict
+
 import torch
-from tad_mctc import storch
 
+from .. import distance
 from ..reference import Reference
-from ..typing import Any, Tensor, WeightingFunction
+from ..typing import Any, Tensor, WeightingFunction, is_compiling
+
+__all__ = [
+    "LOG_WEIGHTING",
+    "gaussian_log_weight",
+    "gaussian_weight",
+    "weight_references",
+]
 
-__all__ = ["gaussian_weight", "weight_references"]
+LOG_UNDERFLOW = -745.0
+"""Exponent below which `exp` underflows to zero in double precision."""
 
 
 def gaussian_weight(dcn: Tensor, factor: float = 4.0) -> Tensor:
@@ -71,11 +81,38 @@ def gaussian_weight(dcn: Tensor, factor: float = 4.0) -> Tensor:
     return torch.exp(-factor * dcn.pow(2))
 
 
+def gaussian_log_weight(dcn: Tensor, factor: float = 4.0) -> Tensor:
+    """
+    Calculate the logarithm of the weight of individual reference system
+    (see :func:`gaussian_weight`).
+
+    Parameters
+    ----------
+    dcn : Tensor
+        Difference of coordination numbers.
+    factor : float
+        Factor to calculate weight.
+
+    Returns
+    -------
+    Tensor
+        Logarithm of the weight of individual reference system.
+    """
+    return -factor * dcn.pow(2)
+
+
+LOG_WEIGHTING: Dict[WeightingFunction, WeightingFunction] = {
+    gaussian_weight: gaussian_log_weight,
+}
+"""Logarithms of the weighting functions for the log-sum-exp normalization."""
+
+
 def weight_references(
     numbers: Tensor,
     cn: Tensor,
     reference: Reference,
     weighting_function: WeightingFunction = gaussian_weight,
+    validate: bool = True,
     **kwargs: Any,
 ) -> Tensor:
     """
@@ -91,14 +128,34 @@ def weight_references(
         Reference systems for D3 model.
     weighting_function : Callable
         Function to calculate weight of individual reference systems.
+    validate : bool, optional
+        Check the weights for NaN's, which requires a synchronization with
+        the host. Defaults to `True`.
 
     Returns
     -------
     Tensor
         Weights of all reference systems
+
+    Note
+    ----
+    If the logarithm of the weighting function is registered in
+    :data:`LOG_WEIGHTING` (e.g., for :func:`gaussian_weight`), the weights
+    are normalized as softmax of the log-weights in the dtype of `cn` (see
+    :func:`_weights_softmax`). All other weighting functions are evaluated and
+    normalized in double precision.
     """
-    refcn = reference.cn[numbers]
-    mask = refcn >= 0
+    log_weighting = LOG_WEIGHTING.get(weighting_function, None)
+    if log_weighting is not None:
+        gw = _weights_softmax(numbers, cn, reference, log_weighting, **kwargs)
+
+        # data-dependent check (sync, graph break in `torch.compile`)
+        if validate is True and not is_compiling():
+            assert torch.isnan(gw).sum() == 0
+
+        return gw
+
+    refcn, mask, maxref = _gather_references(numbers, reference)
 
     zero = torch.tensor(0.0, device=cn.device, dtype=cn.dtype)
     zero_double = torch.tensor(0.0, device=cn.device, dtype=torch.double)
@@ -114,7 +171,7 @@ def weight_references(
     # contains higher powers, which lead to values down to 1e-300.
     # Since there are also cases in D3, we have to evaluate this portion
     # in double precision to retain the correct results and avoid nan's.
-    dcn = (reference.cn[numbers] - cn.unsqueeze(-1)).type(torch.double)
+    dcn = (refcn - cn.unsqueeze(-1)).type(torch.double)
     weights = torch.where(
         mask,
         weighting_function(dcn, **kwargs),
@@ -140,8 +197,11 @@ def weight_references(
     )
 
     # back to real dtype
-    gw_temp = storch.divide(weights, norm, eps=small).type(cn.dtype)
-    assert torch.isnan(gw_temp).sum() == 0
+    gw_temp = distance.divide(weights, norm, eps=small).type(cn.dtype)
+
+    # data-dependent check (sync, graph break in `torch.compile`)
+    if validate is True and not is_compiling():
+        assert torch.isnan(gw_temp).sum() == 0
 
     # The following section handles cases with large CNs that lead to zeros in
     # after the exponential in the weighting function. If this happens all
@@ -151,9 +211,6 @@ def weight_references(
     # away from the largest CN of the reference systems. An example would be an
     # atom within a fullerene (La3N@C80).
 
-    # maximum reference CN for each atom
-    maxcn = torch.max(refcn, dim=-1, keepdim=True)[0]
-
     # Here, we catch the potential NaN's from `gw_temp`. We cannot use `gw_temp`
     # directly, because we have to use safe divide to not get NaN's in the
     # backward. But `norm == 0` is equivalent. Additionally, we catch very
@@ -162,8 +219,85 @@ def weight_references(
 
     gw = torch.where(
         exceptional,
-        torch.where(refcn == maxcn, one, zero),
+        torch.where(maxref, one, zero),
         gw_temp,
     )
 
     return torch.where(mask, gw, zero)
+
+
+def _gather_references(
+    numbers: Tensor, reference: Reference
+) -> tuple[Tensor, Tensor, Tensor]:
+    """
+    Gather the metadata of the reference systems for all atoms at once
+    (see :attr:`tad_dftd3.reference.Reference.meta`).
+
+    Parameters
+    ----------
+    numbers : Tensor
+        The atomic numbers of the atoms in the system.
+    reference : Reference
+        Reference systems for D3 model.
+
+    Returns
+    -------
+    tuple[Tensor, Tensor, Tensor]
+        CNs of the reference systems, mask of the valid reference systems and
+        mask of the reference system with the largest CN for all atoms.
+    """
+    meta = reference.meta[numbers]
+    return meta[..., 0, :], meta[..., 1, :] > 0, meta[..., 2, :] > 0
+
+
+def _weights_softmax(
+    numbers: Tensor,
+    cn: Tensor,
+    reference: Reference,
+    log_weighting: WeightingFunction,
+    **kwargs: Any,
+) -> Tensor:
+    """
+    Calculate the weights of the reference systems as softmax of the
+    log-weights in the dtype of `cn`.
+
+    Shifting the log-weights by their maximum avoids the underflow of the
+    weights and the division by (almost) zero. If all weights underflow in
+    double precision, which happens for CNs far away from all references
+    (e.g., for an atom within a fullerene, La3N@C80), only the closest
+    reference, i.e., the one with the largest CN, keeps its weight of one.
+    This reproduces the fallback of the double precision implementation.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        The atomic numbers of the atoms in the system.
+    cn : Tensor
+        Coordination numbers for all atoms in the system.
+    reference : Reference
+        Reference systems for D3 model.
+    log_weighting : Callable
+        Logarithm of the weighting function.
+
+    Returns
+    -------
+    Tensor
+        Weights of all reference systems
+    """
+    refcn, mask, _ = _gather_references(numbers, reference)
+
+    zero = torch.tensor(0.0, device=cn.device, dtype=cn.dtype)
+    lowest = torch.tensor(torch.finfo(cn.dtype).min, device=cn.device, dtype=cn.dtype)
+
+    expo = torch.where(mask, log_weighting(refcn - cn.unsqueeze(-1), **kwargs), lowest)
+
+    # the shift does not change the normalized weights (no gradient required)
+    shift = torch.max(expo, dim=-1, keepdim=True)[0].detach()
+
+    # masking and underflow fallback in a single pass
+    keep = mask & ((shift > LOG_UNDERFLOW) | (expo == shift))
+    gw = torch.where(keep, torch.exp(expo - shift), zero)
+
+    # padding atoms have no reference systems (norm of zero)
+    norm = torch.sum(gw, dim=-1, keepdim=True)
+    return gw / torch.where(norm > 0, norm, zero + 1.0)
@@ -17,10 +17,10 @@ Coordination Number
 ===================
 
 Functions for calculating the D3 coordination numbers.
-Only exported for convenience.
+The counting function is only exported for convenience.
 """
 
-from tad_mctc.ncoord.count import exp_count
-from tad_mctc.ncoord.d3 import cn_d3
+from .count import dexp_count, exp_count
+from .d3 import cn_d3
 
-__all__ = ["exp_count", "cn_d3"]
+__all__ = ["exp_count", "dexp_count", "cn_d3"]
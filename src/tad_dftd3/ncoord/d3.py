@@ -0,0 +1,163 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Coordination number: DFT-D3
+===========================
+
+D3 coordination number with options for memory-bounded (row blocks) or sparse
+(pair list) evaluation. Without any of these options (and with validation), the
+calculation is delegated to :func:`tad_mctc.ncoord.cn_d3`.
+"""
+from __future__ import annotations
+
+import torch
+from tad_mctc.ncoord.d3 import cn_d3 as _cn_d3
+
+from .. import blocks, data, defaults, distance
+from ..typing import DD, Any, CountingFunction, Tensor
+from .count import exp_count
+
+__all__ = ["cn_d3"]
+
+
+def cn_d3(
+    numbers: Tensor,
+    positions: Tensor,
+    *,
+    counting_function: CountingFunction = exp_count,
+    rcov: Tensor | None = None,
+    cutoff: Tensor | None = None,
+    kcn: float = defaults.D3_KCN,
+    chunk_size: int | None = None,
+    pairs: Tensor | None = None,
+    validate: bool = True,
+    **kwargs: Any,
+) -> Tensor:
+    """
+    Compute the D3 fractional coordination number.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system of shape `(..., nat)`.
+    positions : Tensor
+        Cartesian coordinates of the atoms in the system of shape
+        `(..., nat, 3)`.
+    counting_function : CountingFunction, optional
+        Calculate weight for pairs. Defaults to `exp_count`.
+    rcov : Tensor | None, optional
+        Covalent radii for each atom. Defaults to `None`.
+    cutoff : Tensor | None, optional
+        Real-space cutoff. Defaults to `None`, i.e.,
+        :data:`tad_dftd3.defaults.D3_CN_CUTOFF`.
+    kcn : float, optional
+        Steepness of the counting function. Defaults to
+        :data:`tad_dftd3.defaults.D3_KCN`.
+    chunk_size : int | None, optional
+        Number of atoms (rows) evaluated at once. Only intermediates of size
+        `(..., chunk_size, nat)` are created and the blocks are recomputed in
+        the backward pass. Defaults to `None`, i.e., no chunking.
+    pairs : Tensor | None, optional
+        Pair list of shape `(2, npairs)` with indices into the flattened atoms
+        (see :func:`tad_dftd3.neighbor.neighbor_list`). If given, only these
+        pairs are evaluated. Defaults to `None`.
+    validate : bool, optional
+        Delegate the dense evaluation to :func:`tad_mctc.ncoord.cn_d3`, whose
+        distances validate the clamping value on the host. Otherwise, the
+        distances are evaluated without synchronizations (see
+        :mod:`tad_dftd3.distance`). Defaults to `True`.
+
+    Returns
+    -------
+    Tensor
+        Coordination numbers for all atoms of shape `(..., nat)`.
+
+    Raises
+    ------
+    ValueError
+        Shape of positions or covalent radii is not consistent with atomic
+        numbers.
+    """
+    if chunk_size is None and pairs is None and validate is True:
+        return _cn_d3(
+            numbers,
+            positions,
+            counting_function=counting_function,
+            rcov=rcov,
+            cutoff=cutoff,
+            kcn=kcn,
+            **kwargs,
+        )
+
+    dd: DD = {"device": positions.device, "dtype": positions.dtype}
+
+    if cutoff is None:
+        cutoff = torch.tensor(defaults.D3_CN_CUTOFF, **dd)
+    if rcov is None:
+        rcov = data.COV_D3.to(**dd)[numbers]
+
+    if numbers.shape != rcov.shape:
+        raise ValueError(
+            "Shape of covalent radii is not consistent with atomic numbers.",
+        )
+    if numbers.shape != positions.shape[:-1]:
+        raise ValueError(
+            "Shape of positions is not consistent with atomic numbers.",
+        )
+
+    zero = torch.tensor(0.0, **dd)
+
+    if pairs is not None:
+        i, j = pairs[0], pairs[1]
+
+        pos = positions.reshape(-1, 3)
+        distances = torch.linalg.norm(pos[i] - pos[j], dim=-1)
+
+        rc = rcov.reshape(-1)
+        cf = torch.where(
+            distances <= cutoff,
+            counting_function(distances, rc[i] + rc[j], kcn, **kwargs),
+            zero,
+        )
+
+        cn = torch.zeros(numbers.numel(), **dd).index_add(0, i, cf)
+        return cn.reshape(numbers.shape)
+
+    eps = torch.tensor(torch.finfo(positions.dtype).eps, **dd)
+
+    def _block(start: int, end: int) -> Tensor:
+        mask = blocks.real_pairs_block(numbers, start, end)
+        distances = torch.where(
+            mask,
+            distance.cdist(positions[..., start:end, :], positions),
+            eps,
+        )
+
+        rc = rcov[..., start:end].unsqueeze(-1) + rcov.unsqueeze(-2)
+        cf = torch.where(
+            mask * (distances <= cutoff),
+            counting_function(distances, rc, kcn, **kwargs),
+            zero,
+        )
+        return torch.sum(cf, dim=-1)
+
+    if chunk_size is None:
+        return _block(0, numbers.shape[-1])
+
+    cn_blocks = [
+        blocks.checkpoint(_block, start, end)
+        for start, end in blocks.row_blocks(numbers.shape[-1], chunk_size)
+    ]
+    return torch.cat(cn_blocks, dim=-1)
@@ -0,0 +1,410 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Neighbor lists
+==============
+
+Linked-cell (binned) neighbor search for sparse evaluation of the pairwise
+interactions.
+
+The pair list is returned as a tensor of shape ``(2, npairs)`` holding indices
+into the *flattened* atoms, i.e., into ``numbers.reshape(-1)`` and
+``positions.reshape(-1, 3)``. For batched (padded) input, atoms of different
+systems never form a pair and padding atoms are excluded. Flat (ragged) batches
+of concatenated systems are distinguished via segment ids (`batch`).
+
+For repeated evaluations with slowly moving atoms (molecular dynamics), the
+:class:`VerletList` stores a pair list built with an additional skin distance
+and only rebuilds it once an atom has moved by more than half of the skin.
+
+Triples for the three-body term are assembled from the pair list. They are
+stored as indices into the pair list, which allows to reuse all pairwise
+quantities (distances, dispersion coefficients, radii).
+
+Example
+-------
+>>> import torch
+>>> import tad_dftd3 as d3
+>>> numbers = torch.tensor([8, 1, 1])
+>>> positions = torch.tensor([
+...     [+0.00000000000000, +0.00000000000000, -0.73578586109551],
+...     [+1.44183152868459, +0.00000000000000, +0.36789293054775],
+...     [-1.44183152868459, +0.00000000000000, +0.36789293054775],
+... ])
+>>> pairs = d3.neighbor.neighbor_list(numbers, positions, torch.tensor(2.0))
+>>> print(pairs)
+tensor([[0, 0, 1, 2],
+        [1, 2, 0, 0]])
+"""
+from __future__ import annotations
+
+import torch
+
+from .typing import Tensor
+
+__all__ = ["VerletList", "full_pairs", "neighbor_list", "triple_list"]
+
+
+class VerletList:
+    """
+    Reusable pair list with a skin (Verlet list).
+
+    The pair list contains all pairs within `cutoff + skin`. As long as no
+    atom has moved by more than half of the skin since the last build, all
+    pairs within `cutoff` are still contained in the list and the list can be
+    reused. The consumers (coordination number, two-body dispersion) apply
+    their own cutoffs to the pairs of the list.
+
+    Example
+    -------
+    >>> import torch
+    >>> from tad_dftd3.neighbor import VerletList
+    >>> numbers = torch.tensor([8, 1, 1])
+    >>> positions = torch.tensor([
+    ...     [+0.00000000000000, +0.00000000000000, -0.73578586109551],
+    ...     [+1.44183152868459, +0.00000000000000, +0.36789293054775],
+    ...     [-1.44183152868459, +0.00000000000000, +0.36789293054775],
+    ... ])
+    >>> nl = VerletList(torch.tensor(50.0), torch.tensor(2.0))
+    >>> pairs = nl.update(numbers, positions)
+    >>> pairs = nl.update(numbers, positions + 0.1)  # reused
+    >>> print(nl.nbuild)
+    1
+    """
+
+    cutoff: Tensor
+    """Real-space cutoff of the consumers."""
+
+    skin: Tensor
+    """Skin distance added to the cutoff."""
+
+    batch: Tensor | None
+    """Segment ids for flat batches."""
+
+    pairs: Tensor | None
+    """Current pair list of shape `(2, npairs)`."""
+
+    nbuild: int
+    """Number of (re)builds of the pair list."""
+
+    __slots__ = ["cutoff", "skin", "batch", "pairs", "nbuild", "__numbers", "__ref"]
+
+    def __init__(
+        self, cutoff: Tensor, skin: Tensor, batch: Tensor | None = None
+    ) -> None:
+        if skin < 0.0:
+            raise ValueError(f"Skin must not be negative, but {skin} was given.")
+
+        self.cutoff = cutoff
+        self.skin = skin
+        self.batch = batch
+        self.pairs = None
+        self.nbuild = 0
+
+        self.__numbers: Tensor | None = None
+        self.__ref: Tensor | None = None
+
+    def needs_update(self, numbers: Tensor, positions: Tensor) -> bool:
+        """
+        Check if the pair list has to be rebuilt, i.e., if the list has not
+        been built yet, the atoms changed, or the maximum displacement since
+        the last build exceeds half of the skin.
+
+        Parameters
+        ----------
+        numbers : Tensor
+            Atomic numbers of the atoms in the system of shape `(..., nat)`.
+        positions : Tensor
+            Cartesian coordinates of the atoms in the system of shape
+            `(..., nat, 3)`.
+
+        Returns
+        -------
+        bool
+            Whether the pair list has to be rebuilt.
+        """
+        if self.pairs is None or self.__numbers is None or self.__ref is None:
+            return True
+
+        if numbers.shape != self.__numbers.shape:
+            return True
+        if not torch.equal(numbers, self.__numbers):
+            return True
+
+        disp = torch.linalg.norm(positions.detach() - self.__ref, dim=-1)
+        return bool(torch.max(disp) > 0.5 * self.skin) if disp.numel() > 0 else False
+
+    def update(self, numbers: Tensor, positions: Tensor) -> Tensor:
+        """
+        Return the pair list and rebuild it if required.
+
+        Parameters
+        ----------
+        numbers : Tensor
+            Atomic numbers of the atoms in the system of shape `(..., nat)`.
+        positions : Tensor
+            Cartesian coordinates of the atoms in the system of shape
+            `(..., nat, 3)`.
+
+        Returns
+        -------
+        Tensor
+            Pair list of shape `(2, npairs)` containing all pairs within the
+            cutoff (and possibly some more within the skin).
+        """
+        if self.needs_update(numbers, positions) is True:
+            self.pairs = neighbor_list(
+                numbers, positions, self.cutoff + self.skin, batch=self.batch
+            )
+            self.nbuild += 1
+
+            self.__numbers = numbers.clone()
+            self.__ref = positions.detach().clone()
+
+        assert self.pairs is not None
+        return self.pairs
+
+
+def neighbor_list(
+    numbers: Tensor,
+    positions: Tensor,
+    cutoff: Tensor,
+    batch: Tensor | None = None,
+) -> Tensor:
+    """
+    Build a pair list of all atoms within the cutoff using a linked-cell
+    search.
+
+    The atoms are sorted into cubic cells with an edge length of `cutoff`.
+    Hence, only the 27 surrounding cells of each atom have to be searched and
+    the number of candidate pairs grows linearly with the number of atoms for
+    condensed-phase systems.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system of shape `(..., nat)`.
+    positions : Tensor
+        Cartesian coordinates of the atoms in the system of shape
+        `(..., nat, 3)`.
+    cutoff : Tensor
+        Real-space cutoff.
+    batch : Tensor | None, optional
+        Segment ids of shape `(nat,)` for flat batches of concatenated systems
+        (`numbers` of shape `(nat,)`). Only atoms with the same segment id form
+        pairs. Defaults to `None`.
+
+    Returns
+    -------
+    Tensor
+        Indices of all (ordered) pairs within the cutoff of shape
+        `(2, npairs)`. The indices refer to the flattened atoms.
+
+    Raises
+    ------
+    ValueError
+        Shape of positions or segment ids is not consistent with atomic
+        numbers or the cutoff is not positive.
+    """
+    if numbers.shape != positions.shape[:-1]:
+        raise ValueError(
+            "Shape of positions is not consistent with atomic numbers.",
+        )
+    if batch is not None and (numbers.ndim != 1 or batch.shape != numbers.shape):
+        raise ValueError(
+            "Segment ids require a flat batch and must be consistent with "
+            "atomic numbers.",
+        )
+    if cutoff <= 0.0:
+        raise ValueError(f"Cutoff must be positive, but {cutoff} was given.")
+
+    with torch.no_grad():
+        return _cell_list(numbers, positions.detach(), cutoff, batch)
+
+
+def full_pairs(
+    pairs: Tensor, return_index: bool = False
+) -> Tensor | tuple[Tensor, Tensor]:
+    """
+    Restore both orderings of every pair from a list of unique pairs (e.g.,
+    `pairs[:, pairs[0] < pairs[1]]`).
+
+    Parameters
+    ----------
+    pairs : Tensor
+        Unique pairs of shape `(2, npairs)`.
+    return_index : bool, optional
+        Additionally return the index of every pair of the full list in the
+        list of unique pairs, e.g., to expand pairwise quantities. Defaults to
+        `False`.
+
+    Returns
+    -------
+    Tensor | tuple[Tensor, Tensor]
+        Pair list of shape `(2, 2 * npairs)` in the format of
+        :func:`neighbor_list`, i.e., containing both orderings of every pair
+        and sorted by the first and then the second index. If `return_index`
+        is `True`, also the index of shape `(2 * npairs,)`.
+    """
+    full = torch.cat((pairs, pairs.flip(0)), dim=-1)
+    index = torch.arange(pairs.shape[-1], device=pairs.device).repeat(2)
+
+    if full.shape[-1] != 0:
+        numel = int(torch.max(full)) + 1
+        order = torch.argsort(full[0] * numel + full[1])
+        full, index = full[:, order], index[order]
+
+    if return_index is True:
+        return full, index
+    return full
+
+
+def triple_list(pairs: Tensor, unique: bool = False) -> Tensor:
+    """
+    Build the list of (ordered) triples `ABC` from a pair list, for which all
+    three pairs `AB`, `AC` and `BC` are contained in the pair list.
+
+    Parameters
+    ----------
+    pairs : Tensor
+        Pair list of shape `(2, npairs)` as returned by :func:`neighbor_list`,
+        i.e., containing both orderings of every pair and sorted by the first
+        and then the second index.
+    unique : bool, optional
+        Only return every triple once (`A < B < C`) instead of all six
+        orderings. Defaults to `False`.
+
+    Returns
+    -------
+    Tensor
+        Indices into the pair list of shape `(3, ntriples)` for the pairs
+        `AB`, `AC` and `BC` of each triple. The atoms of the triple are
+        `pairs[0, ab]`, `pairs[1, ab]` and `pairs[1, ac]`.
+    """
+    device = pairs.device
+    i, j = pairs[0], pairs[1]
+    npairs = i.shape[0]
+
+    if npairs == 0:
+        return torch.zeros((3, 0), device=device, dtype=torch.long)
+
+    with torch.no_grad():
+        # start and number of the neighbors of every atom in the (sorted) list
+        numel = int(torch.max(pairs)) + 1
+        nneigh = torch.bincount(i, minlength=numel)
+        start = torch.cumsum(nneigh, dim=0) - nneigh
+
+        # expand every pair AB with the neighbors C of B
+        ab = torch.repeat_interleave(torch.arange(npairs, device=device), nneigh[j])
+        offset = torch.cumsum(nneigh[j], dim=0) - nneigh[j]
+        bc = start[j[ab]] + torch.arange(ab.shape[0], device=device) - offset[ab]
+
+        a, c = i[ab], j[bc]
+        keep = (a < j[ab]) & (j[ab] < c) if unique is True else a != c
+        ab, bc, a, c = ab[keep], bc[keep], a[keep], c[keep]
+
+        # the pair AC must also be in the list
+        key = i * numel + j
+        ac = torch.searchsorted(key, a * numel + c).clamp(max=npairs - 1)
+        found = key[ac] == a * numel + c
+
+        return torch.stack((ab[found], ac[found], bc[found]), dim=0)
+
+
+def _cell_list(
+    numbers: Tensor, positions: Tensor, cutoff: Tensor, batch: Tensor | None = None
+) -> Tensor:
+    """
+    Linked-cell search for all pairs within the cutoff.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system of shape `(..., nat)`.
+    positions : Tensor
+        Cartesian coordinates of the atoms in the system of shape
+        `(..., nat, 3)`.
+    cutoff : Tensor
+        Real-space cutoff.
+    batch : Tensor | None, optional
+        Segment ids of shape `(nat,)` for flat batches. Defaults to `None`.
+
+    Returns
+    -------
+    Tensor
+        Indices of all (ordered) pairs within the cutoff of shape
+        `(2, npairs)`.
+    """
+    device = positions.device
+    nat = numbers.shape[-1]
+
+    # only real atoms enter the search, the system index keeps batches apart
+    idx = torch.nonzero(numbers.reshape(-1) != 0).reshape(-1)
+    pos = positions.reshape(-1, 3)[idx]
+    if batch is None:
+        sys = idx.div(max(nat, 1), rounding_mode="floor")
+    else:
+        sys = batch[idx].long()
+
+    if idx.numel() == 0:
+        return torch.zeros((2, 0), device=device, dtype=torch.long)
+
+    # integer cell coordinates (cells with edge length of the cutoff)
+    origin = torch.min(pos, dim=0)[0]
+    cell = torch.floor((pos - origin) / cutoff).long()
+    ncell = torch.max(cell, dim=0)[0] + 1
+
+    def _key(s: Tensor, c: Tensor) -> Tensor:
+        key = (s * ncell[0] + c[..., 0]) * ncell[1] + c[..., 1]
+        return key * ncell[2] + c[..., 2]
+
+    # sort atoms by cell, the atoms of one cell are then contiguous
+    key = _key(sys, cell)
+    order = torch.argsort(key)
+    key_sorted = key[order]
+    ukey, counts = torch.unique_consecutive(key_sorted, return_counts=True)
+    starts = torch.cumsum(counts, dim=0) - counts
+
+    # all 27 neighboring cells (including the own cell) for every atom
+    r = torch.arange(-1, 2, device=device)
+    shifts = torch.stack(torch.meshgrid(r, r, r, indexing="ij"), dim=-1)
+    ncells = cell[order].unsqueeze(-2) + shifts.reshape(-1, 3)
+    inside = ((ncells >= 0) & (ncells < ncell)).all(dim=-1)
+
+    # look up the (occupied) neighbor cells
+    nkey = _key(sys[order].unsqueeze(-1), ncells)
+    pos_cell = torch.searchsorted(ukey, nkey).clamp(max=ukey.shape[0] - 1)
+    found = inside & (ukey[pos_cell] == nkey)
+
+    query_atom, query_cell = torch.nonzero(found, as_tuple=True)
+    query_cell = pos_cell[query_atom, query_cell]
+
+    # expand every (atom, cell) query into the candidate pairs
+    nq = counts[query_cell]
+    qi = torch.repeat_interleave(torch.arange(nq.shape[0], device=device), nq)
+    offset = torch.cumsum(nq, dim=0) - nq
+    within = torch.arange(qi.shape[0], device=device) - offset[qi]
+
+    i = order[query_atom[qi]]
+    j = order[starts[query_cell[qi]] + within]
+
+    # remove self-interaction and pairs beyond the cutoff
+    dist = torch.linalg.norm(pos[i] - pos[j], dim=-1)
+    keep = (i != j) & (dist <= cutoff)
+    i, j = idx[i[keep]], idx[j[keep]]
+
+    # deterministic ordering (sorted by first, then by second index)
+    perm = torch.argsort(i * numbers.numel() + j)
+    return torch.stack((i[perm], j[perm]), dim=0)
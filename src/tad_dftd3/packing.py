@@ -0,0 +1,154 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Packed symmetric storage
+========================
+
+Helpers for symmetric pairwise matrices (e.g., the atomic C6 coefficients)
+stored in packed form, i.e., only the upper triangle (including the diagonal)
+in row-major order as returned by :func:`torch.triu_indices`. A matrix of
+shape `(..., nat, nat)` is stored as a tensor of shape
+`(..., nat * (nat + 1) // 2)`.
+
+Example
+-------
+>>> import torch
+>>> from tad_dftd3 import packing
+>>> matrix = torch.tensor([[1.0, 2.0, 3.0], [2.0, 4.0, 5.0], [3.0, 5.0, 6.0]])
+>>> packed = packing.pack(matrix)
+>>> print(packed)
+tensor([1., 2., 3., 4., 5., 6.])
+>>> print(torch.equal(packing.unpack(packed, 3), matrix))
+True
+"""
+from __future__ import annotations
+
+import torch
+
+from .typing import Tensor
+
+__all__ = ["gather_pairs", "pack", "packed_index", "packed_pairs", "unpack"]
+
+
+def packed_index(i: Tensor, j: Tensor, nat: int) -> Tensor:
+    """
+    Index of the matrix element `(i, j)` in the packed upper triangle. Both
+    orderings of a pair give the same index.
+
+    Parameters
+    ----------
+    i : Tensor
+        Row indices.
+    j : Tensor
+        Column indices (broadcastable with `i`).
+    nat : int
+        Number of atoms (rows).
+
+    Returns
+    -------
+    Tensor
+        Indices into the packed upper triangle.
+    """
+    lo = torch.minimum(i, j)
+    hi = torch.maximum(i, j)
+
+    # rows before "lo" hold nat + (nat - 1) + ... + (nat - lo + 1) elements
+    return lo * nat - lo * (lo - 1) // 2 + hi - lo
+
+
+def packed_pairs(numbers: Tensor) -> Tensor:
+    """
+    Pair list of all pairs of the upper triangle (including the diagonal) in
+    packed order with indices into the flattened atoms of the batch.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of the atoms in the system of shape `(..., nat)`.
+
+    Returns
+    -------
+    Tensor
+        Pair list of shape `(2, nbatch * nat * (nat + 1) // 2)`.
+    """
+    nat = numbers.shape[-1]
+    i, j = torch.triu_indices(nat, nat, device=numbers.device)
+
+    batch = torch.arange(0, numbers.numel(), nat, device=numbers.device)
+    batch = batch.unsqueeze(-1)
+    return torch.stack(((batch + i).reshape(-1), (batch + j).reshape(-1)))
+
+
+def pack(matrix: Tensor) -> Tensor:
+    """
+    Pack the upper triangle of a symmetric matrix.
+
+    Parameters
+    ----------
+    matrix : Tensor
+        Symmetric matrix of shape `(..., nat, nat)`.
+
+    Returns
+    -------
+    Tensor
+        Packed upper triangle of shape `(..., nat * (nat + 1) // 2)`.
+    """
+    nat = matrix.shape[-1]
+    i, j = torch.triu_indices(nat, nat, device=matrix.device)
+    return matrix[..., i, j]
+
+
+def unpack(packed: Tensor, nat: int) -> Tensor:
+    """
+    Expand a packed upper triangle to the full symmetric matrix.
+
+    Parameters
+    ----------
+    packed : Tensor
+        Packed upper triangle of shape `(..., nat * (nat + 1) // 2)`.
+    nat : int
+        Number of atoms (rows).
+
+    Returns
+    -------
+    Tensor
+        Symmetric matrix of shape `(..., nat, nat)`.
+    """
+    idx = torch.arange(nat, device=packed.device)
+    return packed[..., packed_index(idx.unsqueeze(-1), idx.unsqueeze(-2), nat)]
+
+
+def gather_pairs(packed: Tensor, pairs: Tensor, nat: int) -> Tensor:
+    """
+    Gather the elements of a (batched) packed matrix for a flat pair list.
+
+    Parameters
+    ----------
+    packed : Tensor
+        Packed upper triangle of shape `(..., nat * (nat + 1) // 2)`.
+    pairs : Tensor
+        Pair list of shape `(2, npairs)` with indices into the flattened atoms
+        (see :func:`tad_dftd3.neighbor.neighbor_list`).
+    nat : int
+        Number of atoms (rows) of every system.
+
+    Returns
+    -------
+    Tensor
+        Elements of the pairs of shape `(npairs,)`.
+    """
+    i, j = pairs[0], pairs[1]
+    flat = packed.reshape(-1, packed.shape[-1])
+    return flat[i // nat, packed_index(i % nat, j % nat, nat)]
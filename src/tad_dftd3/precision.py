@@ -0,0 +1,145 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+r"""
+Precision policy
+================
+
+Floating point precision used for the evaluation of the dispersion energy.
+A policy consists of a *compute* dtype, in which all pairwise and triple-wise
+intermediates (distances, damping, dispersion coefficients) are evaluated, and
+a *reduce* dtype, in which the sums over pairs and triples are accumulated.
+The atom-resolved energy is returned in the reduce dtype.
+
+Available policies:
+
+- ``"fp64"``: compute and reduce in double precision (reference)
+- ``"fp32"``: compute and reduce in single precision
+- ``"mixed"``: compute in single, reduce in double precision
+
+Error bound
+-----------
+In the mixed policy, every contribution :math:`e_{AB}` carries a relative
+error of at most :math:`\kappa\,\varepsilon_{32}`
+(:math:`\varepsilon_{32} = 2^{-23} \approx 1.2\cdot 10^{-7}`), while the
+accumulation in double precision adds a negligible
+:math:`n\,\varepsilon_{64}`. For the two-body term, all contributions of an
+atom have the same sign and the bound carries over to the atomic energy
+
+.. math::
+
+    |E_A^\text{mixed} - E_A^\text{fp64}| \leq
+    \kappa\,\varepsilon_{32} \sum_B |e_{AB}| =
+    \kappa\,\varepsilon_{32} |E_A^\text{fp64}| ,
+
+independent of the number of pairs. A pure single precision reduction, on the
+other hand, is only bounded by :math:`(\kappa + n)\,\varepsilon_{32}`. The
+ATM contributions change sign and the bound refers to
+:math:`\sum_{BC} |e_{ABC}|` instead.
+
+The constant :math:`\kappa` is dominated by the distances. They are obtained
+from the quadratic expansion :math:`r^2 = |x|^2 + |y|^2 - 2 x \cdot y`, whose
+relative error grows with :math:`(R_\text{max} / r)^2`, where
+:math:`R_\text{max}` is the largest distance of an atom from the origin.
+Since the energy scales with :math:`r^{-6}` to :math:`r^{-9}`, the error is
+amplified accordingly. A conservative estimate is
+
+.. math::
+
+    \kappa \approx 10^2 \left(1 + (R_\text{max} / r_\text{min})^2\right) ,
+
+i.e., :math:`|E_A^\text{mixed} - E_A^\text{fp64}| \lesssim 10^{-4}
+|E_A^\text{fp64}|` for molecules centered at the origin. Systems should
+therefore be centered before evaluation in reduced precision.
+
+Example
+-------
+>>> import torch
+>>> from tad_dftd3.precision import get_precision
+>>> policy = get_precision("mixed")
+>>> print(policy.compute, policy.reduce)
+torch.float32 torch.float64
+"""
+from __future__ import annotations
+
+from typing import Dict, Union
+
+import torch
+
+__all__ = ["PRECISION", "Precision", "get_precision"]
+
+
+class Precision:
+    """
+    Precision policy for the evaluation of the dispersion energy.
+    """
+
+    compute: torch.dtype
+    """Floating point dtype of the pairwise and triple-wise intermediates."""
+
+    reduce: torch.dtype
+    """Floating point dtype of the sums over pairs and triples."""
+
+    __slots__ = ["compute", "reduce"]
+
+    def __init__(self, compute: torch.dtype, reduce: torch.dtype) -> None:
+        if not compute.is_floating_point or not reduce.is_floating_point:
+            raise ValueError("Precision policy requires floating point dtypes.")
+
+        self.compute = compute
+        self.reduce = reduce
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(compute={self.compute}, reduce={self.reduce})"
+        )
+
+
+PRECISION: Dict[str, Precision] = {
+    "fp64": Precision(torch.float64, torch.float64),
+    "fp32": Precision(torch.float32, torch.float32),
+    "mixed": Precision(torch.float32, torch.float64),
+}
+"""Predefined precision policies."""
+
+
+def get_precision(policy: Union[str, Precision]) -> Precision:
+    """
+    Obtain a precision policy.
+
+    Parameters
+    ----------
+    policy : str | Precision
+        Name of a predefined policy (see :data:`PRECISION`) or a policy.
+
+    Returns
+    -------
+    Precision
+        Precision policy.
+
+    Raises
+    ------
+    ValueError
+        Unknown policy name.
+    """
+    if isinstance(policy, Precision):
+        return policy
+
+    if policy not in PRECISION:
+        raise ValueError(
+            f"Unknown precision policy '{policy}'. Available policies: "
+            f"{', '.join(PRECISION.keys())}."
+        )
+
+    return PRECISION[policy]
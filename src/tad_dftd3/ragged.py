@@ -0,0 +1,212 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Ragged batches
+==============
+
+DFT-D3 dispersion energy for flat (ragged) batches. Instead of padding all
+systems to the largest one (:func:`tad_mctc.batch.pack`), the atoms of all
+systems are concatenated and assigned to their system via segment ids. Only
+pairs and triples within the same system are evaluated, i.e., the work scales
+with the sum of the system sizes and not with the size of the largest system.
+
+Example
+-------
+>>> import torch
+>>> import tad_dftd3 as d3
+>>> numbers = torch.tensor([8, 1, 1, 8, 1, 1, 1, 1])  # H2O and H2O + H2
+>>> positions = torch.tensor([
+...     [+0.00000000000000, +0.00000000000000, -0.73578586109551],
+...     [+1.44183152868459, +0.00000000000000, +0.36789293054775],
+...     [-1.44183152868459, +0.00000000000000, +0.36789293054775],
+...     [+0.00000000000000, +0.00000000000000, -0.73578586109551],
+...     [+1.44183152868459, +0.00000000000000, +0.36789293054775],
+...     [-1.44183152868459, +0.00000000000000, +0.36789293054775],
+...     [+0.00000000000000, +5.00000000000000, +0.00000000000000],
+...     [+0.00000000000000, +6.40000000000000, +0.00000000000000],
+... ], dtype=torch.double)
+>>> batch = d3.ragged.segment_ids(torch.tensor([3, 5]))
+>>> print(batch)
+tensor([0, 0, 0, 1, 1, 1, 1, 1])
+>>> param = dict(  # r²SCAN-D3(BJ)
+...     a1=torch.tensor(0.49484001, dtype=torch.double),
+...     s8=torch.tensor(0.78981345, dtype=torch.double),
+...     a2=torch.tensor(5.73083694, dtype=torch.double),
+... )
+>>> energy = d3.ragged.dftd3_ragged(numbers, positions, param, batch)
+>>> print(energy.shape)
+torch.Size([2])
+"""
+from __future__ import annotations
+
+import torch
+from tad_mctc.data import pse
+
+from . import data, defaults, model, ncoord
+from .damping import dispersion_atm, rational_damping
+from .disp import dispersion2
+from .neighbor import neighbor_list
+from .reference import Reference
+from .typing import DD, CountingFunction, DampingFunction, Tensor, WeightingFunction
+
+__all__ = ["dftd3_ragged", "segment_ids"]
+
+
+def segment_ids(sizes: Tensor) -> Tensor:
+    """
+    Convert the number of atoms per system into segment ids.
+
+    Parameters
+    ----------
+    sizes : Tensor
+        Number of atoms of every system of shape `(nbatch,)`. Offsets of a
+        flat batch can be converted via `torch.diff`.
+
+    Returns
+    -------
+    Tensor
+        Segment id (system index) of every atom of shape `(nat,)`.
+    """
+    idx = torch.arange(sizes.shape[0], device=sizes.device)
+    return torch.repeat_interleave(idx, sizes)
+
+
+def dftd3_ragged(
+    numbers: Tensor,
+    positions: Tensor,
+    param: dict[str, Tensor],
+    batch: Tensor,
+    *,
+    nbatch: int | None = None,
+    ref: Reference | None = None,
+    rcov: Tensor | None = None,
+    r4r2: Tensor | None = None,
+    cutoff: Tensor | None = None,
+    counting_function: CountingFunction = ncoord.exp_count,
+    weighting_function: WeightingFunction = model.gaussian_weight,
+    damping_function: DampingFunction = rational_damping,
+) -> Tensor:
+    """
+    Evaluate the DFT-D3 dispersion energy for a flat (ragged) batch of
+    concatenated systems.
+
+    The coordination numbers, C6 coefficients, two-body and three-body
+    energies are all evaluated on a pair list restricted to the individual
+    systems (see :func:`tad_dftd3.neighbor.neighbor_list`). Contrary to the
+    dense evaluation, a three-body contribution requires all three pairs of
+    the triple to be within the cutoff.
+
+    Parameters
+    ----------
+    numbers : Tensor
+        Atomic numbers of all atoms of shape `(nat,)`.
+    positions : Tensor
+        Cartesian coordinates of all atoms of shape `(nat, 3)`.
+    param : dict[str, Tensor]
+        DFT-D3 damping parameters.
+    batch : Tensor
+        Segment id (system index) of every atom of shape `(nat,)` (see
+        :func:`segment_ids`).
+    nbatch : int | None, optional
+        Number of systems. Defaults to `None`, i.e., the largest segment id
+        plus one.
+    ref : reference.Reference, optional
+        Reference C6 coefficients.
+    rcov : Tensor, optional
+        Covalent radii of the atoms of shape `(nat,)`.
+    r4r2 : Tensor, optional
+        r⁴ over r² expectation values of the atoms of shape `(nat,)`.
+    cutoff : Tensor, optional
+        Real-space cutoff. Defaults to `None`, i.e.,
+        :data:`tad_dftd3.defaults.D3_DISP_CUTOFF`.
+    counting_function : Callable, optional
+        Calculates counting value in range 0 to 1 for each atom pair.
+    weighting_function : Callable, optional
+        Function to calculate weight of individual reference systems.
+    damping_function : Callable, optional
+        Damping function evaluate distance dependent contributions.
+
+    Returns
+    -------
+    Tensor
+        DFT-D3 dispersion energy of every system of shape `(nbatch,)`.
+
+    Raises
+    ------
+    ValueError
+        Inconsistent shapes or unsupported elements.
+    """
+    dd: DD = {"device": positions.device, "dtype": positions.dtype}
+
+    if numbers.ndim != 1 or numbers.shape != batch.shape:
+        raise ValueError(
+            "Ragged batches require flat atomic numbers and segment ids of "
+            "the same shape.",
+        )
+    if torch.max(numbers) >= defaults.MAX_ELEMENT:
+        raise ValueError(
+            f"No D3 parameters available for Z > {defaults.MAX_ELEMENT-1} "
+            f"({pse.Z2S[defaults.MAX_ELEMENT]})."
+        )
+
+    if nbatch is None:
+        nbatch = int(torch.max(batch)) + 1 if batch.numel() > 0 else 0
+    if cutoff is None:
+        cutoff = torch.tensor(defaults.D3_DISP_CUTOFF, **dd)
+    if ref is None:
+        ref = Reference(**dd)
+    if rcov is None:
+        rcov = data.COV_D3.to(**dd)[numbers]
+    if r4r2 is None:
+        r4r2 = data.R4R2.to(**dd)[numbers]
+
+    # padded reference systems only add zeros to the C6 contraction
+    ref = ref.trim(numbers)
+
+    # one pair list for the coordination number and the dispersion energy
+    cn_cutoff = torch.tensor(defaults.D3_CN_CUTOFF, **dd)
+    pairs = neighbor_list(
+        numbers, positions, torch.maximum(cutoff, cn_cutoff), batch=batch
+    )
+
+    cn = ncoord.cn_d3(
+        numbers,
+        positions,
+        counting_function=counting_function,
+        rcov=rcov,
+        cutoff=cn_cutoff,
+        pairs=pairs,
+    )
+    weights = model.weight_references(numbers, cn, ref, weighting_function)
+    c6 = model.atomic_c6_pairs(numbers, weights, ref, pairs)
+
+    energy = dispersion2(
+        numbers, positions, param, c6, r4r2, damping_function, cutoff, pairs=pairs
+    )
+
+    if "s9" in param and param["s9"] != 0.0:
+        rvdw = data.VDW_D3.to(**dd)[numbers[pairs[0]], numbers[pairs[1]]]
+        energy = energy + dispersion_atm(
+            numbers,
+            positions,
+            c6,
+            rvdw,
+            cutoff,
+            param["s9"],
+            alp=param.get("alp", torch.tensor(defaults.ALP, **dd)),
+            pairs=pairs,
+        )
+
+    return torch.zeros(nbatch, **dd).index_add(0, batch, energy)
@@ -199,9 +199,30 @@ class Reference:
     cn: Tensor
     """Coordination numbers for all reference systems"""
 
+    valid: Tensor
+    """Mask of the valid (non-padding) reference systems of each element"""
+
+    nref: Tensor
+    """Number of reference systems of each element"""
+
+    maxref: Tensor
+    """Index of the reference system with the largest CN of each element"""
+
+    meta: Tensor
+    """
+    Stacked per-element metadata of shape `(nelements, 3, nref)` in the dtype
+    of the CNs: CNs, mask of the valid reference systems and (one-hot) mask of
+    the reference system with the largest CN. Allows a single gather for the
+    atoms.
+    """
+
     __slots__ = [
         "c6",
         "cn",
+        "valid",
+        "nref",
+        "maxref",
+        "meta",
         "__dtype",
         "__device",
     ]
@@ -245,6 +266,21 @@ class Reference:
         ):
             raise RuntimeError("`c6` & `cn` size mismatch found")
 
+        # per-element metadata (fixed, only gathered for the atoms later)
+        self.valid = self.cn >= 0
+        self.nref = torch.sum(self.valid, dim=-1)
+        self.maxref = torch.argmax(self.cn, dim=-1)
+
+        idx = torch.arange(self.cn.shape[-1], device=self.device)
+        self.meta = torch.stack(
+            [
+                self.cn,
+                self.valid.type(self.dtype),
+                (idx == self.maxref.unsqueeze(-1)).type(self.dtype),
+            ],
+            dim=-2,
+        )
+
     @property
     def device(self) -> torch.device:
         """The device on which the `Reference` object resides."""
@@ -329,6 +365,46 @@ class Reference:
             self.c6.type(dtype),
         )
 
+    def trim(self, numbers: Optional[Tensor] = None) -> "Reference":
+        """
+        Returns a view of the `Reference` instance with the reference axis
+        trimmed to the largest number of reference systems of the given
+        elements. Padded reference systems (`cn < 0`) are always at the end
+        of the reference axis.
+
+        Parameters
+        ----------
+        numbers : Tensor, optional
+            Atomic numbers of the elements to consider. Defaults to `None`,
+            i.e., all elements.
+
+        Returns
+        -------
+        Reference
+            A `Reference` instance with the trimmed reference axis.
+
+        Notes
+        -----
+        Determining the number of reference systems requires a
+        synchronization with the host. If no reference system can be removed,
+        `self` will be returned.
+
+        Example
+        -------
+        >>> import torch
+        >>> from tad_dftd3.reference import Reference
+        >>> ref = Reference().trim(torch.tensor([6, 1, 1, 1, 1]))  # CH4
+        >>> print(ref.c6.shape)
+        torch.Size([104, 104, 5, 5])
+        """
+        count = self.nref if numbers is None else self.nref[numbers]
+        nref = max(int(torch.max(count)), 1)
+
+        if nref == self.cn.shape[-1]:
+            return self
+
+        return self.__class__(self.cn[..., :nref], self.c6[..., :nref, :nref])
+
     def __str__(self) -> str:
         """Creates a string representation of the Reference object."""
         return (
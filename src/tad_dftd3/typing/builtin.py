@@ -19,6 +19,6 @@ Type annotations: Built-ins
 Built-in type annotations are imported from the *tad-mctc* library, which
 handles some version checking.
 """
-from tad_mctc.typing import Any, Callable, NoReturn, Protocol, TypedDict
+from tad_mctc.typing import Any, Callable, Literal, NoReturn, Protocol, TypedDict
 
-__all__ = ["Any", "Callable", "NoReturn", "Protocol", "TypedDict"]
+__all__ = ["Any", "Callable", "Literal", "NoReturn", "Protocol", "TypedDict"]
@@ -18,9 +18,16 @@ Type annotations: D3
 
 DFT-D3-specific type annotations.
 """
+from typing import Dict, Tuple
+
 from tad_mctc.typing import Callable, Tensor
 
-__all__ = ["WeightingFunction"]
+__all__ = ["MultiOrderDampingFunction", "WeightingFunction"]
+
 
+MultiOrderDampingFunction = Callable[
+    [Tuple[int, ...], Tensor, Tensor, Dict[str, Tensor]], Tuple[Tensor, ...]
+]
+"""Damping function evaluating several orders from shared intermediates."""
 
 WeightingFunction = Callable[[Tensor], Tensor]
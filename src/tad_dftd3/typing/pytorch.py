@@ -18,6 +18,8 @@ Type annotations: PyTorch
 
 PyTorch-related type annotations for this project.
 """
+import torch
+from tad_mctc._version import __tversion__
 from tad_mctc.typing import (
     DD,
     CountingFunction,
@@ -40,4 +42,28 @@ __all__ = [
     "TensorOrTensors",
     "get_default_device",
     "get_default_dtype",
+    "is_compiling",
 ]
+
+
+def is_compiling() -> bool:
+    """
+    Check if the code is currently traced by `torch.compile` (TorchDynamo).
+
+    Returns
+    -------
+    bool
+        `True` if called within `torch.compile`, `False` otherwise (and always
+        for PyTorch versions without `torch.compile`).
+    """
+    if __tversion__ < (2, 0, 0):  # pragma: no cover
+        return False
+
+    # `torch.compiler.is_compiling` is only available since PyTorch 2.3
+    if __tversion__ < (2, 3, 0):  # pragma: no cover
+        # pylint: disable=import-outside-toplevel
+        import torch._dynamo as dynamo
+
+        return dynamo.is_compiling()
+
+    return torch.compiler.is_compiling()
@@ -43,6 +43,12 @@ from tad_mctc._version import __tversion__
 if __tversion__ in ((2, 3, 0), (2, 3, 1)):
     import torch._dynamo
 
+# Forward-mode AD scripts its decompositions with TorchScript on first use,
+# which fails once TorchScript is disabled (default, see `--jit` option).
+# Hence, the decompositions are loaded before the options are evaluated.
+if __tversion__ >= (2, 0, 0):
+    import torch._decomp.decompositions_for_jvp
+
 
 def pytest_addoption(parser: pytest.Parser) -> None:
     """Set up additional command line options."""
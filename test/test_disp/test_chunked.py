@@ -0,0 +1,254 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the row-blocked (chunked) evaluation of the coordination number, the
+two-body and the three-body dispersion energy.
+"""
+from math import sqrt
+
+import pytest
+import torch
+from tad_mctc.batch import pack
+
+from tad_dftd3 import blocks, data, dftd3, disp, ncoord
+from tad_dftd3.typing import DD
+
+from ..conftest import DEVICE
+from .samples import samples
+
+sample_list = ["AmF3", "SiH4", "PbH4-BiH3", "C6H5I-CH3SH", "MB16_43_01"]
+
+# TPSS0-D3BJ parameters
+param = {
+    "s6": torch.tensor(1.0000),
+    "s8": torch.tensor(1.2576),
+    "s9": torch.tensor(0.0000),
+    "a1": torch.tensor(0.3768),
+    "a2": torch.tensor(4.5865),
+}
+
+
+def test_fail() -> None:
+    with pytest.raises(ValueError):
+        list(blocks.row_blocks(10, 0))
+
+    numbers = samples["SiH4"]["numbers"].to(DEVICE)
+    positions = samples["SiH4"]["positions"].to(DEVICE)
+    with pytest.raises(ValueError):
+        dftd3(numbers, positions, param, chunk_size="auto", unique=True)
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name", sample_list)
+@pytest.mark.parametrize("chunk_size", [1, 3, 100])
+def test_cn(dtype: torch.dtype, name: str, chunk_size: int) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    ref = ncoord.cn_d3(numbers, positions)
+
+    cn = ncoord.cn_d3(numbers, positions, chunk_size=chunk_size)
+
+    assert cn.dtype == dtype
+    assert pytest.approx(ref.cpu(), abs=tol) == cn.cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name", sample_list)
+@pytest.mark.parametrize("chunk_size", [1, 3, 100])
+def test_disp2_single(dtype: torch.dtype, name: str, chunk_size: int) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    ref = sample["disp2"].to(**dd)
+    c6 = sample["c6"].to(**dd)
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    energy = disp.dispersion(numbers, positions, par, c6, chunk_size=chunk_size)
+
+    assert energy.dtype == dtype
+    assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name1", sample_list)
+@pytest.mark.parametrize("name2", ["SiH4"])
+def test_disp2_batch(dtype: torch.dtype, name1: str, name2: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample1, sample2 = samples[name1], samples[name2]
+    numbers = pack(
+        [
+            sample1["numbers"].to(DEVICE),
+            sample2["numbers"].to(DEVICE),
+        ]
+    )
+    positions = pack(
+        [
+            sample1["positions"].to(**dd),
+            sample2["positions"].to(**dd),
+        ]
+    )
+    c6 = pack(
+        [
+            sample1["c6"].to(**dd),
+            sample2["c6"].to(**dd),
+        ]
+    )
+    ref = pack(
+        [
+            sample1["disp2"].to(**dd),
+            sample2["disp2"].to(**dd),
+        ]
+    )
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    energy = disp.dispersion(numbers, positions, par, c6, chunk_size=2)
+
+    assert energy.dtype == dtype
+    assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name", ["LiH", "SiH4", "MB16_43_01"])
+def test_grad(dtype: torch.dtype, name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, par)
+    (ref,) = torch.autograd.grad(energy.sum(), pos)
+
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, par, chunk_size=3)
+    (grad,) = torch.autograd.grad(energy.sum(), pos)
+
+    assert pytest.approx(ref.cpu(), abs=1e-10) == grad.cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name", sample_list)
+@pytest.mark.parametrize("chunk_size", [1, 3, 100])
+def test_disp3_single(dtype: torch.dtype, name: str, chunk_size: int) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    c6 = sample["c6"].to(**dd)
+    rvdw = data.VDW_D3.to(**dd)[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
+    cutoff = torch.tensor(50.0, **dd)
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+    par["s9"] = torch.tensor(1.0, **dd)
+
+    ref = disp.dispersion3(numbers, positions, par, c6, rvdw, cutoff)
+    energy = disp.dispersion3(
+        numbers, positions, par, c6, rvdw, cutoff, chunk_size=chunk_size
+    )
+
+    assert energy.dtype == dtype
+    assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name1", sample_list)
+@pytest.mark.parametrize("name2", ["SiH4"])
+def test_disp3_batch(dtype: torch.dtype, name1: str, name2: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample1, sample2 = samples[name1], samples[name2]
+    numbers = pack(
+        [
+            sample1["numbers"].to(DEVICE),
+            sample2["numbers"].to(DEVICE),
+        ]
+    )
+    positions = pack(
+        [
+            sample1["positions"].to(**dd),
+            sample2["positions"].to(**dd),
+        ]
+    )
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+    par["s9"] = torch.tensor(1.0, **dd)
+
+    ref = dftd3(numbers, positions, par)
+    energy = dftd3(numbers, positions, par, chunk_size=2)
+
+    assert energy.dtype == dtype
+    assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name", ["LiH", "SiH4", "MB16_43_01"])
+def test_disp3_grad(dtype: torch.dtype, name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+    par["s9"] = torch.tensor(1.0, **dd)
+
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, par)
+    (ref,) = torch.autograd.grad(energy.sum(), pos)
+
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, par, chunk_size=3)
+    (grad,) = torch.autograd.grad(energy.sum(), pos)
+
+    assert pytest.approx(ref.cpu(), abs=1e-10) == grad.cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name", ["PbH4-BiH3", "MB16_43_01"])
+def test_dftd3_auto(dtype: torch.dtype, name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    ref = dftd3(numbers, positions, par)
+
+    # budget below a single row of the C6 intermediate (chunk size of one)
+    for budget in (1e-3, None):
+        energy = dftd3(numbers, positions, par, chunk_size="auto", memory_budget=budget)
+        assert energy.dtype == dtype
+        assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
@@ -0,0 +1,198 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the compiled evaluation of the dispersion energy. The tests use the
+"eager" backend of `torch.compile`, which traces the graph (graph breaks,
+guards, recompilations) without code generation.
+"""
+from math import sqrt
+
+import pytest
+import torch
+from tad_mctc._version import __tversion__
+from tad_mctc.batch import pack
+
+from tad_dftd3 import compiled, damping, dftd3, model, ncoord, reference
+from tad_dftd3.typing import DD
+
+from ..conftest import DEVICE
+from .samples import samples
+
+pytestmark = pytest.mark.skipif(
+    __tversion__ < (2, 5, 0), reason="Compilation requires PyTorch 2.5."
+)
+
+sample_list = ["LiH", "SiH4", "PbH4-BiH3", "MB16_43_01"]
+
+# PBE0-D3(BJ)-ATM parameters
+param = {
+    "s6": torch.tensor(1.0000),
+    "s8": torch.tensor(1.2177),
+    "s9": torch.tensor(1.0000),
+    "a1": torch.tensor(0.4145),
+    "a2": torch.tensor(4.8593),
+}
+
+
+@pytest.fixture(autouse=True)
+def reset() -> None:
+    # all variants (dtype, batch, ATM) would exceed the recompile limit
+    torch._dynamo.reset()
+
+
+def test_bucket_size() -> None:
+    sizes = [compiled.bucket_size(n) for n in (1, 8, 9, 16, 17, 100, 1000, 1025)]
+    assert sizes == [8, 8, 10, 16, 20, 112, 1024, 1280]
+
+    assert compiled.bucket_size(17, steps=1) == 32
+    assert compiled.bucket_size(3, minimum=2) == 3
+
+    with pytest.raises(ValueError):
+        compiled.bucket_size(10, steps=0)
+
+
+def test_fail() -> None:
+    numbers = torch.tensor([1, 105])
+    positions = torch.zeros((2, 3))
+
+    with pytest.raises(ValueError):
+        compiled.dftd3_compiled(numbers, positions, param)
+
+    with pytest.raises(ValueError):
+        compiled.dftd3_compiled(numbers[:1], positions, param)
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name", sample_list)
+@pytest.mark.parametrize("s9", [0.0, 1.0])
+def test_single(dtype: torch.dtype, name: str, s9: float) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    ref = reference.Reference(**dd)
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+    par["s9"] = torch.tensor(s9, **dd)
+
+    energy = compiled.dftd3_compiled(numbers, positions, par, ref=ref, backend="eager")
+    assert energy.dtype == dtype
+    assert energy.shape == numbers.shape
+
+    eager = dftd3(numbers, positions, par, ref=ref)
+    assert pytest.approx(eager.cpu(), abs=tol) == energy.cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name1", ["LiH"])
+@pytest.mark.parametrize("name2", sample_list)
+def test_batch(dtype: torch.dtype, name1: str, name2: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample1, sample2 = samples[name1], samples[name2]
+    numbers = pack(
+        [
+            sample1["numbers"].to(DEVICE),
+            sample2["numbers"].to(DEVICE),
+        ]
+    )
+    positions = pack(
+        [
+            sample1["positions"].to(**dd),
+            sample2["positions"].to(**dd),
+        ]
+    )
+    ref = reference.Reference(**dd)
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    energy = compiled.dftd3_compiled(numbers, positions, par, ref=ref, backend="eager")
+    eager = dftd3(numbers, positions, par, ref=ref)
+    assert pytest.approx(eager.cpu(), abs=tol) == energy.cpu()
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name", ["LiH", "SiH4", "MB16_43_01"])
+def test_grad(dtype: torch.dtype, name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    ref = reference.Reference(**dd)
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, par, ref=ref)
+    (grad_ref,) = torch.autograd.grad(energy.sum(), pos)
+
+    pos = positions.clone().requires_grad_(True)
+    energy = compiled.dftd3_compiled(numbers, pos, par, ref=ref, backend="eager")
+    (grad,) = torch.autograd.grad(energy.sum(), pos)
+
+    assert pytest.approx(grad_ref.cpu(), abs=1e-10) == grad.cpu()
+
+
+@pytest.mark.parametrize("grad", [False, True])
+def test_graph_breaks(grad: bool) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample = samples["PbH4-BiH3"]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd).clone().requires_grad_(grad)
+    ref = reference.Reference(**dd)
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    # registers the substitutes for the helpers of tad-mctc
+    compiled.dftd3_compiled(numbers, positions, par, ref=ref, backend="eager")
+
+    explanation = torch._dynamo.explain(compiled._dftd3)(
+        numbers,
+        positions,
+        par,
+        ref,
+        torch.ones(numbers.shape, **dd),
+        torch.ones((*numbers.shape, numbers.shape[-1]), **dd),
+        torch.ones(numbers.shape, **dd),
+        torch.tensor(50.0, **dd),
+        ncoord.exp_count,
+        model.gaussian_weight,
+        damping.rational_damping,
+        True,
+    )
+
+    assert explanation.graph_break_count == 0
+    assert explanation.graph_count == 1
+
+
+def test_recompilations() -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+    ref = reference.Reference(**dd)
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    torch._dynamo.reset()
+    counters = torch._dynamo.utils.counters
+    counters.clear()
+
+    # static graph for the first bucket and one dynamic graph for all others
+    for name in ["LiH", "SiH4", "MB16_43_01", "PbH4-BiH3", "C6H5I-CH3SH"]:
+        numbers = samples[name]["numbers"].to(DEVICE)
+        positions = samples[name]["positions"].to(**dd)
+        compiled.dftd3_compiled(numbers, positions, par, ref=ref, backend="eager")
+
+    assert counters["stats"]["unique_graphs"] == 2
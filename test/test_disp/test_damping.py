@@ -0,0 +1,99 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the (multi-order) damping functions.
+"""
+from __future__ import annotations
+
+from math import sqrt
+
+import pytest
+import torch
+
+from tad_dftd3 import damping, data, disp
+from tad_dftd3.typing import DD, Tensor
+
+from ..conftest import DEVICE
+from .samples import samples
+
+sample_list = ["AmF3", "SiH4", "PbH4-BiH3", "C6H5I-CH3SH", "MB16_43_01"]
+
+# TPSS0-D3BJ parameters
+param = {
+    "s6": torch.tensor(1.0000),
+    "s8": torch.tensor(1.2576),
+    "s9": torch.tensor(0.0000),
+    "a1": torch.tensor(0.3768),
+    "a2": torch.tensor(4.5865),
+}
+
+
+def custom_damping(
+    order: int, distances: Tensor, qq: Tensor, par: dict[str, Tensor]
+) -> Tensor:
+    """Rational damping without a registered multi-order implementation."""
+    return damping.rational_damping(order, distances, qq, par)
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+def test_rational_multi(dtype: torch.dtype) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+
+    distances = torch.rand((10, 10), **dd) * 10
+    qq = torch.rand((10, 10), **dd) * 50
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    orders = (6, 8, 10)
+    multi = damping.rational_damping_multi(orders, distances, qq, par)
+
+    assert len(multi) == len(orders)
+    for order, t in zip(orders, multi):
+        ref = damping.rational_damping(order, distances, qq, par)
+        assert pytest.approx(ref.cpu()) == t.cpu()
+
+
+def test_fallback() -> None:
+    distances = torch.tensor([2.0, 3.0, 4.0])
+    qq = torch.tensor([20.0, 30.0, 40.0])
+
+    t6, t8 = damping.multi_order_damping(custom_damping, (6, 8), distances, qq, param)
+    ref6, ref8 = damping.multi_order_damping(
+        damping.rational_damping, (6, 8), distances, qq, param
+    )
+
+    assert pytest.approx(ref6) == t6
+    assert pytest.approx(ref8) == t8
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name", sample_list)
+def test_disp2_custom(dtype: torch.dtype, name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    ref = sample["disp2"].to(**dd)
+    c6 = sample["c6"].to(**dd)
+    rvdw = data.VDW_D3.to(**dd)[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
+    r4r2 = data.R4R2.to(**dd)[numbers]
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    energy = disp.dispersion(numbers, positions, par, c6, rvdw, r4r2, custom_damping)
+
+    assert energy.dtype == dtype
+    assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
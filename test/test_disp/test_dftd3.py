@@ -18,8 +18,11 @@ Test calculation of dispersion energy and nuclear gradients.
 import pytest
 import torch
 from tad_mctc.batch import pack
+from tad_mctc.ncoord import cn_d3 as mctc_cn_d3
+from tad_mctc.ncoord.count import dexp_count as mctc_dexp_count
+from tad_mctc.ncoord.count import exp_count as mctc_exp_count
 
-from tad_dftd3 import damping, data, dftd3, model, reference
+from tad_dftd3 import damping, data, dftd3, model, ncoord, reference
 from tad_dftd3.ncoord import exp_count
 from tad_dftd3.typing import DD
 
@@ -128,3 +131,58 @@ def test_batch(dtype: torch.dtype) -> None:
 
     assert energy.dtype == dtype
     assert pytest.approx(ref.cpu()) == energy.cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.float32, torch.float64])
+@pytest.mark.parametrize("name", ["LiH", "SiH4", "PbH4-BiH3"])
+@pytest.mark.parametrize("s9", [0.0, 1.0])
+def test_no_validation(dtype: torch.dtype, name: str, s9: float) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    ref = sample["disp2"].to(**dd) + s9 * sample["disp3"].to(**dd)
+
+    param = {
+        "s6": torch.tensor(1.0000, **dd),
+        "s8": torch.tensor(1.2576, **dd),
+        "s9": torch.tensor(s9, **dd),
+        "alp": torch.tensor(14.00, **dd),
+        "a1": torch.tensor(0.3768, **dd),
+        "a2": torch.tensor(4.5865, **dd),
+    }
+
+    # three-body term is always evaluated (multiplied by zero for s9 = 0)
+    energy = dftd3(numbers, positions, param, validate=False)
+
+    assert energy.dtype == dtype
+    assert pytest.approx(ref.cpu()) == energy.cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.float32, torch.float64])
+@pytest.mark.parametrize("name", ["LiH", "SiH4", "PbH4-BiH3"])
+def test_no_validation_cn(dtype: torch.dtype, name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+
+    ref = mctc_cn_d3(numbers, positions, counting_function=mctc_exp_count)
+    cn = ncoord.cn_d3(numbers, positions, validate=False)
+
+    assert cn.dtype == dtype
+    assert pytest.approx(ref.cpu()) == cn.cpu()
+
+    # sync-free counting function (and derivative) of the delegated path
+    cn = ncoord.cn_d3(numbers, positions)
+    assert pytest.approx(ref.cpu()) == cn.cpu()
+
+    r = torch.linspace(0.5, 10.0, 50, **dd)
+    r0 = torch.tensor(3.0, **dd)
+    assert pytest.approx(mctc_exp_count(r, r0).cpu()) == ncoord.exp_count(r, r0).cpu()
+    assert (
+        pytest.approx(mctc_dexp_count(r, r0).cpu())
+        == ncoord.dexp_count(r, r0).cpu()
+    )
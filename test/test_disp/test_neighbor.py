@@ -0,0 +1,339 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the neighbor list and the sparse evaluation of the two-body and the
+three-body term.
+"""
+from math import sqrt
+
+import pytest
+import torch
+from tad_mctc.batch import pack, real_pairs
+
+from tad_dftd3 import damping, data, dftd3, disp, neighbor
+from tad_dftd3.typing import DD, Tensor
+
+from ..conftest import DEVICE
+from .samples import samples
+
+sample_list = ["AmF3", "SiH4", "PbH4-BiH3", "C6H5I-CH3SH", "MB16_43_01"]
+
+# TPSS0-D3BJ parameters
+param = {
+    "s6": torch.tensor(1.0000),
+    "s8": torch.tensor(1.2576),
+    "s9": torch.tensor(0.0000),
+    "a1": torch.tensor(0.3768),
+    "a2": torch.tensor(4.5865),
+}
+
+
+def brute_force(numbers: Tensor, positions: Tensor, cutoff: Tensor) -> Tensor:
+    mask = real_pairs(numbers, mask_diagonal=True)
+    mask = mask & (torch.cdist(positions, positions) <= cutoff)
+
+    nat = numbers.shape[-1]
+    idx = torch.nonzero(mask.reshape(-1, nat))
+    i = idx[:, 0]
+    j = i.div(nat, rounding_mode="floor") * nat + idx[:, 1]
+    return torch.stack((i, j))
+
+
+def test_fail() -> None:
+    numbers = torch.tensor([1, 1])
+    positions = torch.tensor([[0.0, 0.0, 0.0], [0.0, 0.0, 1.0]])
+
+    with pytest.raises(ValueError):
+        neighbor.neighbor_list(numbers, positions, torch.tensor(-1.0))
+
+    with pytest.raises(ValueError):
+        neighbor.neighbor_list(torch.tensor([1]), positions, torch.tensor(1.0))
+
+
+def test_empty() -> None:
+    numbers = torch.tensor([0, 0])
+    positions = torch.zeros((2, 3))
+
+    pairs = neighbor.neighbor_list(numbers, positions, torch.tensor(1.0))
+    assert pairs.shape == (2, 0)
+
+
+@pytest.mark.parametrize("cutoff", [2.0, 5.0, 50.0])
+@pytest.mark.parametrize("size", [10, 100, 300])
+def test_random(cutoff: float, size: int) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    numbers = torch.randint(1, 86, (size,), device=DEVICE)
+    positions = torch.rand((size, 3), **dd) * size ** (1 / 3) * 2.5
+    cut = torch.tensor(cutoff, **dd)
+
+    pairs = neighbor.neighbor_list(numbers, positions, cut)
+    ref = brute_force(numbers, positions, cut)
+
+    assert (pairs == ref).all()
+
+
+@pytest.mark.parametrize("cutoff", [3.0, 50.0])
+def test_batch(cutoff: float) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample1, sample2 = samples["PbH4-BiH3"], samples["C6H5I-CH3SH"]
+    numbers = pack(
+        [
+            sample1["numbers"].to(DEVICE),
+            sample2["numbers"].to(DEVICE),
+        ]
+    )
+    positions = pack(
+        [
+            sample1["positions"].to(**dd),
+            sample2["positions"].to(**dd),
+        ]
+    )
+    cut = torch.tensor(cutoff, **dd)
+
+    pairs = neighbor.neighbor_list(numbers, positions, cut)
+    ref = brute_force(numbers, positions, cut)
+
+    assert (pairs == ref).all()
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name", sample_list)
+def test_disp2_single(dtype: torch.dtype, name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    ref = sample["disp2"].to(**dd)
+    c6 = sample["c6"].to(**dd)
+    cutoff = torch.tensor(50.0, **dd)
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    pairs = neighbor.neighbor_list(numbers, positions, cutoff)
+    energy = disp.dispersion(numbers, positions, par, c6, pairs=pairs)
+
+    assert energy.dtype == dtype
+    assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name1", sample_list)
+@pytest.mark.parametrize("name2", ["SiH4"])
+def test_disp2_batch(dtype: torch.dtype, name1: str, name2: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample1, sample2 = samples[name1], samples[name2]
+    numbers = pack(
+        [
+            sample1["numbers"].to(DEVICE),
+            sample2["numbers"].to(DEVICE),
+        ]
+    )
+    positions = pack(
+        [
+            sample1["positions"].to(**dd),
+            sample2["positions"].to(**dd),
+        ]
+    )
+    c6 = pack(
+        [
+            sample1["c6"].to(**dd),
+            sample2["c6"].to(**dd),
+        ]
+    )
+    ref = pack(
+        [
+            sample1["disp2"].to(**dd),
+            sample2["disp2"].to(**dd),
+        ]
+    )
+    cutoff = torch.tensor(50.0, **dd)
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    pairs = neighbor.neighbor_list(numbers, positions, cutoff)
+    energy = disp.dispersion(numbers, positions, par, c6, pairs=pairs)
+
+    assert energy.dtype == dtype
+    assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+
+@pytest.mark.parametrize("cutoff", [5.0, 10.0])
+def test_disp2_cutoff(cutoff: float) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample = samples["MB16_43_01"]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    c6 = sample["c6"].to(**dd)
+    cut = torch.tensor(cutoff, **dd)
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    pairs = neighbor.neighbor_list(numbers, positions, cut)
+    energy = disp.dispersion(numbers, positions, par, c6, cutoff=cut, pairs=pairs)
+    ref = disp.dispersion(numbers, positions, par, c6, cutoff=cut)
+
+    assert pytest.approx(ref.cpu(), abs=1e-12) == energy.cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name", sample_list)
+def test_atm_single(dtype: torch.dtype, name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    ref = sample["disp3"].to(**dd)
+    c6 = sample["c6"].to(**dd)
+    rvdw = data.VDW_D3.to(**dd)[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
+    cutoff = torch.tensor(50.0, **dd)
+
+    pairs = neighbor.neighbor_list(numbers, positions, cutoff)
+    energy = damping.dispersion_atm(
+        numbers, positions, c6, rvdw, cutoff, s9=torch.tensor(1.0, **dd), pairs=pairs
+    )
+
+    assert energy.dtype == dtype
+    assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name1", sample_list)
+@pytest.mark.parametrize("name2", ["SiH4"])
+def test_atm_batch(dtype: torch.dtype, name1: str, name2: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample1, sample2 = samples[name1], samples[name2]
+    numbers = pack(
+        [
+            sample1["numbers"].to(DEVICE),
+            sample2["numbers"].to(DEVICE),
+        ]
+    )
+    positions = pack(
+        [
+            sample1["positions"].to(**dd),
+            sample2["positions"].to(**dd),
+        ]
+    )
+    c6 = pack(
+        [
+            sample1["c6"].to(**dd),
+            sample2["c6"].to(**dd),
+        ]
+    )
+    ref = pack(
+        [
+            sample1["disp3"].to(**dd),
+            sample2["disp3"].to(**dd),
+        ]
+    )
+    rvdw = data.VDW_D3.to(**dd)[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
+    cutoff = torch.tensor(50.0, **dd)
+
+    pairs = neighbor.neighbor_list(numbers, positions, cutoff)
+    energy = damping.dispersion_atm(
+        numbers, positions, c6, rvdw, cutoff, s9=torch.tensor(1.0, **dd), pairs=pairs
+    )
+
+    assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+
+@pytest.mark.parametrize("cutoff", [5.0, 10.0])
+def test_atm_cutoff(cutoff: float) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample = samples["MB16_43_01"]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    c6 = sample["c6"].to(**dd)
+    rvdw = data.VDW_D3.to(**dd)[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
+    cut = torch.tensor(cutoff, **dd)
+
+    pairs = neighbor.neighbor_list(numbers, positions, cut)
+    ref = damping.dispersion_atm(numbers, positions, c6, rvdw, cut, pairs=pairs)
+
+    # pairs beyond the cutoff are removed before building the triples
+    pairs = neighbor.neighbor_list(numbers, positions, cut + 5.0)
+    energy = damping.dispersion_atm(numbers, positions, c6, rvdw, cut, pairs=pairs)
+    assert pytest.approx(ref.cpu(), abs=1e-12) == energy.cpu()
+
+    full = damping.dispersion_atm(numbers, positions, c6, rvdw, cut + 50.0)
+    assert pytest.approx(full.cpu(), abs=1e-8) != energy.cpu()
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("name", ["LiH", "SiH4", "MB16_43_01"])
+def test_atm_grad(name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    cutoff = torch.tensor(50.0, **dd)
+    par = {k: v.to(**dd) for k, v in param.items()}
+    par["s9"] = torch.tensor(1.0, **dd)
+
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, par)
+    (ref,) = torch.autograd.grad(energy.sum(), pos)
+
+    nl = neighbor.VerletList(cutoff, torch.tensor(1.0, **dd))
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, par, neighbors=nl)
+    (grad,) = torch.autograd.grad(energy.sum(), pos)
+
+    assert pytest.approx(ref.cpu(), abs=1e-10) == grad.cpu()
+
+
+def test_full_pairs() -> None:
+    sample = samples["PbH4-BiH3"]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(DEVICE)
+
+    pairs = neighbor.neighbor_list(numbers, positions, torch.tensor(6.0))
+    unique = pairs[:, pairs[0] < pairs[1]]
+    assert (neighbor.full_pairs(unique) == pairs).all()
+
+    full, index = neighbor.full_pairs(unique, return_index=True)
+    assert (full == pairs).all()
+    assert (unique[:, index].sort(dim=0).values == pairs.sort(dim=0).values).all()
+
+    empty = torch.zeros((2, 0), dtype=torch.long)
+    assert neighbor.full_pairs(empty).shape == (2, 0)
+
+
+def test_triple_list_unique() -> None:
+    sample = samples["MB16_43_01"]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(DEVICE)
+
+    pairs = neighbor.neighbor_list(numbers, positions, torch.tensor(8.0))
+    triples = neighbor.triple_list(pairs)
+    unique = neighbor.triple_list(pairs, unique=True)
+    assert unique.shape[-1] * 6 == triples.shape[-1]
+
+    a, b, c = pairs[0, unique[0]], pairs[1, unique[0]], pairs[1, unique[1]]
+    assert ((a < b) & (b < c)).all()
+    assert (pairs[0, unique[2]] == b).all() and (pairs[1, unique[2]] == c).all()
@@ -0,0 +1,206 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the packed (upper-triangular) storage of the atomic C6 coefficients.
+"""
+from __future__ import annotations
+
+from math import sqrt
+
+import pytest
+import torch
+from tad_mctc.batch import pack
+
+from tad_dftd3 import damping, data, dftd3, disp, model, ncoord, neighbor, packing
+from tad_dftd3.reference import Reference
+from tad_dftd3.typing import DD
+
+from ..conftest import DEVICE
+from .samples import samples
+
+sample_list = ["AmF3", "SiH4", "PbH4-BiH3", "C6H5I-CH3SH", "MB16_43_01"]
+
+# TPSS0-D3BJ parameters
+param = {
+    "s6": torch.tensor(1.0000),
+    "s8": torch.tensor(1.2576),
+    "s9": torch.tensor(1.0000),
+    "a1": torch.tensor(0.3768),
+    "a2": torch.tensor(4.5865),
+}
+
+
+def test_fail() -> None:
+    sample = samples["SiH4"]
+    numbers = sample["numbers"]
+    positions = sample["positions"]
+
+    ref = Reference()
+    weights = torch.rand((numbers.shape[-1], ref.cn.shape[-1]), dtype=torch.double)
+    with pytest.raises(ValueError):
+        model.atomic_c6(numbers, weights, ref, grouped=True, packed=True)
+
+    with pytest.raises(ValueError):
+        dftd3(numbers, positions, param, fused=True, packed=True)
+
+    neighbors = neighbor.VerletList(torch.tensor(60.0), torch.tensor(1.0))
+    with pytest.raises(ValueError):
+        dftd3(numbers, positions, param, neighbors=neighbors, packed=True)
+
+
+def test_roundtrip() -> None:
+    matrix = torch.rand((2, 5, 5), dtype=torch.double, device=DEVICE)
+    matrix = matrix + matrix.mT
+
+    packed = packing.pack(matrix)
+    assert packed.shape == (2, 15)
+    assert pytest.approx(matrix.cpu()) == packing.unpack(packed, 5).cpu()
+
+    i = torch.tensor([0, 4, 2, 3], device=DEVICE)
+    j = torch.tensor([4, 0, 2, 1], device=DEVICE)
+    idx = packing.packed_index(i, j, 5)
+    assert pytest.approx(matrix[..., i, j].cpu()) == packed[..., idx].cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name", sample_list)
+@pytest.mark.parametrize("chunk_size", [None, 2])
+def test_c6(dtype: torch.dtype, name: str, chunk_size: int | None) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+
+    ref = Reference(**dd)
+    cn = ncoord.cn_d3(numbers, positions)
+    weights = model.weight_references(numbers, cn, ref)
+
+    c6 = model.atomic_c6(numbers, weights, ref)
+    packed = model.atomic_c6(numbers, weights, ref, chunk_size, packed=True)
+
+    nat = numbers.shape[-1]
+    assert packed.shape == (nat * (nat + 1) // 2,)
+    assert pytest.approx(c6.cpu(), abs=tol) == packing.unpack(packed, nat).cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name", sample_list)
+def test_single(dtype: torch.dtype, name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    c6 = sample["c6"].to(**dd)
+    c6p = packing.pack(c6)
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+    ref = disp.dispersion(numbers, positions, par, c6)
+
+    for kwargs in ({}, {"unique": True}, {"chunk_size": 2}, {"analytical": True}):
+        energy = disp.dispersion(numbers, positions, par, c6p, packed=True, **kwargs)
+        assert energy.dtype == dtype
+        assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+    # pair list with both orderings and unique pairs
+    pairs = neighbor.neighbor_list(numbers, positions, torch.tensor(50.0, **dd))
+    energy = disp.dispersion(numbers, positions, par, c6p, pairs=pairs, packed=True)
+    assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+    pairs = pairs[:, pairs[0] < pairs[1]]
+    energy = disp.dispersion(
+        numbers, positions, par, c6p, pairs=pairs, unique=True, packed=True
+    )
+    assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name", sample_list)
+def test_atm(dtype: torch.dtype, name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    c6 = sample["c6"].to(**dd)
+    c6p = packing.pack(c6)
+    rvdw = data.VDW_D3.to(**dd)[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
+    cutoff = torch.tensor(50.0, **dd)
+
+    ref = damping.dispersion_atm(numbers, positions, c6, rvdw, cutoff)
+
+    pairs = neighbor.neighbor_list(numbers, positions, cutoff)
+    for kwargs in ({}, {"unique": True}, {"chunk_size": 2}, {"pairs": pairs}):
+        energy = damping.dispersion_atm(
+            numbers, positions, c6p, rvdw, cutoff, packed=True, **kwargs
+        )
+        assert energy.dtype == dtype
+        assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name1", sample_list)
+@pytest.mark.parametrize("name2", ["SiH4"])
+def test_batch(dtype: torch.dtype, name1: str, name2: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample1, sample2 = samples[name1], samples[name2]
+    numbers = pack(
+        [
+            sample1["numbers"].to(DEVICE),
+            sample2["numbers"].to(DEVICE),
+        ]
+    )
+    positions = pack(
+        [
+            sample1["positions"].to(**dd),
+            sample2["positions"].to(**dd),
+        ]
+    )
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    ref = dftd3(numbers, positions, par)
+    for kwargs in ({}, {"unique": True}, {"chunk_size": 2}):
+        energy = dftd3(numbers, positions, par, packed=True, **kwargs)
+        assert energy.dtype == dtype
+        assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("name", ["LiH", "SiH4", "MB16_43_01"])
+def test_grad(name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, par)
+    (ref,) = torch.autograd.grad(energy.sum(), pos)
+
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, par, packed=True)
+    (grad,) = torch.autograd.grad(energy.sum(), pos)
+
+    assert pytest.approx(ref.cpu(), abs=1e-10) == grad.cpu()
@@ -0,0 +1,142 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the precision policies (single precision compute, double precision
+accumulation) against the double precision references.
+"""
+import pytest
+import torch
+from tad_mctc.batch import pack
+
+from tad_dftd3 import dftd3, disp, precision
+from tad_dftd3.typing import DD
+
+from ..conftest import DEVICE
+from .samples import samples
+
+sample_list = ["LiH", "SiH4", "PbH4-BiH3", "C6H5I-CH3SH", "MB16_43_01", "AmF3"]
+
+# documented bound of the relative error for centered molecules
+rtol = 1e-4
+
+# TPSS0-D3BJ-ATM parameters
+param = {
+    "s6": torch.tensor(1.0000, dtype=torch.double),
+    "s8": torch.tensor(1.2576, dtype=torch.double),
+    "s9": torch.tensor(1.0000, dtype=torch.double),
+    "alp": torch.tensor(14.00, dtype=torch.double),
+    "a1": torch.tensor(0.3768, dtype=torch.double),
+    "a2": torch.tensor(4.5865, dtype=torch.double),
+}
+
+
+def test_fail() -> None:
+    with pytest.raises(ValueError):
+        precision.get_precision("fp16")
+
+    with pytest.raises(ValueError):
+        precision.Precision(torch.float32, torch.int64)
+
+    sample = samples["LiH"]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(device=DEVICE, dtype=torch.float32)
+    c6 = sample["c6"].to(device=DEVICE, dtype=torch.float32)
+    par = {k: v.to(device=DEVICE, dtype=torch.float32) for k, v in param.items()}
+
+    with pytest.raises(ValueError):
+        disp.dispersion(
+            numbers, positions, par, c6, analytical=True, reduce_dtype=torch.double
+        )
+
+
+def test_policy() -> None:
+    policy = precision.get_precision("mixed")
+    assert policy.compute == torch.float32
+    assert policy.reduce == torch.float64
+    assert precision.get_precision(policy) is policy
+
+
+@pytest.mark.parametrize("name", sample_list)
+@pytest.mark.parametrize("policy", ["mixed", "fp32"])
+def test_single(name: str, policy: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    ref = (sample["disp2"] + sample["disp3"]).to(**dd)
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    energy = dftd3(numbers, positions, par, precision=policy)
+
+    assert energy.dtype == precision.get_precision(policy).reduce
+    assert pytest.approx(ref.cpu(), rel=rtol, abs=1e-8) == energy.double().cpu()
+
+
+@pytest.mark.parametrize("name1", ["PbH4-BiH3", "AmF3"])
+@pytest.mark.parametrize("name2", ["C6H5I-CH3SH", "MB16_43_01"])
+def test_batch(name1: str, name2: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample1, sample2 = samples[name1], samples[name2]
+    numbers = pack(
+        [
+            sample1["numbers"].to(DEVICE),
+            sample2["numbers"].to(DEVICE),
+        ]
+    )
+    positions = pack(
+        [
+            sample1["positions"].to(**dd),
+            sample2["positions"].to(**dd),
+        ]
+    )
+    ref = pack(
+        [
+            (sample1["disp2"] + sample1["disp3"]).to(**dd),
+            (sample2["disp2"] + sample2["disp3"]).to(**dd),
+        ]
+    )
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    energy = dftd3(numbers, positions, par, precision="mixed", chunk_size=5)
+
+    assert energy.dtype == torch.double
+    assert pytest.approx(ref.cpu(), rel=rtol, abs=1e-8) == energy.cpu()
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("name", ["LiH", "SiH4", "MB16_43_01"])
+def test_grad(name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, par)
+    (ref,) = torch.autograd.grad(energy.sum(), pos)
+
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, par, precision="mixed")
+    (grad,) = torch.autograd.grad(energy.sum(), pos)
+
+    assert grad.dtype == torch.double
+    assert pytest.approx(ref.cpu(), rel=rtol, abs=1e-7) == grad.cpu()
@@ -0,0 +1,146 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the evaluation of flat (ragged) batches against the padded batches.
+"""
+from math import sqrt
+
+import pytest
+import torch
+from tad_mctc.batch import pack
+
+from tad_dftd3 import dftd3, neighbor, ragged
+from tad_dftd3.typing import DD
+
+from ..conftest import DEVICE
+from .samples import samples
+
+sample_list = ["LiH", "SiH4", "PbH4-BiH3", "C6H5I-CH3SH", "MB16_43_01", "AmF3"]
+
+# TPSS0-D3BJ-ATM parameters
+param = {
+    "s6": torch.tensor(1.0000),
+    "s8": torch.tensor(1.2576),
+    "s9": torch.tensor(1.0000),
+    "alp": torch.tensor(14.00),
+    "a1": torch.tensor(0.3768),
+    "a2": torch.tensor(4.5865),
+}
+
+
+def test_fail() -> None:
+    numbers = torch.tensor([[1, 1]])
+    positions = torch.tensor([[[0.0, 0.0, 0.0], [0.0, 0.0, 1.0]]])
+    batch = torch.tensor([0, 0])
+
+    # segment ids require flat input
+    with pytest.raises(ValueError):
+        neighbor.neighbor_list(numbers, positions, torch.tensor(1.0), batch=batch)
+
+    with pytest.raises(ValueError):
+        ragged.dftd3_ragged(numbers, positions, param, batch)
+
+    # unsupported element
+    with pytest.raises(ValueError):
+        ragged.dftd3_ragged(torch.tensor([1, 105]), positions[0], param, batch)
+
+
+def test_segment_ids() -> None:
+    batch = ragged.segment_ids(torch.tensor([2, 0, 3]))
+    assert (batch == torch.tensor([0, 0, 2, 2, 2])).all()
+
+
+def test_neighbor_list() -> None:
+    sample1, sample2 = samples["SiH4"], samples["MB16_43_01"]
+    numbers = pack((sample1["numbers"], sample2["numbers"]))
+    positions = pack((sample1["positions"], sample2["positions"]))
+    cutoff = torch.tensor(5.0, dtype=positions.dtype)
+
+    # flat indices of the real atoms in the padded batch
+    idx = torch.nonzero(numbers.reshape(-1)).reshape(-1)
+    ref = neighbor.neighbor_list(numbers, positions, cutoff)
+
+    batch = ragged.segment_ids(torch.tensor([5, 16]))
+    pairs = neighbor.neighbor_list(
+        numbers.reshape(-1)[idx], positions.reshape(-1, 3)[idx], cutoff, batch=batch
+    )
+
+    assert (idx[pairs] == ref).all()
+
+
+def test_triple_list() -> None:
+    sample = samples["SiH4"]
+    numbers = sample["numbers"]
+    positions = sample["positions"]
+    pairs = neighbor.neighbor_list(numbers, positions, torch.tensor(3.0))
+
+    triples = neighbor.triple_list(pairs)
+    a, b, c = pairs[0, triples[0]], pairs[1, triples[0]], pairs[1, triples[1]]
+
+    assert (pairs[0, triples[1]] == a).all()
+    assert (pairs[0, triples[2]] == b).all()
+    assert (pairs[1, triples[2]] == c).all()
+
+    # all ordered triples of mutually neighboring atoms
+    adj = torch.zeros((5, 5), dtype=torch.bool)
+    adj[pairs[0], pairs[1]] = True
+    ref = adj.unsqueeze(-1) & adj.unsqueeze(-2) & adj.unsqueeze(-3)
+    assert triples.shape[-1] == ref.sum()
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("s9", [0.0, 1.0])
+def test_batch(dtype: torch.dtype, s9: float) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    numbers = [samples[name]["numbers"].to(DEVICE) for name in sample_list]
+    positions = [samples[name]["positions"].to(**dd) for name in sample_list]
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+    par["s9"] = torch.tensor(s9, **dd)
+
+    ref = torch.sum(dftd3(pack(numbers), pack(positions), par), dim=-1)
+
+    sizes = torch.tensor([n.shape[-1] for n in numbers], device=DEVICE)
+    batch = ragged.segment_ids(sizes)
+    energy = ragged.dftd3_ragged(torch.cat(numbers), torch.cat(positions), par, batch)
+
+    assert energy.dtype == dtype
+    assert energy.shape == ref.shape
+    assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+
+@pytest.mark.grad
+def test_grad() -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    names = ["LiH", "SiH4", "MB16_43_01"]
+    numbers = [samples[name]["numbers"].to(DEVICE) for name in names]
+    positions = [samples[name]["positions"].to(**dd) for name in names]
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    pos = pack(positions).requires_grad_(True)
+    energy = dftd3(pack(numbers), pos, par)
+    (grad,) = torch.autograd.grad(energy.sum(), pos)
+    ref = torch.cat([g[: n.shape[-1]] for g, n in zip(grad, numbers)])
+
+    pos = torch.cat(positions).requires_grad_(True)
+    batch = ragged.segment_ids(torch.tensor([n.shape[-1] for n in numbers]))
+    energy = ragged.dftd3_ragged(torch.cat(numbers), pos, par, batch)
+    (grad,) = torch.autograd.grad(energy.sum(), pos)
+
+    assert pytest.approx(ref.cpu(), abs=1e-10) == grad.cpu()
@@ -0,0 +1,267 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the separate cutoff and the screening of the three-body term.
+"""
+import logging
+import re
+from math import sqrt
+
+import pytest
+import torch
+from tad_mctc.batch import pack
+
+from tad_dftd3 import damping, data, dftd3, disp, neighbor
+from tad_dftd3.typing import DD
+
+from ..conftest import DEVICE
+from .samples import samples
+
+sample_list = ["SiH4", "PbH4-BiH3", "C6H5I-CH3SH", "MB16_43_01"]
+
+# PBE0-D3(BJ)-ATM parameters
+param = {
+    "s6": torch.tensor(1.0000),
+    "s8": torch.tensor(1.2177),
+    "s9": torch.tensor(1.0000),
+    "a1": torch.tensor(0.4145),
+    "a2": torch.tensor(4.8593),
+}
+
+
+def test_fail() -> None:
+    sample = samples["SiH4"]
+    numbers = sample["numbers"]
+    positions = sample["positions"]
+    c6 = sample["c6"]
+    rvdw = data.VDW_D3[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
+    cutoff = torch.tensor(50.0)
+
+    # screening requires unique triples or a pair list
+    with pytest.raises(ValueError):
+        damping.dispersion_atm(numbers, positions, c6, rvdw, cutoff, threshold=1e-8)
+
+    with pytest.raises(ValueError):
+        disp.dispersion3(
+            numbers,
+            positions,
+            param,
+            c6,
+            rvdw,
+            cutoff,
+            threshold=1e-8,
+            unique=True,
+            analytical=True,
+        )
+
+    # pair list too short for the three-body cutoff
+    nl = neighbor.VerletList(torch.tensor(50.0), torch.tensor(1.0))
+    with pytest.raises(ValueError):
+        dftd3(numbers, positions, param, neighbors=nl, cutoff3=torch.tensor(60.0))
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name", sample_list)
+@pytest.mark.parametrize("cutoff3", [5.0, 10.0])
+def test_cutoff3(dtype: torch.dtype, name: str, cutoff3: float) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    c6 = sample["c6"].to(**dd)
+    rvdw = data.VDW_D3.to(**dd)[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
+    cut3 = torch.tensor(cutoff3, **dd)
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    ref2 = disp.dispersion(
+        numbers, positions, {**par, "s9": torch.tensor(0.0, **dd)}, c6
+    )
+    ref = ref2 + damping.dispersion_atm(
+        numbers, positions, c6, rvdw, cut3, unique=True
+    )
+
+    energy = disp.dispersion(numbers, positions, par, c6, cutoff3=cut3, unique=True)
+    assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+    # all three pairs of a triple within the cutoff for all ordered triples
+    energy = damping.dispersion_atm(numbers, positions, c6, rvdw, cut3)
+    assert pytest.approx((ref - ref2).cpu(), abs=tol) == energy.cpu()
+
+    energy = damping.dispersion_atm(numbers, positions, c6, rvdw, cut3, chunk_size=3)
+    assert pytest.approx((ref - ref2).cpu(), abs=tol) == energy.cpu()
+
+    # the two-body term keeps its cutoff with a pair list
+    nl = neighbor.VerletList(torch.tensor(50.0, **dd), torch.tensor(1.0, **dd))
+    energy = dftd3(numbers, positions, par, neighbors=nl, cutoff3=cut3)
+    full = dftd3(numbers, positions, par, cutoff3=cut3, unique=True)
+    assert pytest.approx(full.cpu(), abs=tol) == energy.cpu()
+
+
+@pytest.mark.parametrize("name", ["PbH4-BiH3", "C6H5I-CH3SH", "MB16_43_01"])
+@pytest.mark.parametrize("threshold", [1e-8, 1e-6])
+def test_threshold(
+    name: str, threshold: float, caplog: pytest.LogCaptureFixture
+) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    ref = dftd3(numbers, positions, par, unique=True)
+
+    with caplog.at_level(logging.DEBUG, logger="tad_dftd3.damping.atm"):
+        energy = dftd3(numbers, positions, par, unique=True, threshold3=threshold)
+
+    match = re.search(r"skipped (\d+) of (\d+) triples, .* <= (\S+) Eh", caplog.text)
+    assert match is not None
+    skipped, total, bound = int(match[1]), int(match[2]), float(match[3])
+
+    nat = numbers.shape[-1]
+    assert total == nat * (nat - 1) * (nat - 2) // 6
+    assert 0 < skipped < total
+
+    # reported bound (rounded for the log) holds for the total energy
+    error = float(torch.abs(torch.sum(energy - ref)))
+    assert error <= bound * (1.0 + 1e-3)
+
+    # identical screening of the (ordered) triples of a pair list
+    nl = neighbor.VerletList(torch.tensor(50.0, **dd), torch.tensor(1.0, **dd))
+    pairs = dftd3(numbers, positions, par, neighbors=nl, threshold3=threshold)
+    assert pytest.approx(energy.cpu(), abs=1e-12) == pairs.cpu()
+
+
+@pytest.mark.parametrize("name", ["PbH4-BiH3", "C6H5I-CH3SH", "MB16_43_01"])
+def test_stats(name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+    threshold = 1e-6
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    c6 = sample["c6"].to(**dd)
+    rvdw = data.VDW_D3.to(**dd)[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
+    cutoff = torch.tensor(50.0, **dd)
+    s9 = torch.tensor(1.0, **dd)
+
+    nat = numbers.shape[-1]
+    i, j, k = torch.combinations(torch.arange(nat, device=DEVICE), r=3).unbind(-1)
+    r2 = torch.sum((positions.unsqueeze(-2) - positions.unsqueeze(-3)) ** 2, -1)
+
+    keep, stats = damping.screen_triples(
+        (r2[i, j], r2[i, k], r2[j, k]),
+        (c6[i, j], c6[i, k], c6[j, k]),
+        s9,
+        cutoff,
+        threshold,
+    )
+    assert int(stats.triples) == nat * (nat - 1) * (nat - 2) // 6
+    assert int(stats.skipped) == int((~keep).sum())
+    assert 0 < int(stats.skipped) < int(stats.triples)
+
+    # bound holds for the total energy
+    ref = damping.dispersion_atm(numbers, positions, c6, rvdw, cutoff, unique=True)
+    energy = damping.dispersion_atm(
+        numbers, positions, c6, rvdw, cutoff, unique=True, threshold=threshold
+    )
+    assert float(torch.abs(torch.sum(energy - ref))) <= float(stats.error)
+
+
+@pytest.mark.parametrize("name", ["PbH4-BiH3", "C6H5I-CH3SH", "MB16_43_01"])
+def test_stats_dftd3(name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+    threshold = 1e-6
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    ref = dftd3(numbers, positions, par, unique=True)
+
+    stats: list[damping.ScreeningStats] = []
+    energy = dftd3(
+        numbers, positions, par, unique=True, threshold3=threshold, stats3=stats
+    )
+    assert len(stats) == 1
+
+    nat = numbers.shape[-1]
+    assert int(stats[0].triples) == nat * (nat - 1) * (nat - 2) // 6
+    assert 0 < int(stats[0].skipped) < int(stats[0].triples)
+    assert float(torch.abs(torch.sum(energy - ref))) <= float(stats[0].error)
+
+    # same statistics for the (ordered) triples of a pair list
+    nl = neighbor.VerletList(torch.tensor(50.0, **dd), torch.tensor(1.0, **dd))
+    stats_nl: list[damping.ScreeningStats] = []
+    dftd3(
+        numbers, positions, par, neighbors=nl, threshold3=threshold, stats3=stats_nl
+    )
+    assert len(stats_nl) == 1
+    assert int(stats_nl[0].triples) == 6 * int(stats[0].triples)
+    assert int(stats_nl[0].skipped) == 6 * int(stats[0].skipped)
+    assert pytest.approx(float(stats[0].error)) == float(stats_nl[0].error)
+
+    # no statistics without screening
+    stats_none: list[damping.ScreeningStats] = []
+    dftd3(numbers, positions, par, unique=True, stats3=stats_none)
+    assert len(stats_none) == 0
+
+
+def test_threshold_zero() -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample1, sample2 = samples["LiH"], samples["MB16_43_01"]
+    numbers = pack(
+        [
+            sample1["numbers"].to(DEVICE),
+            sample2["numbers"].to(DEVICE),
+        ]
+    )
+    positions = pack(
+        [
+            sample1["positions"].to(**dd),
+            sample2["positions"].to(**dd),
+        ]
+    )
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    ref = dftd3(numbers, positions, par)
+    energy = dftd3(numbers, positions, par, unique=True, threshold3=0.0)
+    assert pytest.approx(ref.cpu(), abs=1e-12) == energy.cpu()
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("name", ["SiH4", "MB16_43_01"])
+def test_grad(name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, par, unique=True, threshold3=1e-7)
+    (grad,) = torch.autograd.grad(energy.sum(), pos)
+
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, par, unique=True)
+    (ref,) = torch.autograd.grad(energy.sum(), pos)
+
+    assert not torch.isnan(grad).any()
+    assert pytest.approx(ref.cpu(), abs=1e-5) == grad.cpu()
@@ -0,0 +1,243 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the evaluation of the two-body term for unique pairs and the three-body
+term for unique triples only.
+"""
+from math import sqrt
+
+import pytest
+import torch
+from tad_mctc.batch import pack
+
+from tad_dftd3 import damping, data, dftd3, disp, neighbor
+from tad_dftd3.typing import DD
+
+from ..conftest import DEVICE
+from .samples import samples
+
+sample_list = ["AmF3", "SiH4", "PbH4-BiH3", "C6H5I-CH3SH", "MB16_43_01"]
+
+# TPSS0-D3BJ parameters
+param = {
+    "s6": torch.tensor(1.0000),
+    "s8": torch.tensor(1.2576),
+    "s9": torch.tensor(0.0000),
+    "a1": torch.tensor(0.3768),
+    "a2": torch.tensor(4.5865),
+}
+
+
+def test_fail() -> None:
+    sample = samples["SiH4"]
+    numbers = sample["numbers"]
+    positions = sample["positions"]
+    c6 = sample["c6"]
+
+    with pytest.raises(ValueError):
+        disp.dispersion(numbers, positions, param, c6, chunk_size=2, unique=True)
+
+    with pytest.raises(ValueError):
+        disp.dispersion(numbers, positions, param, c6, analytical=True, unique=True)
+
+    with pytest.raises(ValueError):
+        dftd3(numbers, positions, param, chunk_size=2, unique=True)
+
+    rvdw = data.VDW_D3[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
+    cutoff = torch.tensor(50.0)
+    with pytest.raises(ValueError):
+        damping.dispersion_atm(
+            numbers, positions, c6, rvdw, cutoff, chunk_size=2, unique=True
+        )
+
+    with pytest.raises(ValueError):
+        disp.dispersion3(
+            numbers, positions, param, c6, rvdw, cutoff, analytical=True, unique=True
+        )
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name", sample_list)
+def test_single(dtype: torch.dtype, name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    ref = sample["disp2"].to(**dd)
+    c6 = sample["c6"].to(**dd)
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    energy = disp.dispersion(numbers, positions, par, c6, unique=True)
+    assert energy.dtype == dtype
+    assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+    # unique pair list
+    pairs = neighbor.neighbor_list(numbers, positions, torch.tensor(50.0, **dd))
+    pairs = pairs[:, pairs[0] < pairs[1]]
+    energy = disp.dispersion(numbers, positions, par, c6, pairs=pairs, unique=True)
+    assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name1", sample_list)
+@pytest.mark.parametrize("name2", ["SiH4"])
+def test_batch(dtype: torch.dtype, name1: str, name2: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample1, sample2 = samples[name1], samples[name2]
+    numbers = pack(
+        [
+            sample1["numbers"].to(DEVICE),
+            sample2["numbers"].to(DEVICE),
+        ]
+    )
+    positions = pack(
+        [
+            sample1["positions"].to(**dd),
+            sample2["positions"].to(**dd),
+        ]
+    )
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    ref = dftd3(numbers, positions, par)
+    energy = dftd3(numbers, positions, par, unique=True)
+
+    assert energy.dtype == dtype
+    assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("name", ["LiH", "SiH4", "MB16_43_01"])
+def test_grad(name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, par)
+    (ref,) = torch.autograd.grad(energy.sum(), pos)
+
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, par, unique=True)
+    (grad,) = torch.autograd.grad(energy.sum(), pos)
+
+    assert pytest.approx(ref.cpu(), abs=1e-10) == grad.cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name", sample_list)
+def test_atm_single(dtype: torch.dtype, name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    c6 = sample["c6"].to(**dd)
+    rvdw = data.VDW_D3.to(**dd)[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
+    cutoff = torch.tensor(50.0, **dd)
+
+    ref = damping.dispersion_atm(numbers, positions, c6, rvdw, cutoff)
+    energy = damping.dispersion_atm(numbers, positions, c6, rvdw, cutoff, unique=True)
+    assert energy.dtype == dtype
+    assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+    # unique triples from a pair list
+    pairs = neighbor.neighbor_list(numbers, positions, cutoff)
+    energy = damping.dispersion_atm(
+        numbers, positions, c6, rvdw, cutoff, pairs=pairs, unique=True
+    )
+    assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+
+@pytest.mark.parametrize("cutoff", [5.0, 10.0])
+def test_atm_cutoff(cutoff: float) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample = samples["MB16_43_01"]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    c6 = sample["c6"].to(**dd)
+    rvdw = data.VDW_D3.to(**dd)[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
+    cut = torch.tensor(cutoff, **dd)
+
+    # all three pairs of a triple must be within the cutoff (as for pair lists)
+    pairs = neighbor.neighbor_list(numbers, positions, cut)
+    ref = damping.dispersion_atm(numbers, positions, c6, rvdw, cut, pairs=pairs)
+    energy = damping.dispersion_atm(numbers, positions, c6, rvdw, cut, unique=True)
+    assert pytest.approx(ref.cpu(), abs=1e-12) == energy.cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name1", sample_list)
+@pytest.mark.parametrize("name2", ["SiH4"])
+def test_atm_batch(dtype: torch.dtype, name1: str, name2: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample1, sample2 = samples[name1], samples[name2]
+    numbers = pack(
+        [
+            sample1["numbers"].to(DEVICE),
+            sample2["numbers"].to(DEVICE),
+        ]
+    )
+    positions = pack(
+        [
+            sample1["positions"].to(**dd),
+            sample2["positions"].to(**dd),
+        ]
+    )
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+    par["s9"] = torch.tensor(1.0, **dd)
+
+    ref = dftd3(numbers, positions, par)
+    energy = dftd3(numbers, positions, par, unique=True)
+
+    assert energy.dtype == dtype
+    assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("name", ["LiH", "SiH4", "MB16_43_01"])
+def test_atm_grad(name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+    par["s9"] = torch.tensor(1.0, **dd)
+
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, par)
+    (ref,) = torch.autograd.grad(energy.sum(), pos)
+
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, par, unique=True)
+    (grad,) = torch.autograd.grad(energy.sum(), pos)
+
+    assert pytest.approx(ref.cpu(), abs=1e-10) == grad.cpu()
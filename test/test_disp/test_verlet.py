@@ -0,0 +1,124 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the reusable pair list with skin (Verlet list).
+"""
+from math import sqrt
+
+import pytest
+import torch
+
+from tad_dftd3 import dftd3, neighbor
+from tad_dftd3.typing import DD
+
+from ..conftest import DEVICE
+from .samples import samples
+
+# TPSS0-D3BJ parameters
+param = {
+    "s6": torch.tensor(1.0000),
+    "s8": torch.tensor(1.2576),
+    "s9": torch.tensor(0.0000),
+    "a1": torch.tensor(0.3768),
+    "a2": torch.tensor(4.5865),
+}
+
+
+def test_fail() -> None:
+    with pytest.raises(ValueError):
+        neighbor.VerletList(torch.tensor(50.0), torch.tensor(-1.0))
+
+    sample = samples["SiH4"]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(DEVICE)
+
+    # cutoff of pair list too small
+    nl = neighbor.VerletList(torch.tensor(10.0), torch.tensor(1.0))
+    with pytest.raises(ValueError):
+        dftd3(numbers, positions, param, neighbors=nl)
+
+
+def test_rebuild() -> None:
+    sample = samples["MB16_43_01"]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(DEVICE)
+
+    nl = neighbor.VerletList(torch.tensor(5.0), torch.tensor(1.0))
+    pairs = nl.update(numbers, positions)
+    assert nl.nbuild == 1
+
+    # small displacement: reuse
+    shift = torch.zeros_like(positions)
+    shift[0, 0] = 0.45
+    assert nl.update(numbers, positions + shift) is pairs
+    assert nl.nbuild == 1
+
+    # displacement larger than half of the skin: rebuild
+    shift[0, 0] = 0.55
+    nl.update(numbers, positions + shift)
+    assert nl.nbuild == 2
+
+    # different atoms: rebuild
+    nl.update(numbers[:-1], positions[:-1])
+    assert nl.nbuild == 3
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name", ["SiH4", "PbH4-BiH3", "MB16_43_01"])
+def test_trajectory(dtype: torch.dtype, name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps)
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+    cutoff = torch.tensor(30.0, **dd)
+    nl = neighbor.VerletList(cutoff, torch.tensor(2.0, **dd))
+
+    gen = torch.Generator(device=DEVICE).manual_seed(42)
+    for _ in range(5):
+        noise = torch.rand(positions.shape, generator=gen, device=DEVICE) - 0.5
+        positions = positions + 0.4 * noise.to(**dd)
+
+        ref = dftd3(numbers, positions, par, cutoff=cutoff)
+        energy = dftd3(numbers, positions, par, cutoff=cutoff, neighbors=nl)
+
+        assert pytest.approx(ref.cpu(), abs=tol) == energy.cpu()
+
+    assert 1 <= nl.nbuild < 5
+
+
+@pytest.mark.grad
+def test_grad() -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample = samples["MB16_43_01"]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+
+    par = {k: v.to(**dd) for k, v in param.items()}
+    nl = neighbor.VerletList(torch.tensor(50.0, **dd), torch.tensor(2.0, **dd))
+
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, par)
+    (ref,) = torch.autograd.grad(energy.sum(), pos)
+
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, par, neighbors=nl)
+    (grad,) = torch.autograd.grad(energy.sum(), pos)
+
+    assert pytest.approx(ref.cpu(), abs=1e-10) == grad.cpu()
@@ -0,0 +1,232 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Testing the analytical gradient of the two-body dispersion energy.
+"""
+from __future__ import annotations
+
+import pytest
+import torch
+from tad_mctc.autograd import dgradcheck, dgradgradcheck, hessian
+from tad_mctc.batch import pack
+
+from tad_dftd3 import damping, data, dftd3, disp
+from tad_dftd3.typing import DD, Callable, Tensor
+
+from ..conftest import DEVICE, FAST_MODE
+from .samples import samples
+
+sample_list = ["LiH", "AmF3", "SiH4", "MB16_43_01"]
+
+tol = 1e-8
+
+
+def test_fail() -> None:
+    sample = samples["LiH"]
+    numbers = sample["numbers"]
+    positions = sample["positions"]
+    c6 = torch.ones((2, 2))
+    r4r2 = data.R4R2[numbers]
+    cutoff = torch.tensor(50.0)
+    param = {"a1": torch.tensor(0.4)}
+
+    def custom(order: int, r: Tensor, qq: Tensor, par: dict[str, Tensor]) -> Tensor:
+        return damping.rational_damping(order, r, qq, par)
+
+    with pytest.raises(ValueError):
+        disp.dispersion2(
+            numbers, positions, param, c6, r4r2, custom, cutoff, analytical=True
+        )
+
+    with pytest.raises(ValueError):
+        disp.dispersion2(
+            numbers,
+            positions,
+            param,
+            c6,
+            r4r2,
+            damping.rational_damping,
+            cutoff,
+            chunk_size=1,
+            analytical=True,
+        )
+
+
+def gradchecker(dtype: torch.dtype, name: str) -> tuple[
+    Callable[..., Tensor],  # autograd function
+    tuple[Tensor, ...],  # differentiable variables
+]:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    nat = numbers.shape[-1]
+
+    c6 = (torch.rand((nat, nat), **dd) + 1.0) * 10
+    c6 = c6 + c6.mT
+    r4r2 = data.R4R2.to(**dd)[numbers]
+    cutoff = torch.tensor(50.0, **dd)
+
+    # variables to be differentiated
+    diffvars = (
+        positions.clone().requires_grad_(True),
+        c6.requires_grad_(True),
+        r4r2.clone().requires_grad_(True),
+        torch.tensor(1.00000000, requires_grad=True, **dd),
+        torch.tensor(0.78981345, requires_grad=True, **dd),
+        torch.tensor(0.49484001, requires_grad=True, **dd),
+        torch.tensor(5.73083694, requires_grad=True, **dd),
+    )
+    label = ("s6", "s8", "a1", "a2")
+
+    def func(pos: Tensor, c: Tensor, r: Tensor, *inputs: Tensor) -> Tensor:
+        param = {label[i]: input for i, input in enumerate(inputs)}
+        return damping.dispersion2_rational(numbers, pos, param, c, r, cutoff)
+
+    return func, diffvars
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name", sample_list)
+def test_gradcheck(dtype: torch.dtype, name: str) -> None:
+    func, diffvars = gradchecker(dtype, name)
+    assert dgradcheck(func, diffvars, atol=tol, fast_mode=FAST_MODE)
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name", sample_list)
+def test_gradgradcheck(dtype: torch.dtype, name: str) -> None:
+    func, diffvars = gradchecker(dtype, name)
+    assert dgradgradcheck(func, diffvars, atol=tol, fast_mode=FAST_MODE)
+
+
+def gradchecker_dftd3(
+    dtype: torch.dtype, name1: str, name2: str | None = None
+) -> tuple[
+    Callable[[Tensor], Tensor],  # autograd function
+    Tensor,  # differentiable variables
+]:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+
+    if name2 is None:
+        numbers = samples[name1]["numbers"].to(DEVICE)
+        positions = samples[name1]["positions"].to(**dd)
+    else:
+        numbers = pack(
+            [
+                samples[name1]["numbers"].to(DEVICE),
+                samples[name2]["numbers"].to(DEVICE),
+            ]
+        )
+        positions = pack(
+            [
+                samples[name1]["positions"].to(**dd),
+                samples[name2]["positions"].to(**dd),
+            ]
+        )
+
+    param = {
+        "s6": torch.tensor(1.00000000, **dd),
+        "s8": torch.tensor(0.78981345, **dd),
+        "s9": torch.tensor(1.00000000, **dd),
+        "a1": torch.tensor(0.49484001, **dd),
+        "a2": torch.tensor(5.73083694, **dd),
+    }
+
+    # variable to be differentiated
+    positions.requires_grad_(True)
+
+    def func(pos: Tensor) -> Tensor:
+        return dftd3(numbers, pos, param, analytical=True)
+
+    return func, positions
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name", sample_list)
+def test_gradcheck_dftd3(dtype: torch.dtype, name: str) -> None:
+    func, diffvars = gradchecker_dftd3(dtype, name)
+    assert dgradcheck(func, diffvars, atol=tol, fast_mode=FAST_MODE)
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name1", ["LiH"])
+@pytest.mark.parametrize("name2", sample_list)
+def test_gradcheck_dftd3_batch(dtype: torch.dtype, name1: str, name2: str) -> None:
+    func, diffvars = gradchecker_dftd3(dtype, name1, name2)
+    assert dgradcheck(func, diffvars, atol=tol, fast_mode=FAST_MODE)
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name", sample_list)
+def test_autograd(dtype: torch.dtype, name: str) -> None:
+    """Compare with reference values from tblite."""
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+
+    ref = sample["grad"].to(**dd)
+
+    # GFN1-xTB parameters
+    param = {
+        "s6": torch.tensor(1.00000000, **dd),
+        "s8": torch.tensor(2.40000000, **dd),
+        "s9": torch.tensor(0.00000000, **dd),
+        "a1": torch.tensor(0.63000000, **dd),
+        "a2": torch.tensor(5.00000000, **dd),
+    }
+
+    pos = positions.clone().requires_grad_(True)
+    energy = torch.sum(dftd3(numbers, pos, param, analytical=True))
+    (grad,) = torch.autograd.grad(energy, pos)
+
+    assert pytest.approx(ref.cpu(), abs=tol) == grad.cpu()
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name", ["LiH", "SiH4"])
+def test_hessian(dtype: torch.dtype, name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+
+    # GFN1-xTB parameters
+    param = {
+        "s6": torch.tensor(1.00000000, **dd),
+        "s8": torch.tensor(2.40000000, **dd),
+        "s9": torch.tensor(0.00000000, **dd),
+        "a1": torch.tensor(0.63000000, **dd),
+        "a2": torch.tensor(5.00000000, **dd),
+    }
+
+    def func(pos: Tensor, analytical: bool) -> Tensor:
+        return dftd3(numbers, pos, param, analytical=analytical)
+
+    pos = positions.clone().requires_grad_(True)
+    ref = hessian(func, (pos, False), argnums=0)
+    hess = hessian(func, (pos, True), argnums=0)
+
+    assert pytest.approx(ref.detach().cpu(), abs=tol) == hess.detach().cpu()
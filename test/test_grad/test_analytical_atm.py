@@ -0,0 +1,154 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Testing the analytical gradient of the three-body (ATM) dispersion energy.
+"""
+from __future__ import annotations
+
+import pytest
+import torch
+from tad_mctc.autograd import dgradcheck, dgradgradcheck
+from tad_mctc.batch import pack
+
+from tad_dftd3 import damping, data, dftd3, disp, neighbor
+from tad_dftd3.typing import DD, Callable, Tensor
+
+from ..conftest import DEVICE, FAST_MODE
+from .samples import samples
+
+sample_list = ["LiH", "AmF3", "SiH4", "MB16_43_01"]
+
+tol = 1e-8
+
+
+def test_fail() -> None:
+    sample = samples["SiH4"]
+    numbers = sample["numbers"]
+    positions = sample["positions"]
+    c6 = torch.ones((5, 5), dtype=positions.dtype)
+    rvdw = data.VDW_D3[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
+    cutoff = torch.tensor(50.0, dtype=positions.dtype)
+    param = {"s9": torch.tensor(1.0, dtype=positions.dtype)}
+    pairs = neighbor.neighbor_list(numbers, positions, cutoff)
+
+    with pytest.raises(ValueError):
+        disp.dispersion3(
+            numbers, positions, param, c6, rvdw, cutoff, pairs=pairs, analytical=True
+        )
+
+    with pytest.raises(ValueError):
+        disp.dispersion3(
+            numbers,
+            positions,
+            param,
+            c6,
+            rvdw,
+            cutoff,
+            reduce_dtype=torch.float,
+            analytical=True,
+        )
+
+
+def gradchecker(dtype: torch.dtype, name: str, chunk_size: int | None) -> tuple[
+    Callable[..., Tensor],  # autograd function
+    tuple[Tensor, ...],  # differentiable variables
+]:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    nat = numbers.shape[-1]
+
+    c6 = (torch.rand((nat, nat), **dd) + 1.0) * 10
+    c6 = c6 + c6.mT
+    rvdw = data.VDW_D3.to(**dd)[numbers.unsqueeze(-1), numbers.unsqueeze(-2)]
+    cutoff = torch.tensor(50.0, **dd)
+
+    # variables to be differentiated
+    diffvars = (
+        positions.clone().requires_grad_(True),
+        c6.requires_grad_(True),
+        rvdw.clone().requires_grad_(True),
+        torch.tensor(1.0, requires_grad=True, **dd),
+        torch.tensor(4.0 / 3.0, requires_grad=True, **dd),
+        torch.tensor(14.0, requires_grad=True, **dd),
+    )
+
+    def func(pos: Tensor, c: Tensor, r: Tensor, *inputs: Tensor) -> Tensor:
+        return damping.dispersion3_atm(
+            numbers, pos, c, r, cutoff, *inputs, chunk_size=chunk_size
+        )
+
+    return func, diffvars
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name", sample_list)
+@pytest.mark.parametrize("chunk_size", [None, 2])
+def test_gradcheck(dtype: torch.dtype, name: str, chunk_size: int | None) -> None:
+    func, diffvars = gradchecker(dtype, name, chunk_size)
+    assert dgradcheck(func, diffvars, atol=tol, fast_mode=FAST_MODE)
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name", ["LiH", "SiH4"])
+def test_gradgradcheck(dtype: torch.dtype, name: str) -> None:
+    func, diffvars = gradchecker(dtype, name, None)
+    assert dgradgradcheck(func, diffvars, atol=tol, fast_mode=FAST_MODE)
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name1", ["LiH"])
+@pytest.mark.parametrize("name2", sample_list)
+def test_autograd_batch(dtype: torch.dtype, name1: str, name2: str) -> None:
+    """Compare with the gradient of the plain autograd evaluation."""
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+
+    numbers = pack(
+        [
+            samples[name1]["numbers"].to(DEVICE),
+            samples[name2]["numbers"].to(DEVICE),
+        ]
+    )
+    positions = pack(
+        [
+            samples[name1]["positions"].to(**dd),
+            samples[name2]["positions"].to(**dd),
+        ]
+    )
+
+    # PBE0-D3(BJ)-ATM parameters
+    param = {
+        "s6": torch.tensor(1.0000, **dd),
+        "s8": torch.tensor(1.2177, **dd),
+        "s9": torch.tensor(1.0000, **dd),
+        "a1": torch.tensor(0.4145, **dd),
+        "a2": torch.tensor(4.8593, **dd),
+    }
+
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, param)
+    (ref,) = torch.autograd.grad(energy.sum(), pos)
+
+    pos = positions.clone().requires_grad_(True)
+    energy_ana = dftd3(numbers, pos, param, analytical=True)
+    (grad,) = torch.autograd.grad(energy_ana.sum(), pos)
+
+    assert pytest.approx(energy.detach().cpu(), abs=tol) == energy_ana.detach().cpu()
+    assert pytest.approx(ref.cpu(), abs=tol) == grad.cpu()
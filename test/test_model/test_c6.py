@@ -19,10 +19,11 @@ from __future__ import annotations
 
 import pytest
 import torch
+from tad_mctc._version import __tversion__
 from tad_mctc.autograd import dgradcheck, dgradgradcheck
 from tad_mctc.batch import pack
 
-from tad_dftd3 import model, ncoord, reference
+from tad_dftd3 import model, ncoord, neighbor, reference
 from tad_dftd3.typing import DD, Callable, Protocol, Tensor
 
 from ..conftest import DEVICE, FAST_MODE
@@ -109,6 +110,183 @@ def test_chunked(dtype: torch.dtype, size: int, chunk_size: int) -> None:
     assert pytest.approx(c6.cpu(), abs=tol, rel=tol) == c6_chunked.cpu()
 
 
+@pytest.mark.parametrize("dtype", [torch.float32, torch.float64])
+@pytest.mark.parametrize("name", sample_list)
+@pytest.mark.parametrize("chunk_size", [None, 7])
+def test_pairs(dtype: torch.dtype, name: str, chunk_size: int | None) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = torch.finfo(dtype).eps ** 0.5
+
+    sample1, sample2 = (samples[name], samples["SiH4"])
+    numbers = pack(
+        (
+            sample1["numbers"].to(DEVICE),
+            sample2["numbers"].to(DEVICE),
+        )
+    )
+    positions = pack(
+        (
+            sample1["positions"].to(**dd),
+            sample2["positions"].to(**dd),
+        )
+    )
+    ref = reference.Reference(**dd)
+
+    cn = ncoord.cn_d3(numbers, positions)
+    weights = model.weight_references(numbers, cn, ref)
+    c6 = model.atomic_c6(numbers, weights, ref)
+
+    pairs = neighbor.neighbor_list(numbers, positions, torch.tensor(8.0, **dd))
+    c6_pairs = model.atomic_c6_pairs(numbers, weights, ref, pairs, chunk_size)
+
+    nat = numbers.shape[-1]
+    assert c6_pairs.shape == (pairs.shape[-1],)
+    assert (
+        pytest.approx(
+            c6.reshape(-1)[pairs[0] * nat + pairs[1] % nat].cpu(), abs=tol, rel=tol
+        )
+        == c6_pairs.cpu()
+    )
+
+
+@pytest.mark.parametrize("dtype", [torch.float32, torch.float64])
+@pytest.mark.parametrize("name", sample_list)
+def test_trimmed(dtype: torch.dtype, name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = torch.finfo(dtype).eps ** 0.5
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+
+    ref = reference.Reference(**dd)
+    trimmed = ref.trim(numbers)
+
+    cn = ncoord.cn_d3(numbers, positions)
+    weights = model.weight_references(numbers, cn, trimmed)
+    assert weights.shape[-1] == trimmed.cn.shape[-1]
+
+    c6 = model.atomic_c6(numbers, weights, trimmed)
+    c6_full = model.atomic_c6(numbers, model.weight_references(numbers, cn, ref), ref)
+    assert pytest.approx(c6_full.cpu(), abs=tol, rel=tol) == c6.cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.float32, torch.float64])
+def test_chunked_auto(dtype: torch.dtype, caplog: pytest.LogCaptureFixture) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = torch.finfo(dtype).eps ** 0.5
+
+    ref = reference.Reference(**dd)
+    numbers = torch.randint(1, 86, (200,), device=DEVICE)
+    positions = torch.rand((200, 3), **dd) * 10
+
+    cn = ncoord.cn_d3(numbers, positions)
+    weights = model.weight_references(numbers, cn, ref)
+
+    # one row requires 200 * 7 * 7 * 4 (8) bytes
+    budget = 2.0
+    chunk_size = model.auto_chunk_size(numbers, ref, memory_budget=budget)
+    assert chunk_size is not None and 1 <= chunk_size < 200
+    size = torch.tensor([], dtype=dtype).element_size()
+    assert chunk_size * 200 * 49 * size <= budget * 1024**2
+
+    assert model.auto_chunk_size(numbers, ref, memory_budget=1e6) is None
+    assert model.auto_chunk_size(numbers, ref, memory_budget=0.0) == 1
+
+    c6 = model.atomic_c6(numbers, weights, ref)
+    with caplog.at_level("DEBUG", logger="tad_dftd3.model.c6"):
+        c6_auto = model.atomic_c6(
+            numbers, weights, ref, chunk_size="auto", memory_budget=budget
+        )
+    assert f"Chunk size for the C6 coefficients: {chunk_size}" in caplog.text
+
+    assert pytest.approx(c6.cpu(), abs=tol, rel=tol) == c6_auto.cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.float32, torch.float64])
+@pytest.mark.parametrize("name", sample_list)
+def test_unique(dtype: torch.dtype, name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = torch.finfo(dtype).eps ** 0.5
+
+    sample1, sample2 = (samples[name], samples["SiH4"])
+    numbers = pack(
+        (
+            sample1["numbers"].to(DEVICE),
+            sample2["numbers"].to(DEVICE),
+        )
+    )
+    positions = pack(
+        (
+            sample1["positions"].to(**dd),
+            sample2["positions"].to(**dd),
+        )
+    )
+
+    ref = reference.Reference(**dd)
+    cn = ncoord.cn_d3(numbers, positions)
+    weights = model.weight_references(numbers, cn, ref)
+
+    c6 = model.atomic_c6(numbers, weights, ref)
+    c6_unique = model.atomic_c6(numbers, weights, ref, unique=True)
+
+    assert c6.dtype == c6_unique.dtype == dtype
+    assert pytest.approx(c6.cpu(), abs=tol, rel=tol) == c6_unique.cpu()
+
+
+def test_unique_fail() -> None:
+    numbers = torch.tensor([1, 1])
+    weights = torch.ones((2, 7))
+    ref = reference.Reference()
+
+    with pytest.raises(ValueError):
+        model.atomic_c6(numbers, weights, ref, chunk_size=1, unique=True)
+
+    with pytest.raises(ValueError):
+        model.atomic_c6(numbers, weights, ref, chunk_size=1, grouped=True)
+
+    with pytest.raises(ValueError):
+        model.atomic_c6(numbers, weights, ref, unique=True, grouped=True)
+
+    with pytest.raises(ValueError):
+        model.atomic_c6(numbers, weights, ref, chunk_size="auto", unique=True)
+
+
+@pytest.mark.parametrize("dtype", [torch.float32, torch.float64])
+@pytest.mark.parametrize("name", sample_list)
+def test_grouped(dtype: torch.dtype, name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = torch.finfo(dtype).eps ** 0.5
+
+    sample1, sample2 = (samples[name], samples["SiH4"])
+    numbers = pack(
+        (
+            sample1["numbers"].to(DEVICE),
+            sample2["numbers"].to(DEVICE),
+        )
+    )
+    positions = pack(
+        (
+            sample1["positions"].to(**dd),
+            sample2["positions"].to(**dd),
+        )
+    )
+
+    ref = reference.Reference(**dd)
+    cn = ncoord.cn_d3(numbers, positions)
+    weights = model.weight_references(numbers, cn, ref)
+
+    c6 = model.atomic_c6(numbers, weights, ref)
+    c6_grouped = model.atomic_c6(numbers, weights, ref, grouped=True)
+
+    assert c6.dtype == c6_grouped.dtype == dtype
+    assert pytest.approx(c6.cpu(), abs=tol, rel=tol) == c6_grouped.cpu()
+
+    # single system
+    c6_grouped = model.atomic_c6(numbers[0], weights[0], ref, grouped=True)
+    assert pytest.approx(c6[0].cpu(), abs=tol, rel=tol) == c6_grouped.cpu()
+
+
 ###############################################################################
 
 
@@ -123,6 +301,8 @@ class C6Func(Protocol):
         weights: Tensor,
         ref: reference.Reference,
         chunk_size: int | None = None,
+        unique: bool = False,
+        pairs: Tensor | None = None,
     ) -> Tensor: ...
 
 
@@ -131,6 +311,8 @@ def gradchecker(
     name: str,
     f: C6Func,
     chunk_size: int | None = None,
+    unique: bool = False,
+    pairs: bool = False,
 ) -> tuple[
     Callable[[Tensor], Tensor],  # autograd function
     Tensor,  # differentiable variables
@@ -148,7 +330,14 @@ def gradchecker(
     # variables to be differentiated
     w = w.detach().clone().requires_grad_(True)
 
+    cutoff = torch.tensor(8.0, **dd)
+    plist = neighbor.neighbor_list(numbers, positions, cutoff)
+
     def func(weights: Tensor) -> Tensor:
+        if pairs is True:
+            return f(numbers, weights, ref, chunk_size, False, plist)
+        if unique is True:
+            return f(numbers, weights, ref, chunk_size, unique)
         if chunk_size is None:
             return f(numbers, weights, ref)
         return f(numbers, weights, ref, chunk_size)
@@ -164,6 +353,7 @@ def gradchecker(
     [
         (model.c6._atomic_c6_full, None),
         (model.c6._atomic_c6_chunked, 2),
+        (model.c6._atomic_c6_grouped, None),
         (model.atomic_c6, None),
         (model.atomic_c6, 2),
         (model.c6.AtomicC6_V1.apply, None),
@@ -189,6 +379,7 @@ def test_gradcheck(
     [
         (model.c6._atomic_c6_full, None),
         (model.c6._atomic_c6_chunked, 2),
+        (model.c6._atomic_c6_grouped, None),
         (model.atomic_c6, None),
         (model.atomic_c6, 2),
         (model.c6.AtomicC6_V1.apply, None),
@@ -204,3 +395,128 @@ def test_gradgradcheck(
     """
     func, diffvars = gradchecker(dtype, name, f, chunk_size=chunk_size)
     assert dgradgradcheck(func, diffvars, atol=tol, fast_mode=FAST_MODE)
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name", sample_list)
+@pytest.mark.parametrize(
+    "f", [model.atomic_c6, model.c6.AtomicC6_V1.apply, model.c6.AtomicC6_V2.apply]
+)
+def test_gradcheck_unique(dtype: torch.dtype, name: str, f: C6Func) -> None:
+    func, diffvars = gradchecker(dtype, name, f, unique=True)
+    assert dgradcheck(func, diffvars, atol=tol, fast_mode=FAST_MODE)
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name", sample_list)
+@pytest.mark.parametrize(
+    "f", [model.atomic_c6, model.c6.AtomicC6_V1.apply, model.c6.AtomicC6_V2.apply]
+)
+def test_gradgradcheck_unique(dtype: torch.dtype, name: str, f: C6Func) -> None:
+    func, diffvars = gradchecker(dtype, name, f, unique=True)
+    assert dgradgradcheck(func, diffvars, atol=tol, fast_mode=FAST_MODE)
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name", sample_list)
+@pytest.mark.parametrize("chunk_size", [None, 5])
+@pytest.mark.parametrize("f", [model.c6.AtomicC6_V1.apply, model.c6.AtomicC6_V2.apply])
+def test_gradcheck_pairs(
+    dtype: torch.dtype, name: str, f: C6Func, chunk_size: int | None
+) -> None:
+    func, diffvars = gradchecker(dtype, name, f, chunk_size=chunk_size, pairs=True)
+    assert dgradcheck(func, diffvars, atol=tol, fast_mode=FAST_MODE)
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name", sample_list)
+@pytest.mark.parametrize("chunk_size", [None, 5])
+@pytest.mark.parametrize("f", [model.c6.AtomicC6_V1.apply, model.c6.AtomicC6_V2.apply])
+def test_gradgradcheck_pairs(
+    dtype: torch.dtype, name: str, f: C6Func, chunk_size: int | None
+) -> None:
+    func, diffvars = gradchecker(dtype, name, f, chunk_size=chunk_size, pairs=True)
+    assert dgradgradcheck(func, diffvars, atol=tol, fast_mode=FAST_MODE)
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name", sample_list)
+@pytest.mark.parametrize("chunk_size", [None, 2])
+def test_gradgradcheck_v2(
+    dtype: torch.dtype, name: str, chunk_size: int | None
+) -> None:
+    f = model.c6.AtomicC6_V2.apply
+    func, diffvars = gradchecker(dtype, name, f, chunk_size=chunk_size)
+    assert dgradgradcheck(func, diffvars, atol=tol, fast_mode=FAST_MODE)
+
+
+@pytest.mark.grad
+@pytest.mark.skipif(__tversion__ < (2, 0, 0), reason="Requires `torch.func`.")
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name", sample_list)
+@pytest.mark.parametrize(
+    "chunk_size, unique, pairs",
+    [(None, False, False), (2, False, False), (None, True, False), (5, False, True)],
+)
+def test_jacfwd(
+    dtype: torch.dtype,
+    name: str,
+    chunk_size: int | None,
+    unique: bool,
+    pairs: bool,
+) -> None:
+    """Forward-mode Jacobian of the custom autograd function vs. reverse-mode."""
+    f = model.c6.AtomicC6Fwd_V2.apply
+    func, w = gradchecker(dtype, name, f, chunk_size, unique, pairs)
+    w = w.detach()
+
+    jac_fwd = torch.func.jacfwd(func)(w)
+    jac_rev = torch.func.jacrev(func)(w)
+    assert pytest.approx(jac_rev.cpu(), abs=tol) == jac_fwd.cpu()
+
+
+@pytest.mark.grad
+@pytest.mark.skipif(__tversion__ < (2, 0, 0), reason="Requires `torch.func`.")
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name", sample_list)
+@pytest.mark.parametrize("chunk_size", [None, 2])
+def test_hessian_fwd_over_rev(
+    dtype: torch.dtype, name: str, chunk_size: int | None
+) -> None:
+    """Forward-over-reverse Hessian vs. the plain autograd implementation."""
+    func, w = gradchecker(dtype, name, model.c6.AtomicC6Fwd_V2.apply, chunk_size)
+    ref_func, _ = gradchecker(dtype, name, model.c6._atomic_c6_full)
+    w = w.detach()
+
+    hess = torch.func.jacfwd(torch.func.grad(lambda x: func(x).sum()))(w)
+    ref = torch.func.hessian(lambda x: ref_func(x).sum())(w)
+    assert pytest.approx(ref.cpu(), abs=tol) == hess.cpu()
+
+
+@pytest.mark.grad
+@pytest.mark.skipif(__tversion__ < (2, 0, 0), reason="Requires `torch.func`.")
+@pytest.mark.parametrize("dtype", [torch.double])
+@pytest.mark.parametrize("name", sample_list)
+@pytest.mark.parametrize("packed", [False, True])
+def test_forward_ad(dtype: torch.dtype, name: str, packed: bool) -> None:
+    """Forward-mode AD of the main entry point is opt-in."""
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    ref = reference.Reference(**dd)
+    w = sample["weights"].to(**dd)
+
+    def func(weights: Tensor) -> Tensor:
+        return model.atomic_c6(
+            numbers, weights, ref, packed=packed, forward_ad=True
+        )
+
+    jac_fwd = torch.func.jacfwd(func)(w)
+    jac_rev = torch.func.jacrev(func)(w)
+    assert pytest.approx(jac_rev.cpu(), abs=tol) == jac_fwd.cpu()
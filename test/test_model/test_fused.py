@@ -0,0 +1,215 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the fused evaluation of the coordination number, weights and C6.
+"""
+from __future__ import annotations
+
+from math import sqrt
+
+import pytest
+import torch
+from tad_mctc.autograd import dgradcheck, dgradgradcheck
+from tad_mctc.batch import pack
+
+from tad_dftd3 import data, dftd3, model, ncoord, reference
+from tad_dftd3.typing import DD, Tensor
+
+from ..conftest import DEVICE, FAST_MODE
+from .samples import samples
+
+sample_list = ["SiH4", "PbH4-BiH3", "C6H5I-CH3SH", "MB16_43_01"]
+
+param = {
+    "a1": torch.tensor(0.49484001),
+    "s8": torch.tensor(0.78981345),
+    "a2": torch.tensor(5.73083694),
+    "s9": torch.tensor(1.0),
+}
+
+
+def test_fail() -> None:
+    ref = reference.Reference(device=DEVICE, dtype=torch.double)
+    numbers = torch.tensor([6, 1], device=DEVICE)
+    positions = torch.tensor([[0.0, 0.0, 0.0], [0.0, 0.0, 2.0]], device=DEVICE)
+    positions = positions.double()
+
+    # wrong shapes
+    with pytest.raises(ValueError):
+        model.atomic_c6_fused(numbers[:1], positions, ref)
+    with pytest.raises(ValueError):
+        model.atomic_c6_fused(numbers, positions, ref, rcov=positions[:, 0][:1])
+
+    # no gradient w.r.t. the covalent radii
+    rcov = data.COV_D3.to(positions)[numbers].requires_grad_(True)
+    with pytest.raises(ValueError):
+        model.atomic_c6_fused(numbers, positions, ref, rcov=rcov)
+
+    # unsupported options
+    par = {k: v.to(positions) for k, v in param.items()}
+    with pytest.raises(ValueError):
+        dftd3(numbers, positions, par, fused=True, chunk_size=1)
+    with pytest.raises(ValueError):
+        dftd3(
+            numbers,
+            positions,
+            par,
+            fused=True,
+            weighting_function=lambda x: torch.exp(-3.0 * x * x),
+        )
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name", sample_list)
+def test_single(dtype: torch.dtype, name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps) * 10
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    ref = reference.Reference(**dd)
+
+    cn = ncoord.cn_d3(numbers, positions)
+    weights = model.weight_references(numbers, cn, ref)
+    c6_ref = model.atomic_c6(numbers, weights, ref)
+
+    c6, dc6dcn = model.atomic_c6_fused(numbers, positions, ref)
+    assert c6.dtype == dc6dcn.dtype == dtype
+    assert pytest.approx(c6_ref.cpu(), rel=tol) == c6.cpu()
+
+    # ∂C6_ij/∂CN_i from autograd (only the weights of atom i change)
+    cn = cn.detach().requires_grad_(True)
+    weights = model.weight_references(numbers, cn, ref)
+    c6_ref = model.atomic_c6(numbers, weights, ref)
+    nat = numbers.shape[-1]
+    for i in range(nat):
+        (grad,) = torch.autograd.grad(c6_ref[i].sum(), cn, retain_graph=True)
+
+        # the row sum contains ∂C6_ii/∂CN_i twice
+        expected = grad[i] - dc6dcn[i, i]
+        assert pytest.approx(expected.cpu(), rel=tol, abs=tol) == dc6dcn[i].sum().cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.float, torch.double])
+@pytest.mark.parametrize("name", ["C6H5I-CH3SH", "MB16_43_01"])
+def test_underflow(dtype: torch.dtype, name: str) -> None:
+    """
+    Compressed geometries lead to large CNs, for which all Gaussian weights
+    underflow. The fused weights must use the same fallback as the weights of
+    the double precision implementation (weight of one for the largest CN).
+    """
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = sqrt(torch.finfo(dtype).eps) * 10
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd) * 0.1
+
+    # second reference of hydrogen close to the first one (largest CN)
+    ref = reference.Reference(**dd)
+    refcn = ref.cn.clone()
+    refcn[1, 1] = refcn[1, 0] - 0.01
+    ref = reference.Reference(cn=refcn, c6=ref.c6)
+
+    def gaussian(dcn: Tensor) -> Tensor:
+        return model.gaussian_weight(dcn)
+
+    cn = ncoord.cn_d3(numbers, positions)
+    weights = model.weight_references(numbers, cn, ref, gaussian)
+    c6_ref = model.atomic_c6(numbers, weights, ref)
+
+    # fallback is active, i.e., only a single weight per atom
+    assert ((weights > 0).sum(-1) == 1).any()
+
+    c6, dc6dcn = model.atomic_c6_fused(numbers, positions, ref)
+    assert pytest.approx(c6_ref.cpu(), rel=tol) == c6.cpu()
+    assert not torch.isnan(dc6dcn).any()
+
+
+@pytest.mark.parametrize("name1", ["SiH4"])
+@pytest.mark.parametrize("name2", sample_list)
+def test_batch(name1: str, name2: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample1, sample2 = samples[name1], samples[name2]
+    numbers = pack(
+        (
+            sample1["numbers"].to(DEVICE),
+            sample2["numbers"].to(DEVICE),
+        )
+    )
+    positions = pack(
+        (
+            sample1["positions"].to(**dd),
+            sample2["positions"].to(**dd),
+        )
+    )
+    ref = reference.Reference(**dd)
+
+    cn = ncoord.cn_d3(numbers, positions)
+    weights = model.weight_references(numbers, cn, ref)
+    c6_ref = model.atomic_c6(numbers, weights, ref)
+
+    c6, dc6dcn = model.atomic_c6_fused(numbers, positions, ref)
+    assert pytest.approx(c6_ref.cpu(), rel=1e-10, abs=1e-12) == c6.cpu()
+
+    # padding does not contribute
+    padding = numbers == 0
+    assert (dc6dcn[padding.unsqueeze(-1) | padding.unsqueeze(-2)] == 0).all()
+
+
+@pytest.mark.parametrize("name", sample_list)
+def test_dftd3(name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    ref = reference.Reference(**dd)
+    par = {k: v.to(**dd) for k, v in param.items()}
+
+    pos = positions.clone().requires_grad_(True)
+    energy = dftd3(numbers, pos, par, ref=ref)
+    (grad,) = torch.autograd.grad(energy.sum(), pos)
+
+    pos = positions.clone().requires_grad_(True)
+    energy_fused = dftd3(numbers, pos, par, ref=ref, fused=True)
+    (grad_fused,) = torch.autograd.grad(energy_fused.sum(), pos)
+
+    assert pytest.approx(energy.detach().cpu(), rel=1e-10, abs=1e-14) == (
+        energy_fused.detach().cpu()
+    )
+    assert pytest.approx(grad.cpu(), abs=1e-10) == grad_fused.cpu()
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("name", ["SiH4", "PbH4-BiH3"])
+def test_grad(name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    ref = reference.Reference(**dd)
+
+    def func(x: Tensor) -> Tensor:
+        return model.atomic_c6_fused(numbers, x, ref)[0]
+
+    pos = positions.clone().requires_grad_(True)
+    assert dgradcheck(func, pos, fast_mode=FAST_MODE)
+
+    pos = positions.clone().requires_grad_(True)
+    assert dgradgradcheck(func, pos, fast_mode=FAST_MODE)
@@ -117,3 +117,53 @@ def test_reference_fail() -> None:
         repr(ref)
         == "Reference(n_element=104, n_reference=7, dtype=torch.float64, device=cpu)"
     )
+
+
+@pytest.mark.parametrize("dtype", [torch.float32, torch.float64])
+def test_reference_trim(dtype: torch.dtype) -> None:
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    ref = reference.Reference(**dd)
+
+    # H (2), C (5), N (4), O (3)
+    numbers = torch.tensor([[1, 6, 7, 8], [1, 8, 0, 0]], device=DEVICE)
+    trimmed = ref.trim(numbers)
+    assert trimmed.cn.shape == (104, 5)
+    assert trimmed.c6.shape == (104, 104, 5, 5)
+    assert (trimmed.cn == ref.cn[:, :5]).all()
+    assert (trimmed.c6 == ref.c6[..., :5, :5]).all()
+
+    # only padded reference systems are removed
+    assert (ref.cn[numbers][..., 5:] < 0).all()
+
+    assert ref.trim(torch.tensor([1, 1], device=DEVICE)).cn.shape[-1] == 2
+    assert ref.trim(torch.tensor([0, 0], device=DEVICE)).cn.shape[-1] == 1
+
+    # actinides use all reference systems
+    assert ref.trim() is ref
+    assert ref.trim(torch.tensor([6, 89], device=DEVICE)) is ref
+
+
+def test_reference_metadata() -> None:
+    ref = reference.Reference(device=DEVICE)
+
+    assert (ref.valid == (ref.cn >= 0)).all()
+    assert (ref.nref == torch.sum(ref.cn >= 0, dim=-1)).all()
+
+    # H (2), C (5), Ce (1, largest CN first), Ni (largest CN not last)
+    numbers = torch.tensor([1, 6, 58, 28], device=DEVICE)
+    assert ref.nref[numbers].tolist() == [2, 5, 1, 4]
+    assert ref.maxref[numbers].tolist() == [0, 4, 0, 2]
+
+    # stacked metadata for a single gather
+    meta = ref.meta[numbers]
+    assert meta.shape == (4, 3, 7) and meta.dtype == ref.dtype
+    assert (meta[:, 0] == ref.cn[numbers]).all()
+    assert ((meta[:, 1] > 0) == ref.valid[numbers]).all()
+    assert (meta[:, 2].argmax(-1) == ref.maxref[numbers]).all()
+    assert (meta[:, 2].sum(-1) == 1).all()
+
+    # metadata follows trimming
+    trimmed = ref.trim(numbers)
+    assert (trimmed.nref[numbers] == ref.nref[numbers]).all()
+    assert (trimmed.maxref[numbers] == ref.maxref[numbers]).all()
+    assert (trimmed.meta[numbers] == ref.meta[numbers][..., :5]).all()
@@ -0,0 +1,160 @@
+# This file is part of tad-dftd3.
+# SPDX-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Test the interpolated C6 coefficients.
+"""
+from __future__ import annotations
+
+import pytest
+import torch
+from tad_mctc.autograd import dgradcheck
+from tad_mctc.batch import pack
+
+from tad_dftd3 import dftd3, model, ncoord, neighbor, reference
+from tad_dftd3.typing import DD
+
+from ..conftest import DEVICE, FAST_MODE
+from .samples import samples
+
+sample_list = ["SiH4", "PbH4-BiH3", "C6H5I-CH3SH", "MB16_43_01"]
+
+
+def test_fail() -> None:
+    ref = reference.Reference(device=DEVICE, dtype=torch.double)
+    numbers = torch.tensor([6, 1], device=DEVICE)
+
+    # tolerance not reachable with the grid
+    with pytest.raises(ValueError):
+        model.C6Table(ref, numbers, tol=1e-6, max_points=33)
+
+    # element not tabulated
+    table = model.C6Table(ref, numbers[1:], tol=1e-3)
+    with pytest.raises(ValueError):
+        model.interpolate_c6(
+            numbers, torch.zeros(2, device=DEVICE, dtype=torch.double), table
+        )
+
+
+@pytest.mark.parametrize("name", sample_list)
+@pytest.mark.parametrize("tol", [1e-3, 1e-5])
+def test_single(name: str, tol: float) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    ref = reference.Reference(**dd)
+
+    cn = ncoord.cn_d3(numbers, positions)
+    weights = model.weight_references(numbers, cn, ref)
+    c6 = model.atomic_c6(numbers, weights, ref)
+
+    table = model.C6Table(ref, numbers, tol=tol)
+    assert table.error <= tol
+
+    c6_table = model.interpolate_c6(numbers, cn, table)
+    assert pytest.approx(c6.cpu(), rel=tol) == c6_table.cpu()
+
+    # input in single precision
+    c6_float = model.interpolate_c6(numbers, cn.float(), table)
+    assert c6_float.dtype == torch.float
+    assert pytest.approx(c6_table.cpu(), rel=1e-5) == c6_float.double().cpu()
+
+
+@pytest.mark.parametrize("name1", ["SiH4"])
+@pytest.mark.parametrize("name2", sample_list)
+def test_batch(name1: str, name2: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+    tol = 1e-5
+
+    sample1, sample2 = samples[name1], samples[name2]
+    numbers = pack(
+        (
+            sample1["numbers"].to(DEVICE),
+            sample2["numbers"].to(DEVICE),
+        )
+    )
+    positions = pack(
+        (
+            sample1["positions"].to(**dd),
+            sample2["positions"].to(**dd),
+        )
+    )
+    ref = reference.Reference(**dd)
+
+    cn = ncoord.cn_d3(numbers, positions)
+    weights = model.weight_references(numbers, cn, ref)
+    c6 = model.atomic_c6(numbers, weights, ref)
+
+    table = model.C6Table(ref, numbers, tol=tol)
+    c6_table = model.interpolate_c6(numbers, cn, table)
+    assert pytest.approx(c6.cpu(), rel=tol, abs=1e-12) == c6_table.cpu()
+
+    pairs = neighbor.neighbor_list(numbers, positions, torch.tensor(8.0, **dd))
+    c6_pairs = model.interpolate_c6(numbers, cn, table, pairs=pairs)
+
+    nat = numbers.shape[-1]
+    ref_pairs = c6_table.reshape(-1)[pairs[0] * nat + pairs[1] % nat]
+    assert pytest.approx(ref_pairs.cpu(), rel=1e-14) == c6_pairs.cpu()
+
+
+@pytest.mark.parametrize("name", sample_list)
+def test_dftd3(name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    ref = reference.Reference(**dd)
+    param = {
+        "a1": torch.tensor(0.49484001, **dd),
+        "s8": torch.tensor(0.78981345, **dd),
+        "a2": torch.tensor(5.73083694, **dd),
+        "s9": torch.tensor(1.0, **dd),
+    }
+
+    energy = dftd3(numbers, positions, param, ref=ref)
+
+    table = model.C6Table(ref, numbers, tol=1e-5)
+    energy_table = dftd3(numbers, positions, param, ref=ref, table=table)
+    assert pytest.approx(energy.cpu(), rel=1e-5, abs=1e-12) == energy_table.cpu()
+
+
+@pytest.mark.grad
+@pytest.mark.parametrize("name", sample_list)
+def test_grad(name: str) -> None:
+    dd: DD = {"device": DEVICE, "dtype": torch.double}
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    positions = sample["positions"].to(**dd)
+    ref = reference.Reference(**dd)
+    table = model.C6Table(ref, numbers, tol=1e-5)
+
+    cn = ncoord.cn_d3(numbers, positions).detach().requires_grad_(True)
+
+    weights = model.weight_references(numbers, cn, ref)
+    c6 = model.atomic_c6(numbers, weights, ref)
+    (grad,) = torch.autograd.grad(c6.sum(), cn)
+
+    # derivative of the interpolant (one order less accurate)
+    c6 = model.interpolate_c6(numbers, cn, table)
+    (grad_table,) = torch.autograd.grad(c6.sum(), cn)
+    assert pytest.approx(grad.cpu(), abs=1e-3 * grad.abs().max()) == grad_table.cpu()
+
+    def func(x: torch.Tensor) -> torch.Tensor:
+        return model.interpolate_c6(numbers, x, table)
+
+    assert dgradcheck(func, cn, fast_mode=FAST_MODE)
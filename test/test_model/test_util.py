@@ -21,6 +21,7 @@ import pytest
 import torch
 
 from tad_dftd3.model.c6 import _check_memory
+from tad_dftd3.reference import Reference
 
 from ..conftest import DEVICE
 
@@ -33,7 +34,7 @@ def test_memory_total(mock_memory) -> None:
 
     x = torch.randn((1000000,), device=DEVICE, dtype=torch.double)
     with pytest.raises(MemoryError):
-        _check_memory(x, x)
+        _check_memory(x, x, Reference())
 
 
 @patch("tad_mctc.tools.memory.memory_device")
@@ -42,4 +43,23 @@ def test_memory_free(mock_memory) -> None:
 
     x = torch.randn((10000,), device=DEVICE, dtype=torch.double)
     with pytest.warns(ResourceWarning):
-        _check_memory(x, x)
+        _check_memory(x, x, Reference())
+
+
+@patch("tad_mctc.tools.memory.memory_device")
+def test_memory_nref(mock_memory) -> None:
+    ref = Reference(device=DEVICE, dtype=torch.double)
+    x = torch.ones((1000,), device=DEVICE, dtype=torch.long)
+
+    # (nat, nat, 7, 7) tensor fits with the default 7 reference systems
+    mock_memory.return_value = (1e10, 1e3)
+    _check_memory(x, x.double(), ref)
+
+    # more reference systems per element must increase the estimate
+    nref = 2 * ref.c6.shape[-1]
+    c6 = ref.c6.new_zeros((*ref.c6.shape[:-2], nref, nref))
+    cn = torch.cat([ref.cn, -ref.cn.new_ones(ref.cn.shape)], dim=-1)
+    big = Reference(cn=cn, c6=c6)
+
+    with pytest.raises(MemoryError):
+        _check_memory(x, x.double(), big)
@@ -81,3 +81,30 @@ def test_batch(dtype: torch.dtype, name1: str, name2: str) -> None:
 
     assert weights.dtype == dtype
     assert pytest.approx(refgw.cpu(), abs=tol, rel=tol) == weights.cpu()
+
+
+@pytest.mark.parametrize("dtype", [torch.float32, torch.float64])
+@pytest.mark.parametrize("name", sample_list)
+@pytest.mark.parametrize("shift", [0.0, 5.0, 20.0, 50.0])
+def test_softmax(dtype: torch.dtype, name: str, shift: float) -> None:
+    """
+    Log-sum-exp normalization vs. the double precision implementation, which
+    is used for all weighting functions without registered logarithm. Large
+    shifts of the CN lead to the underflow of all weights.
+    """
+    dd: DD = {"device": DEVICE, "dtype": dtype}
+    tol = torch.finfo(dtype).eps ** 0.5
+
+    sample = samples[name]
+    numbers = sample["numbers"].to(DEVICE)
+    ref = reference.Reference(**dd)
+    cn = sample["cn"].to(**dd) + shift
+
+    def gaussian(dcn: torch.Tensor) -> torch.Tensor:
+        return model.gaussian_weight(dcn)
+
+    refgw = model.weight_references(numbers, cn, ref, gaussian)
+    weights = model.weight_references(numbers, cn, ref, model.gaussian_weight)
+
+    assert weights.dtype == dtype
+    assert pytest.approx(refgw.cpu(), abs=tol, rel=tol) == weights.cpu()